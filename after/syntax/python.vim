@@ -2,7 +2,8 @@ if !jedi#init_python()
     finish
 endif
 
-if g:jedi#show_call_signatures > 0 && has('conceal')
+if g:jedi#show_call_signatures > 0 && g:jedi#show_call_signatures != 3
+            \ && has('conceal')
     " +conceal is the default for vim >= 7.3
 
     let s:e = g:jedi#call_signature_escape
@@ -21,7 +22,9 @@ if g:jedi#show_call_signatures > 0 && has('conceal')
     hi def link jediIgnore Ignore
     hi def link jediFatSymbol Ignore
     hi def link jediSpace Normal
+endif
 
+if g:jedi#show_call_signatures > 0
     if exists('g:colors_name')
         hi def link jediFunction CursorLine
         hi def link jediFat TabLine
@@ -30,6 +30,7 @@ let s:default_settings = {
     \ 'documentation_command': "'K'",
     \ 'show_call_signatures': has('conceal') ? 1 : 2,
     \ 'show_call_signatures_delay': 500,
+    \ 'show_call_signatures_debounce': 0,
     \ 'call_signature_escape': "'?!?'",
     \ 'auto_close_doc': 1,
     \ 'max_doc_height': 30,
@@ -41,7 +42,25 @@ let s:default_settings = {
     \ 'project_path': "'auto'",
     \ 'smart_auto_mappings': 0,
     \ 'case_insensitive_completion': 1,
-    \ 'use_tag_stack': 1
+    \ 'use_tag_stack': 1,
+    \ 'async_completions': 0,
+    \ 'dynamic_modules': "'buffers'",
+    \ 'backend': "'inprocess'",
+    \ 'worker_count': 1,
+    \ 'worker_python': "''",
+    \ 'worker_max_memory': 0,
+    \ 'completion_filter': "'prefix'",
+    \ 'max_completions': 0,
+    \ 'highlight_usages_lazily': 0,
+    \ 'rename_unloaded_files': "'open'",
+    \ 'pyimport_index': 0,
+    \ 'warmup': 0,
+    \ 'preload_modules': '[]',
+    \ 'usages_streaming': 0,
+    \ 'usages_cancel_command': "'<C-c>'",
+    \ 'usages_workers': 0,
+    \ 'usages_scope': "'project'",
+    \ 'hover_documentation': 0
 \ }
 
 for [s:key, s:val] in items(s:deprecations)
@@ -58,6 +77,13 @@ for [s:key, s:val] in items(s:default_settings)
 endfor
 
 let s:supports_buffer_usages = has('nvim') || exists('*prop_add')
+let s:supports_async_completions = exists('*timer_start') && exists('*complete')
+let s:supports_signature_popups = exists('*popup_create')
+            \ || exists('*nvim_buf_set_extmark')
+
+if g:jedi#show_call_signatures == 3 && !s:supports_signature_popups
+    let g:jedi#show_call_signatures = has('conceal') ? 1 : 2
+endif
 
 
 " ------------------------------------------------------------------------
@@ -71,7 +97,14 @@ function! s:init_python() abort
     if !has('python3')
         throw 'jedi-vim requires Vim with support for Python 3.'
     endif
+    let start = reltime()
     call jedi#setup_python_imports()
+    if exists('*reltimefloat')
+        python3 jedi_vim.startup_times['import jedi_vim'] = float(vim.eval('reltimefloat(reltime(l:start))'))
+    endif
+    " Jedi itself is imported on first use (see jedi_vim.load_jedi()), and
+    " in the background until then.
+    python3 jedi_vim.import_jedi_in_background()
     return 1
 endfunction
 
@@ -106,6 +139,22 @@ function! s:display_exception() abort
 endfunction
 
 
+" Shows the error of the failed import of jedi, on its first use (see
+" jedi_vim.load_jedi()).
+function! jedi#_display_import_error(error) abort
+    if exists('g:jedi#squelch_py_warning')
+        return
+    endif
+    let error_lines = split(a:error, '\n')
+    echohl ErrorMsg
+    unsilent echom 'jedi-vim error: '.error_lines[0]
+    for line in error_lines[1:]
+        unsilent echom line
+    endfor
+    echohl None
+endfunction
+
+
 let s:_init_python = -1
 function! jedi#init_python() abort
     if s:_init_python == -1
@@ -139,8 +188,6 @@ function! jedi#setup_python_imports() abort
           \ '        vim.vars["_jedi_init_error"] = "\\n".join(traceback.format_exception(*exc_info))',
           \ 'try:',
           \ '    import jedi_vim',
-          \ '    if hasattr(jedi_vim, "jedi_import_error"):',
-          \ '        _jedi_handle_exc(jedi_vim.jedi_import_error)',
           \ 'except Exception as exc:',
           \ '    _jedi_handle_exc(sys.exc_info())',
           \ ]
@@ -258,8 +305,111 @@ function! jedi#_vim_exceptions(str, is_eval) abort
     return l:result
 endfunction
 
+" Returns [changedtick, known, changes] for a buffer, where changes is a list
+" of [lnum, end, added] line ranges (see |listener_add()|) that were changed
+" since the last call.  known is 0 if the changes are not known, e.g. on the
+" first call for a buffer, which starts tracking them.
+if has('nvim')
+lua << EOF
+_G.jedi_vim_changes = _G.jedi_vim_changes or {}
+
+function _G.jedi_vim_buffer_changes(bufnr)
+  local all_changes = _G.jedi_vim_changes
+  local changes = all_changes[bufnr]
+  local changedtick = vim.api.nvim_buf_get_changedtick(bufnr)
+  if changes == nil then
+    all_changes[bufnr] = {}
+    vim.api.nvim_buf_attach(bufnr, false, {
+      on_lines = function(_, buf, _, first, last, new_last)
+        local c = all_changes[buf]
+        if c == nil then
+          return true  -- detach
+        end
+        if c ~= false then
+          table.insert(c, {first + 1, last + 1, new_last - last})
+        end
+      end,
+      on_reload = function(_, buf)
+        all_changes[buf] = false
+      end,
+      on_detach = function(_, buf)
+        all_changes[buf] = nil
+      end,
+    })
+    return {changedtick, 0, {}}
+  end
+  all_changes[bufnr] = {}
+  if changes == false then
+    return {changedtick, 0, {}}
+  end
+  return {changedtick, 1, changes}
+end
+EOF
+
+function! jedi#_buffer_changes(bufnr) abort
+    return luaeval('_G.jedi_vim_buffer_changes(_A)', a:bufnr)
+endfunction
+else
+function! s:on_buffer_changes(bufnr, start, end, added, changes) abort
+    let changes = getbufvar(a:bufnr, '_jedi_changes', 0)
+    if type(changes) == v:t_list
+        call extend(changes, map(copy(a:changes),
+                    \ '[v:val.lnum, v:val.end, v:val.added]'))
+    endif
+endfunction
+
+function! jedi#_buffer_changes(bufnr) abort
+    if !exists('*listener_add')
+        return [getbufvar(a:bufnr, 'changedtick'), 0, []]
+    endif
+    let changes = getbufvar(a:bufnr, '_jedi_changes', 0)
+    if type(changes) != v:t_list
+        call setbufvar(a:bufnr, '_jedi_changes', [])
+        call listener_add(function('s:on_buffer_changes'), a:bufnr)
+        return [getbufvar(a:bufnr, 'changedtick'), 0, []]
+    endif
+    call listener_flush(a:bufnr)
+    call setbufvar(a:bufnr, '_jedi_changes', [])
+    return [getbufvar(a:bufnr, 'changedtick'), 1, changes]
+endfunction
+endif
+
+" Returns the g:jedi#* and b:jedi_* variables, and the options that are used
+" by jedi_vim.get_settings().
+function! jedi#_settings() abort
+    if has('nvim') && !exists('b:_jedi_settings_watched')
+        call dictwatcheradd(b:, 'jedi_*', function('s:settings_changed'))
+        let b:_jedi_settings_watched = 1
+    endif
+    return [
+          \ filter(copy(g:), 'v:key =~# "^jedi#"'),
+          \ filter(copy(b:), 'v:key =~# "^jedi_"'),
+          \ {'completeopt': &completeopt, 'columns': &columns,
+          \  'ruler': &ruler, 'conceal': has('conceal')}]
+endfunction
+
+function! s:settings_changed(...) abort
+    python3 jedi_vim.invalidate_settings()
+endfunction
+
 call jedi#init_python()  " Might throw an error.
 
+if s:_init_python == 1
+    augroup jedi_buffers
+        autocmd!
+        autocmd BufUnload * python3 jedi_vim.forget_buffer(int(vim.eval('expand("<abuf>")')))
+        autocmd BufAdd,BufFilePost * python3 jedi_vim.dynamic_modules.update(int(vim.eval('expand("<abuf>")')))
+        autocmd BufDelete,BufWipeout * python3 jedi_vim.dynamic_modules.remove(int(vim.eval('expand("<abuf>")')))
+        autocmd OptionSet buflisted python3 jedi_vim.dynamic_modules.update(vim.current.buffer.number)
+        autocmd OptionSet completeopt,columns,ruler call s:settings_changed()
+        autocmd VimResized * call s:settings_changed()
+    augroup END
+
+    if has('nvim')
+        call dictwatcheradd(g:, 'jedi#*', function('s:settings_changed'))
+    endif
+endif
+
 " ------------------------------------------------------------------------
 " functions that call python code
 " ------------------------------------------------------------------------
@@ -286,6 +436,54 @@ function! jedi#usages() abort
     python3 jedi_vim.usages()
 endfunction
 
+let s:usages_timer = -1
+let s:usages_cancel_mapping = ''
+
+" Polls for the results of the search in the other files of the project
+" (g:jedi#usages_scope "tiered" or g:jedi#usages_streaming).
+function! jedi#_start_usages_stream() abort
+    call timer_stop(s:usages_timer)
+    let s:usages_timer = timer_start(20, function('s:usages_poll'),
+                \ {'repeat': -1})
+    let key = g:jedi#usages_cancel_command
+    if len(key) && empty(s:usages_cancel_mapping) && empty(maparg(key, 'n'))
+        execute 'nnoremap <silent> '.key.' :call jedi#cancel_usages()<CR>'
+        let s:usages_cancel_mapping = key
+    endif
+endfunction
+
+function! s:usages_poll(timer) abort
+    python3 if not jedi_vim.usages_poll(): vim.command('call s:stop_usages_stream()')
+endfunction
+
+function! s:stop_usages_stream() abort
+    call timer_stop(s:usages_timer)
+    let s:usages_timer = -1
+    if len(s:usages_cancel_mapping)
+        execute 'silent! nunmap '.s:usages_cancel_mapping
+        let s:usages_cancel_mapping = ''
+    endif
+endfunction
+
+function! jedi#cancel_usages() abort
+    python3 jedi_vim.cancel_usages()
+    call s:stop_usages_stream()
+endfunction
+
+" Called with the number of seconds once done, with -1 before.
+function! jedi#_usages_progress(searched, total, found, seconds) abort
+    if a:seconds >= 0
+        echo printf('jedi-vim: %d usages (%d files searched in %.1fs)',
+                    \ a:found, a:searched, a:seconds)
+    elseif len(s:usages_cancel_mapping)
+        echo printf('jedi-vim: searching usages %d/%d, %d found (%s to stop)',
+                    \ a:searched, a:total, a:found, s:usages_cancel_mapping)
+    else
+        echo printf('jedi-vim: searching usages %d/%d, %d found',
+                    \ a:searched, a:total, a:found)
+    endif
+endfunction
+
 if !s:supports_buffer_usages
 " Hide usages in the current window.
 " Only handles the current window due to matchdelete() restrictions.
@@ -343,6 +541,10 @@ function! jedi#clear_usages() abort
     augroup jedi_usages
         autocmd! BufWinEnter
         autocmd! WinEnter
+        autocmd! TextChanged,TextChangedI *
+        if exists('##WinScrolled')
+            autocmd! WinScrolled
+        endif
     augroup END
 
     if !s:supports_buffer_usages
@@ -379,20 +581,36 @@ function! jedi#rename_visual_keep_name(...) abort
     python3 jedi_vim.rename_visual(use_selected_text_as_prompt_answer=True)
 endfunction
 
+function! jedi#undo_rename() abort
+    python3 jedi_vim.undo_rename()
+endfunction
+
+function! jedi#stats(reset) abort
+    if a:reset
+        python3 jedi_vim.metrics.clear()
+    else
+        python3 jedi_vim.show_stats()
+    endif
+endfunction
+
+function! jedi#stats_json() abort
+    python3 jedi_vim.dump_stats()
+endfunction
+
 function! jedi#completions(findstart, base) abort
     python3 jedi_vim.completions()
 endfunction
 
 function! jedi#enable_speed_debugging() abort
-    python3 jedi_vim.jedi.set_debug_function(jedi_vim.print_to_stdout, speed=True, warnings=False, notices=False)
+    python3 jedi_vim.load_jedi() and jedi_vim.jedi.set_debug_function(jedi_vim.print_to_stdout, speed=True, warnings=False, notices=False)
 endfunction
 
 function! jedi#enable_debugging() abort
-    python3 jedi_vim.jedi.set_debug_function(jedi_vim.print_to_stdout)
+    python3 jedi_vim.load_jedi() and jedi_vim.jedi.set_debug_function(jedi_vim.print_to_stdout)
 endfunction
 
 function! jedi#disable_debugging() abort
-    python3 jedi_vim.jedi.set_debug_function(None)
+    python3 jedi_vim.load_jedi() and jedi_vim.jedi.set_debug_function(None)
 endfunction
 
 function! jedi#py_import(args) abort
@@ -403,6 +621,19 @@ function! jedi#choose_environment(args) abort
     python3 jedi_vim.choose_environment()
 endfun
 
+" Refreshes the list of jedi#choose_environment(), once the environments were
+" revalidated in the background.
+function! jedi#_update_environments_later() abort
+    if exists('*timer_start')
+        call timer_start(200, function('s:update_environments'),
+                    \ {'repeat': -1})
+    endif
+endfunction
+
+function! s:update_environments(timer) abort
+    python3 if not jedi_vim.update_environment_chooser(): vim.command('call timer_stop(a:timer)')
+endfunction
+
 function! jedi#load_project(args) abort
     python3 jedi_vim.load_project()
 endfun
@@ -413,10 +644,61 @@ endfun
 
 function! jedi#clear_cache(bang) abort
     if a:bang
-        python3 jedi_vim.jedi.cache.clear_time_caches(True)
+        python3 jedi_vim.load_jedi() and jedi_vim.jedi.cache.clear_time_caches(True)
     else
-        python3 jedi_vim.jedi.cache.clear_time_caches(False)
+        python3 jedi_vim.load_jedi() and jedi_vim.jedi.cache.clear_time_caches(False)
     endif
+    python3 jedi_vim.script_cache.clear()
+    python3 jedi_vim.completion_docs.clear()
+    python3 jedi_vim.documentation_cache.clear()
+    python3 jedi_vim.completion_cache.clear()
+    python3 jedi_vim.signature_cache.clear()
+    python3 jedi_vim.jedi_vim_index.clear()
+    python3 jedi_vim.warmups.clear()
+endfunction
+
+
+" ------------------------------------------------------------------------
+" warm-up
+" ------------------------------------------------------------------------
+let s:warmup_timer = -1
+let s:warmup_status = ''
+
+" Called once per buffer in idle time, see ftplugin/python/jedi.vim.
+function! jedi#warmup() abort
+    silent! autocmd! jedi_warmup * <buffer>
+    if !exists('*timer_start')
+        return
+    endif
+    python3 jedi_vim.warmup()
+    call timer_stop(s:warmup_timer)
+    let s:warmup_timer = timer_start(50, function('s:warmup_poll'),
+                \ {'repeat': -1})
+endfunction
+
+function! s:warmup_poll(timer) abort
+    python3 if not jedi_vim.warmup_poll(): vim.command('call timer_stop(a:timer)')
+endfunction
+
+" Called with the number of seconds once done, with -1 before.
+function! jedi#_warmup_progress(done, total, seconds) abort
+    if a:seconds < 0
+        let s:warmup_status = printf('jedi: warming up %d/%d', a:done, a:total)
+        return
+    endif
+    let s:warmup_status = ''
+    if a:total
+        echo printf('jedi-vim: warmed up (%d steps in %.1fs)',
+                    \ a:total, a:seconds)
+        if exists('#User#JediWarmupDone')
+            doautocmd <nomodeline> User JediWarmupDone
+        endif
+    endif
+endfunction
+
+" For the 'statusline': the progress of the warm-up, or an empty string.
+function! jedi#warmup_status() abort
+    return s:warmup_status
 endfunction
 
 
@@ -425,6 +707,8 @@ endfunction
 " ------------------------------------------------------------------------
 function! jedi#show_documentation() abort
     python3 if jedi_vim.show_documentation() is None: vim.command('return')
+    let l:doc = remove(g:, '_jedi_documentation')
+    let l:doc_lines = len(split(l:doc, "\n", 1))
 
     let bn = bufnr('__doc__')
     if bn > 0
@@ -462,6 +746,74 @@ function! jedi#show_documentation() abort
     endif
 endfunction
 
+
+" ------------------------------------------------------------------------
+" hover documentation
+" ------------------------------------------------------------------------
+let s:supports_hover_documentation = exists('*timer_start')
+            \ && (exists('*popup_atcursor') || exists('*nvim_open_win'))
+let s:hover_timer = -1
+let s:hover_window = -1
+
+" Called on CursorHold with g:jedi#hover_documentation, see
+" ftplugin/python/jedi.vim.  The documentation is looked up in the background.
+function! jedi#hover_documentation() abort
+    if !s:supports_hover_documentation
+        return
+    endif
+    call timer_stop(s:hover_timer)
+    python3 if jedi_vim.hover_documentation() is not True: vim.command('return')
+    let s:hover_timer = timer_start(20, function('s:hover_poll'),
+                \ {'repeat': -1})
+endfunction
+
+function! s:hover_poll(timer) abort
+    python3 if not jedi_vim.hover_documentation_poll(): vim.command('call timer_stop(a:timer)')
+endfunction
+
+function! jedi#_show_hover_documentation(text) abort
+    call jedi#_close_hover_documentation()
+    let lines = split(a:text, "\n", 1)
+    let width = min([max(map(copy(lines), 'strdisplaywidth(v:val)')), 80,
+                \ &columns - 4])
+    if has('nvim')
+        let buf = nvim_create_buf(v:false, v:true)
+        call nvim_buf_set_lines(buf, 0, -1, v:true, lines)
+        call setbufvar(buf, '&bufhidden', 'wipe')
+        call setbufvar(buf, '&filetype', 'rst')
+        let s:hover_window = nvim_open_win(buf, v:false, {
+                    \ 'relative': 'cursor', 'row': 1, 'col': 0,
+                    \ 'width': width,
+                    \ 'height': min([len(lines), g:jedi#max_doc_height]),
+                    \ 'style': 'minimal'})
+        call setwinvar(s:hover_window, '&wrap', 1)
+    else
+        let s:hover_window = popup_atcursor(lines, {
+                    \ 'maxwidth': width,
+                    \ 'maxheight': g:jedi#max_doc_height,
+                    \ 'padding': [0, 1, 0, 1],
+                    \ 'border': [],
+                    \ 'moved': 'any'})
+        call setbufvar(winbufnr(s:hover_window), '&filetype', 'rst')
+    endif
+endfunction
+
+function! jedi#_close_hover_documentation() abort
+    call timer_stop(s:hover_timer)
+    let s:hover_timer = -1
+    if s:hover_window == -1
+        return
+    endif
+    if has('nvim')
+        if nvim_win_is_valid(s:hover_window)
+            call nvim_win_close(s:hover_window, v:true)
+        endif
+    else
+        call popup_close(s:hover_window)
+    endif
+    let s:hover_window = -1
+endfunction
+
 " ------------------------------------------------------------------------
 " helper functions
 " ------------------------------------------------------------------------
@@ -505,11 +857,23 @@ function! jedi#add_goto_window(for_usages, len) abort
     endif
 endfunction
 
-" Highlight usages for a buffer if not done so yet (Neovim only).
+" Highlight usages for a buffer if not done so yet.
 function! s:usages_for_pending_buffers() abort
     python3 jedi_vim._handle_pending_usages_for_buf()
 endfunction
 
+" Highlight usages once they get visible (g:jedi#highlight_usages_lazily).
+function! jedi#_setup_lazy_usages() abort
+    augroup jedi_usages
+        autocmd! BufWinEnter * call s:usages_for_pending_buffers()
+        if exists('##WinScrolled')
+            autocmd! WinScrolled * python3 jedi_vim.highlight_visible_usages()
+        endif
+        " Positions that are not highlighted yet would be wrong after changes.
+        autocmd! TextChanged,TextChangedI * python3 jedi_vim.forget_unplaced_usages(int(vim.eval('expand("<abuf>")')))
+    augroup END
+endfunction
+
 
 function! jedi#goto_window_on_enter() abort
     let l:list = getqflist()
@@ -584,16 +948,120 @@ function! jedi#show_call_signatures() abort
 endfunction
 
 
+" Coalesce bursts of cursor movements into one update of the signatures
+" (g:jedi#show_call_signatures_debounce).
+let s:show_call_signatures_timer = -1
+function! s:show_call_signatures_debounced() abort
+    call timer_stop(s:show_call_signatures_timer)
+    let s:show_call_signatures_timer = timer_start(
+                \ g:jedi#show_call_signatures_debounce,
+                \ function('s:show_call_signatures_timer', [bufnr('%')]))
+endfunction
+
+function! s:show_call_signatures_timer(bufnr, timer) abort
+    let s:show_call_signatures_timer = -1
+    if mode() ==# 'i' && bufnr('%') == a:bufnr
+        call jedi#show_call_signatures()
+    endif
+endfunction
+
+
 function! jedi#clear_call_signatures() abort
     if s:_init_python == 0
         return 1
     endif
 
+    if s:show_call_signatures_timer != -1
+        call timer_stop(s:show_call_signatures_timer)
+        let s:show_call_signatures_timer = -1
+    endif
     let s:show_call_signatures_last = [0, 0, '']
+    if g:jedi#show_call_signatures == 3
+        call jedi#_clear_call_signature_popups()
+        return
+    endif
     python3 jedi_vim.clear_call_signatures()
 endfunction
 
 
+" Call signatures in popups (Vim) or virtual text (Neovim), which leave the
+" buffer alone (g:jedi#show_call_signatures = 3).  Every signature has the
+" position of its bracket, its text and the byte range of the current param.
+let s:signature_popups = []
+let s:signature_buffer = -1
+if has('nvim')
+    let s:signature_namespace = nvim_create_namespace('jedi_call_signatures')
+endif
+
+function! jedi#_show_call_signature_popups(signatures) abort
+    call jedi#_clear_call_signature_popups()
+    let winid = win_getid()
+    let wininfo = getwininfo(winid)[0]
+    let i = 0
+    for signature in a:signatures
+        let i += 1
+        let pos = screenpos(winid, signature.lnum, signature.col)
+        if pos.row == 0
+            " The bracket is not visible.
+            continue
+        endif
+        " Signatures are listed above each other, or below if there is no
+        " space above.
+        let above = signature.lnum - i >= max([1, wininfo.topline])
+        let col = max([pos.col - signature.offset, wininfo.wincol
+                    \ + wininfo.textoff])
+        let text = signature.text
+        let current = signature.current
+
+        if has('nvim')
+            let chunks = empty(current) ? [[text, 'jediFunction']] : [
+                        \ [strpart(text, 0, current[0]), 'jediFunction'],
+                        \ [strpart(text, current[0], current[1]), 'jediFat'],
+                        \ [strpart(text, current[0] + current[1]), 'jediFunction']]
+            let lnum = above ? signature.lnum - i : signature.lnum + i
+            if lnum > line('$')
+                continue
+            endif
+            call nvim_buf_set_extmark(0, s:signature_namespace, lnum - 1, 0, {
+                        \ 'virt_text': chunks,
+                        \ 'virt_text_win_col': col - wininfo.wincol
+                        \   - wininfo.textoff,
+                        \ 'hl_mode': 'combine'})
+            let s:signature_buffer = bufnr('%')
+        else
+            if empty(prop_type_get('jediFat'))
+                call prop_type_add('jediFat', {'highlight': 'jediFat'})
+            endif
+            let props = empty(current) ? [] : [{'col': current[0] + 1,
+                        \ 'length': current[1], 'type': 'jediFat'}]
+            call add(s:signature_popups, popup_create(
+                        \ [{'text': text, 'props': props}], {
+                        \ 'line': above ? pos.row - i : pos.row + i,
+                        \ 'col': col,
+                        \ 'highlight': 'jediFunction',
+                        \ 'wrap': 0,
+                        \ 'zindex': 40}))
+        endif
+    endfor
+endfunction
+
+
+function! jedi#_clear_call_signature_popups() abort
+    if has('nvim')
+        if bufexists(s:signature_buffer)
+            call nvim_buf_clear_namespace(s:signature_buffer,
+                        \ s:signature_namespace, 0, -1)
+        endif
+        let s:signature_buffer = -1
+    else
+        for id in s:signature_popups
+            call popup_close(id)
+        endfor
+        let s:signature_popups = []
+    endif
+endfunction
+
+
 function! jedi#configure_call_signatures() abort
     augroup jedi_call_signatures
     autocmd! * <buffer>
@@ -610,6 +1078,8 @@ function! jedi#configure_call_signatures() abort
                     \ |   unlet b:_jedi_orig_updatetime
                     \ | endif
         autocmd CursorHoldI <buffer> call jedi#show_call_signatures()
+    elseif g:jedi#show_call_signatures_debounce > 0 && exists('*timer_start')
+        autocmd CursorMovedI <buffer> call s:show_call_signatures_debounced()
     else
         autocmd CursorMovedI <buffer> call jedi#show_call_signatures()
     endif
@@ -692,10 +1162,84 @@ function! jedi#complete_string(autocomplete) abort
     elseif pumvisible()
         return "\<C-n>"
     endif
+    if g:jedi#async_completions && s:supports_async_completions
+        " The popup gets opened by jedi#_complete_async_show() later, with
+        " the 'completeopt' that is set up here.
+        call timer_start(0, function('s:complete_async_start',
+                    \ [a:autocomplete, &completeopt]))
+        return "\<C-r>=jedi#complete_opened(".a:autocomplete.")\<CR>"
+    endif
     return "\<C-x>\<C-o>\<C-r>=jedi#complete_opened(".a:autocomplete.")\<CR>"
 endfunction
 
 
+let s:complete_async_timer = -1
+function! s:complete_async_start(autocomplete, completeopt, timer) abort
+    if py3eval('jedi_vim.complete_async() == jedi_vim.JEDI_BUSY')
+        " The previous completion still uses jedi, try again a bit later
+        " instead of waiting for it.
+        if mode() ==# 'i'
+            call timer_start(20, function('s:complete_async_start',
+                        \ [a:autocomplete, a:completeopt]))
+        endif
+        return
+    endif
+    call timer_stop(s:complete_async_timer)
+    let s:complete_async_timer = timer_start(10,
+                \ function('s:complete_async_poll'), {'repeat': -1})
+endfunction
+
+
+function! s:complete_async_poll(timer) abort
+    python3 if not jedi_vim.complete_async_poll(): vim.command('call timer_stop(a:timer)')
+endfunction
+
+
+" Open the popup menu for the result of an asynchronous completion.
+function! jedi#_complete_async_show(startcol, items, completeopt, autocomplete) abort
+    let saved_completeopt = &completeopt
+    let &completeopt = a:completeopt
+    try
+        call complete(a:startcol, a:items)
+    finally
+        let &completeopt = saved_completeopt
+    endtry
+    if !a:autocomplete && pumvisible() && g:jedi#popup_select_first
+                \ && stridx(a:completeopt, 'longest') > -1
+        call feedkeys("\<Down>", 'n')
+    endif
+    return ''
+endfunction
+
+
+" Fill in the docstring of the selected completion, see
+" jedi_vim.show_completion_info().
+function! s:show_completion_info() abort
+    let user_data = get(v:event.completed_item, 'user_data', '')
+    if type(user_data) == v:t_string && user_data =~# '^jedi-vim:'
+        python3 jedi_vim.show_completion_info()
+    endif
+endfunction
+
+
+function! jedi#_set_completion_info(info) abort
+    if exists('*nvim__complete_set')
+        call nvim__complete_set(complete_info(['selected']).selected,
+                    \ {'info': a:info})
+        return
+    endif
+    let id = popup_findinfo()
+    if id
+        if empty(a:info)
+            call popup_hide(id)
+        else
+            call popup_settext(id, split(a:info, '\n'))
+            call popup_show(id)
+        endif
+    endif
+endfunction
+
+
 function! jedi#complete_opened(autocomplete) abort
     if a:autocomplete
         let &completeopt = s:saved_completeopt
@@ -733,6 +1277,13 @@ function! jedi#setup_completion() abort
         " A separate mapping for select mode: deletes and completes.
         execute 'snoremap <expr> <buffer> '.g:jedi#completions_command." '\<C-g>c'.jedi#complete_string(0)"
     endif
+
+    if exists('##CompleteChanged')
+        augroup jedi_completion_info
+            autocmd! * <buffer>
+            autocmd CompleteChanged <buffer> call s:show_completion_info()
+        augroup END
+    endif
 endfunction
 
 "python3 jedi_vim.jedi.set_debug_function(jedi_vim.print_to_stdout, speed=True, warnings=False, notices=False)
@@ -48,6 +48,21 @@ if g:jedi#auto_initialization
         inoremap <silent> <buffer> <space> <C-R>=jedi#smart_auto_mappings()<CR>
     end
 
+    if g:jedi#warmup
+        augroup jedi_warmup
+            autocmd! * <buffer>
+            autocmd CursorHold,CursorHoldI <buffer> call jedi#warmup()
+        augroup END
+    endif
+
+    if g:jedi#hover_documentation
+        augroup jedi_hover
+            autocmd! * <buffer>
+            autocmd CursorHold <buffer> call jedi#hover_documentation()
+            autocmd CursorMoved,InsertEnter,BufLeave <buffer> call jedi#_close_hover_documentation()
+        augroup END
+    endif
+
     if g:jedi#auto_close_doc && (&g:completeopt =~# '\<preview\>' && &g:completeopt !~# '\<popup\>')
         " close preview if its still open after insert
         augroup jedi_preview
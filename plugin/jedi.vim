@@ -78,5 +78,7 @@ function! s:jedi_debug_info()
 endfunction
 command! -nargs=0 -bar JediDebugInfo call s:jedi_debug_info()
 command! -nargs=0 -bang JediClearCache call jedi#clear_cache(<bang>0)
+command! -nargs=0 -bar JediUndoRename call jedi#undo_rename()
+command! -nargs=0 -bar -bang JediStats call jedi#stats(<bang>0)
 
 " vim: set et ts=4:
@@ -4,12 +4,24 @@ The Python parts of the Jedi library for VIM. It is mostly about communicating
 with VIM.
 """
 
-from typing import Optional
+from typing import NamedTuple, Optional
 import traceback  # for exception output
 import re
 import os
 import sys
+import atexit
+import threading
+import itertools
+import json
+import bisect
+import mmap
+import shutil
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from queue import PriorityQueue
 from shlex import split as shsplit
+from tempfile import mkstemp
 from contextlib import contextmanager
 from pathlib import Path
 try:
@@ -19,6 +31,11 @@ except ImportError:
 
 import vim
 
+import jedi_vim_environments
+import jedi_vim_index
+import jedi_vim_references
+import jedi_vim_worker
+
 is_py3 = sys.version_info[0] >= 3
 if is_py3:
     ELLIPSIS = "…"
@@ -94,6 +111,19 @@ def vim_eval(string):
     return _catch_exception(string, is_eval=True)
 
 
+def vim_return(value):
+    """
+    Returns `value` from the Vim function that called into Python.
+
+    Lists and dicts are converted by Vim's Python interface (msgpack with
+    Neovim) instead of being parsed by Vim from their repr(), which is a lot
+    faster for big lists.  Strings should be `PythonToVimStr`, because Vim
+    cannot deal with zero bytes.
+    """
+    vim.vars['_jedi_return'] = value
+    vim.command("return remove(g:, '_jedi_return')")
+
+
 def no_jedi_warning(error=None):
     vim.command('echohl WarningMsg')
     vim.command('echom "Please install Jedi if you want to use jedi-vim."')
@@ -108,34 +138,91 @@ def echo_highlight(msg):
 
 
 jedi_path = os.path.join(os.path.dirname(__file__), 'jedi')
-sys.path.insert(0, jedi_path)
 parso_path = os.path.join(os.path.dirname(__file__), 'parso')
-sys.path.insert(0, parso_path)
 
-try:
-    import jedi
-except ImportError:
-    jedi = None
-    jedi_import_error = sys.exc_info()
-else:
+startup_times = OrderedDict()
+"""Seconds taken by the steps of loading jedi-vim, see :JediDebugInfo."""
+
+jedi = None
+"""The jedi module, set by `load_jedi` on first use."""
+jedi_import_error = None
+
+_jedi_import = None
+"""The jedi module, or the exc_info of the failed import, once imported."""
+_jedi_import_lock = threading.Lock()
+_jedi_checked = False
+
+
+def _import_jedi():
+    """
+    Imports jedi (from the submodules if there), which takes a while.  Can be
+    called from any thread, but must not use the vim module.
+    """
+    global _jedi_import
+    with _jedi_import_lock:
+        if _jedi_import is None:
+            start = time.perf_counter()
+            sys.path.insert(0, jedi_path)
+            sys.path.insert(0, parso_path)
+            try:
+                import jedi as module
+            except ImportError:
+                module = sys.exc_info()
+            finally:
+                sys.path.remove(jedi_path)
+                sys.path.remove(parso_path)
+            _jedi_import = module
+            startup_times['import jedi'] = time.perf_counter() - start
+    return _jedi_import
+
+
+def import_jedi_in_background():
+    """Starts importing jedi, so that it is there when it is first needed."""
+    thread = threading.Thread(target=_import_jedi, name='jedi-vim-import')
+    thread.daemon = True
+    thread.start()
+
+
+def load_jedi():
+    """
+    Sets up the `jedi` global on first use, instead of importing jedi when
+    jedi_vim gets imported.  Returns False if jedi is not available.
+    """
+    global jedi, jedi_import_error, _jedi_checked
+    if _jedi_checked:
+        return jedi is not None
+    module = _import_jedi()
+    _jedi_checked = True
+    if isinstance(module, tuple):
+        jedi_import_error = module
+        _display_jedi_import_error(module)
+        return False
+
     try:
-        version = jedi.__version__
+        version = module.__version__
     except Exception as e:  # e.g. AttributeError
         echo_highlight(
             "Error when loading the jedi python module ({0}). "
             "Please ensure that Jedi is installed correctly (see Installation "
             "in the README.".format(e))
-        jedi = None
-    else:
-        if isinstance(version, str):
-            # the normal use case, now.
-            from jedi import utils
-            version = utils.version_info()
-        if version < (0, 7):
-            echo_highlight('Please update your Jedi version, it is too old.')
-finally:
-    sys.path.remove(jedi_path)
-    sys.path.remove(parso_path)
+        return False
+    if isinstance(version, str):
+        # the normal use case, now.
+        from jedi import utils
+        version = utils.version_info()
+    if version < (0, 7):
+        echo_highlight('Please update your Jedi version, it is too old.')
+    jedi = module
+    return True
+
+
+def _display_jedi_import_error(exc_info):
+    """Shows why jedi cannot be imported, with the traceback."""
+    from jedi_vim_debug import format_exc_info
+
+    VimCompat.call('jedi#_display_import_error', PythonToVimStr(
+        'could not import the "jedi" Python module: '
+        + format_exc_info(exc_info)))
 
 
 class VimCompat:
@@ -172,10 +259,17 @@ class VimCompat:
                 cls.call('setqflist', [], ' ', what)
             else:
                 # Can set title (and maybe context), but needs two calls.
-                cls.call('setqflist', items)
+                cls.call('setqflist', items, ' ')
                 cls.call('setqflist', items, 'a', what)
         else:
-            cls.call('setqflist', items)
+            cls.call('setqflist', items, ' ')
+
+    @classmethod
+    def appendqflist(cls, items):
+        if cls.has('patch-8.0.0657'):
+            cls.call('setqflist', [], 'a', {'items': items})
+        else:
+            cls.call('setqflist', items, 'a')
 
     @classmethod
     def setqflist_title(cls, title):
@@ -200,65 +294,287 @@ def catch_and_print_exceptions(func):
     return wrapper
 
 
-def _check_jedi_availability(show_error=False):
+jedi_lock = threading.RLock()
+"""Held while using jedi, which is not thread-safe."""
+
+_foreground_waiting = 0
+"""The number of requests on the main thread that wait for `jedi_lock`."""
+_last_foreground_request = 0.0
+"""When the main thread last used jedi, see `Warmup.poll`."""
+
+
+def _acquire_jedi_lock(wait=True):
+    """
+    Acquires `jedi_lock` on the main thread.  While waiting, the background
+    thread does not start new jobs (see `BackgroundRunner`).
+    """
+    global _foreground_waiting, _last_foreground_request
+    _last_foreground_request = time.perf_counter()
+    if jedi_lock.acquire(blocking=False):
+        return True
+    if not wait:
+        return False
+    _foreground_waiting += 1
+    try:
+        return jedi_lock.acquire()
+    finally:
+        _foreground_waiting -= 1
+
+
+JEDI_BUSY = 'busy'
+"""Returned instead of calling a function that does not wait for jedi."""
+
+
+def _check_jedi_availability(show_error=False, wait=True):
+    """
+    Loads jedi and holds `jedi_lock` while calling the decorated function.
+    With `wait=False` the call is skipped (returning `JEDI_BUSY`) while jedi
+    is busy on the background thread, for updates triggered by typing or
+    moving the cursor, which must not block the UI.
+    """
     def func_receiver(func):
         def wrapper(*args, **kwargs):
-            if jedi is None:
+            if not load_jedi():
                 if show_error:
-                    no_jedi_warning()
+                    no_jedi_warning(jedi_import_error and jedi_import_error[1])
                 return
-            else:
+            if not _acquire_jedi_lock(wait):
+                return JEDI_BUSY
+            try:
                 return func(*args, **kwargs)
+            finally:
+                jedi_lock.release()
         return wrapper
     return func_receiver
 
 
-# Tuple of cache key / project
-_current_project_cache = None, None
+class BackgroundRunner(object):
+    """
+    Runs jobs on a single daemon thread, lower priority values first.
+
+    Jobs are serialized and hold `jedi_lock`, because jedi is not
+    thread-safe.  Requests on the main thread that wait for the lock get it
+    before the next job starts.  Jobs must not use the `vim` module:
+    everything they need has to be collected on the main thread before
+    submitting them.
+    """
+    def __init__(self):
+        self._queue = PriorityQueue()
+        self._counter = itertools.count()
+        self._thread = None
+
+    def submit(self, func, *args, priority=0):
+        """Returns a `concurrent.futures.Future` for the result of the job."""
+        future = Future()
+        self._queue.put((priority, next(self._counter), future, func, args))
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='jedi-vim')
+            self._thread.daemon = True
+            self._thread.start()
+        return future
+
+    def _run(self):
+        while True:
+            _, _, future, func, args = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                # Cancelled while waiting in the queue.
+                continue
+            while _foreground_waiting:
+                time.sleep(0.001)
+            try:
+                with jedi_lock:
+                    result = func(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+background_runner = BackgroundRunner()
+
+
+class Settings(NamedTuple):
+    """
+    A snapshot of the `g:jedi#*` settings, with the `b:jedi_*` overrides of
+    the current buffer applied, and of the Vim options used by jedi-vim.
+    """
+    environment_path: str
+    project_path: str
+    added_sys_path: list
+    case_insensitive_completion: bool
+    show_call_signatures: int
+    call_signature_escape: str
+    first_col: int
+    use_tag_stack: bool
+    use_tabs_not_buffers: bool
+    use_splits_not_buffers: str
+    dynamic_modules: str
+    backend: str
+    worker_count: int
+    worker_python: str
+    worker_max_memory: int
+    completion_filter: str
+    max_completions: int
+    highlight_usages_lazily: bool
+    rename_unloaded_files: str
+    pyimport_index: bool
+    warmup: bool
+    preload_modules: list
+    usages_streaming: bool
+    usages_workers: int
+    usages_scope: str
+    completeopt: str
+    columns: int
+    ruler: bool
+    conceal: bool
+
+    @classmethod
+    def from_vim(cls, global_vars, buffer_vars, options):
+        values = dict(options)
+        values['first_col'] = 0  # Only set with command line signatures.
+        for key, value in global_vars.items():
+            values[key[len('jedi#'):]] = value
+        for name in ('environment_path', 'project_path',
+                     'case_insensitive_completion'):
+            if 'jedi_' + name in buffer_vars:
+                values[name] = buffer_vars['jedi_' + name]
+        values['added_sys_path'] = (
+            list(global_vars.get('jedi#added_sys_path', []))
+            + list(buffer_vars.get('jedi_added_sys_path', [])))
+        values['preload_modules'] = (
+            list(global_vars.get('jedi#preload_modules', []))
+            + list(buffer_vars.get('jedi_preload_modules', [])))
+
+        kwargs = {}
+        for name, typ in cls.__annotations__.items():
+            value = values[name]
+            if typ is bool:
+                value = bool(int(value))
+            else:
+                value = typ(value)
+            kwargs[name] = value
+        return cls(**kwargs)
+
+
+_settings_cache = {}
+"""Settings per buffer number."""
+
+
+def get_settings():
+    """
+    Returns the `Settings` for the current buffer, fetched with a single
+    evaluation.
+
+    With Neovim they are cached until changed (via dictwatcheradd() and
+    OptionSet), while Vim cannot watch variables, and gets them once per
+    request instead (see `vim_request`).
+    """
+    bufnr = vim.current.buffer.number
+    try:
+        return _settings_cache[bufnr]
+    except KeyError:
+        settings = _settings_cache[bufnr] = Settings.from_vim(
+            *vim_eval('jedi#_settings()'))
+        return settings
+
+
+def invalidate_settings():
+    _settings_cache.clear()
+
+
+_request_depth = 0
+
+
+def vim_request(func):
+    """Decorator for the functions that are called from Vim."""
+    def wrapper(*args, **kwargs):
+        global _request_depth
+        if not _request_depth and not IS_NVIM:
+            invalidate_settings()
+        _request_depth += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _request_depth -= 1
+    return wrapper
+
+
+_project_roots = {}
+"""The detected project root and the buffer name, per buffer number."""
+
+
+def get_project_root():
+    """
+    Detects the project of the current buffer with Jedi's heuristics, which
+    walk up from the buffer's directory to e.g. a setup.py or .git, so that
+    each package of a monorepo is a project of its own.
+    """
+    buf = vim.current.buffer
+    name = buf.name
+    if not name:
+        # Relative to the current directory, which might change.
+        return str(jedi.get_default_project().path)
+    try:
+        cached_name, root = _project_roots[buf.number]
+    except KeyError:
+        pass
+    else:
+        if cached_name == name:
+            return root
+    root = str(jedi.get_default_project(os.path.dirname(name)).path)
+    _project_roots[buf.number] = name, root
+    return root
 
 
 def get_project():
-    vim_environment_path = vim_eval(
-        "get(b:, 'jedi_environment_path', g:jedi#environment_path)"
-    )
-    vim_project_path = vim_eval("g:jedi#project_path")
+    """
+    Returns the `jedi.Project` of the current buffer.  Recently used projects
+    are kept (see `project_cache`), so that switching between buffers of
+    different projects or environments does not start from scratch.
+    """
+    settings = get_settings()
+    vim_environment_path = settings.environment_path
+    vim_project_path = settings.project_path
+    vim_added_sys_path = settings.added_sys_path
+
+    with jedi_lock:
+        if vim_project_path in ("auto", "", None):
+            project_path = get_project_root()
+        else:
+            project_path = vim_project_path
+        cache_key = (_project_cache_path(project_path), vim_environment_path,
+                     tuple(vim_added_sys_path))
+        return project_cache.get(cache_key, lambda: _create_project(
+            project_path, vim_environment_path, vim_added_sys_path))
 
-    vim_added_sys_path = vim_eval("get(g:, 'jedi#added_sys_path', [])")
-    vim_added_sys_path += vim_eval("get(b:, 'jedi_added_sys_path', [])")
 
-    global _current_project_cache
-    cache_key = dict(project_path=vim_project_path,
-                     environment_path=vim_environment_path,
-                     added_sys_path=vim_added_sys_path)
-    if cache_key == _current_project_cache[0]:
-        return _current_project_cache[1]
+def _project_cache_path(path):
+    """The path of a project in the keys of `project_cache`, which is the
+    same for e.g. a relative path or a symlink and the resolved root."""
+    return os.path.realpath(os.path.expanduser(str(path)))
 
+
+def _create_project(project_path, vim_environment_path, added_sys_path):
     if vim_environment_path in ("auto", "", None):
         environment_path = None
     else:
         environment_path = vim_environment_path
 
-    if vim_project_path in ("auto", "", None):
-        project_path = jedi.get_default_project().path
-    else:
-        project_path = vim_project_path
-
+    start = time.perf_counter()
     project = jedi.Project(project_path,
                            environment_path=environment_path,
-                           added_sys_path=vim_added_sys_path)
-
-    _current_project_cache = cache_key, project
+                           added_sys_path=added_sys_path)
+    metrics.add('project', time.perf_counter() - start)
     return project
 
 
+@vim_request
+@_check_jedi_availability(show_error=True)
 @catch_and_print_exceptions
 def choose_environment():
     args = shsplit(vim.eval('a:args'))
 
-    envs = list(jedi.find_system_environments())
-    envs.extend(jedi.find_virtualenvs(paths=args or None))
-
-    env_paths = [env.executable for env in envs]
+    env_paths = [env.executable for env in get_known_environments(args)]
 
     vim_command('belowright new')
     vim.current.buffer[:] = env_paths
@@ -268,17 +584,85 @@ def choose_environment():
     vim_command('noremap <buffer> <ESC> :bw<CR>')
     vim_command('noremap <buffer> <CR> :python3 jedi_vim.choose_environment_hit_enter()<CR>')
 
+    global _environment_chooser
+    cache = get_environment_cache()
+    if cache.refreshing():
+        _environment_chooser = (vim.current.buffer.number, args, cache.generation)
+        VimCompat.call('jedi#_update_environments_later')
+
+
+_environment_cache = None
+
+_environment_chooser = None
+"""The buffer number, paths and cache generation of the environment list."""
+
+
+def get_environment_cache():
+    global _environment_cache
+    if _environment_cache is None:
+        _environment_cache = jedi_vim_environments.EnvironmentCache(os.path.join(
+            jedi.settings.cache_directory, 'jedi-vim', 'environments.json'))
+    return _environment_cache
+
+
+def get_known_environments(paths=None):
+    """
+    Returns the `jedi_vim_environments.KnownEnvironment`s found before, and
+    revalidates them in the background.  Only the first time they are
+    discovered right away.
+    """
+    cache = get_environment_cache()
+    environments = cache.get(paths)
+    if environments is None:
+        return cache.refresh(jedi, paths)
+    cache.refresh_in_background(jedi, paths)
+    return environments
+
 
+@vim_request
+@catch_and_print_exceptions
+def update_environment_chooser():
+    """
+    Updates the list of :JediChooseEnvironment once the environments were
+    revalidated.  Returns 1 while that is still running.
+    """
+    global _environment_chooser
+    if _environment_chooser is None:
+        return 0
+    bufnr, paths, generation = _environment_chooser
+    cache = get_environment_cache()
+    if cache.generation == generation:
+        if cache.refreshing():
+            return 1
+        _environment_chooser = None
+        return 0
+    _environment_chooser = None
+    if not int(VimCompat.call('bufloaded', bufnr)):
+        return 0
+    buf = vim.buffers[bufnr]
+    env_paths = [env.executable for env in cache.get(paths) or []]
+    if buf[:] != env_paths:
+        buf.options['modifiable'] = True
+        buf[:] = env_paths
+        buf.options['modifiable'] = False
+    return 0
+
+
+@vim_request
 @catch_and_print_exceptions
 def choose_environment_hit_enter():
     vim.vars['jedi#environment_path'] = vim.current.line
+    invalidate_settings()
     vim_command('bd')
 
 
+@vim_request
+@_check_jedi_availability(show_error=True)
 @catch_and_print_exceptions
 def load_project():
     path = vim.eval('a:args')
     vim.vars['jedi#project_path'] = path
+    invalidate_settings()
     env_path = vim_eval("g:jedi#environment_path")
     if env_path == 'auto':
         env_path = None
@@ -293,28 +677,608 @@ def load_project():
         path = project.path
         project.save()
 
-    global _current_project_cache
-    cache_key = dict(project_path=path,
-                     environment_path=env_path,
-                     added_sys_path=[])
-    _current_project_cache = cache_key, project
+    settings = get_settings()
+    project_cache.set((_project_cache_path(path), settings.environment_path,
+                       tuple(settings.added_sys_path)), project)
 
 
-@catch_and_print_exceptions
-def get_script(source=None):
-    jedi.settings.additional_dynamic_modules = [
-        b.name for b in vim.buffers if (
-            b.name is not None and
-            b.name.endswith('.py') and
-            b.options['buflisted'])]
-    if source is None:
-        source = '\n'.join(vim.current.buffer)
+def get_buffer_path():
     buf_path = vim.current.buffer.name
     if not buf_path:
         # If a buffer has no name its name is an empty string.
         buf_path = None
+    return buf_path
+
+
+class BufferSnapshot(object):
+    """
+    The lines and the joined source of a buffer at a given `b:changedtick`.
+
+    Instead of copying the whole buffer on every request, line-range changes
+    are tracked on the Vim side (see `jedi#_buffer_changes`) and only the
+    changed lines are fetched again.
+    """
+    def __init__(self, buf):
+        self.buffer = buf
+        self.changedtick = None
+        self.lines = None
+        self._source = None
+
+    @property
+    def source(self):
+        if self._source is None:
+            self._source = '\n'.join(self.lines)
+        return self._source
+
+    def update(self, changedtick, changes):
+        """
+        :param changes: List of `[lnum, end, added]` changes since the last
+            update (in the order they were made), or None if unknown.
+        """
+        if changedtick == self.changedtick:
+            return
+        self._source = None
+        self.changedtick = changedtick
+
+        buf = self.buffer
+        if changes is None or self.lines is None:
+            self.lines = buf[:]
+            return
+
+        lines = self.lines
+        for lnum, end, added in changes:
+            # Changed lines are fetched from the buffer below.
+            lines[lnum - 1:end - 1] = [None] * (end - lnum + added)
+        if len(lines) != len(buf):
+            # Should not happen, but better safe than sorry.
+            self.lines = buf[:]
+            return
+
+        i = 0
+        length = len(lines)
+        while i < length:
+            if lines[i] is None:
+                end = i + 1
+                while end < length and lines[end] is None:
+                    end += 1
+                lines[i:end] = buf[i:end]
+                i = end
+            else:
+                i += 1
+
+    def with_line(self, row, line):
+        """The source with the line at `row` (1-based) replaced."""
+        return '\n'.join(itertools.chain(
+            self.lines[:row - 1], [line], self.lines[row:]))
+
+
+_buffer_snapshots = {}
 
-    return jedi.Script(source, path=buf_path, project=get_project())
+
+def get_buffer_snapshot(buf=None):
+    """Returns the up to date `BufferSnapshot` for a buffer."""
+    if buf is None:
+        buf = vim.current.buffer
+    changedtick, known, changes = VimCompat.call('jedi#_buffer_changes',
+                                                 buf.number)
+    try:
+        snapshot = _buffer_snapshots[buf.number]
+    except KeyError:
+        snapshot = _buffer_snapshots[buf.number] = BufferSnapshot(buf)
+    if int(known):
+        changes = [(int(lnum), int(end), int(added))
+                   for lnum, end, added in changes]
+    else:
+        changes = None
+    snapshot.update(int(changedtick), changes)
+    return snapshot
+
+
+def forget_buffer(bufnr):
+    _buffer_snapshots.pop(bufnr, None)
+    _project_roots.pop(bufnr, None)
+    _settings_cache.pop(bufnr, None)
+    script_cache.drop_buffer(bufnr)
+
+
+class LRUCache(object):
+    """A least recently used cache that is safe to use from several threads."""
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, create):
+        """Returns the cached value for `key` or the one `create()` returns."""
+        with self._lock:
+            try:
+                value = self._values[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._values.move_to_end(key)
+                return value
+
+        # Not locked, creating the value might take a while.
+        value = create()
+        self.set(key, value)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def cached(self, key):
+        """Returns the cached value for `key` or None."""
+        with self._lock:
+            try:
+                value = self._values[key]
+            except KeyError:
+                return None
+            self.hits += 1
+            self._values.move_to_end(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+project_cache = LRUCache(maxsize=8)
+"""Recently used projects by project path, environment and added sys.path."""
+
+
+class ScriptCache(object):
+    """
+    Recently used `jedi.Script` objects, shared by all features.
+
+    Keys start with the buffer number and its `b:changedtick`.  All scripts
+    for a buffer are dropped once its changedtick changes.
+    """
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scripts = OrderedDict()
+        self._changedticks = {}
+        # Used from the background thread, too.
+        self._lock = threading.Lock()
+
+    def get(self, key, create):
+        """Returns the cached script for `key` or the one `create()` returns."""
+        bufnr, changedtick = key[:2]
+        with self._lock:
+            if self._changedticks.get(bufnr) != changedtick:
+                self._drop_buffer(bufnr)
+                self._changedticks[bufnr] = changedtick
+            try:
+                script = self._scripts[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._scripts.move_to_end(key)
+                return script
+
+            script = self._scripts[key] = create()
+            while len(self._scripts) > self.maxsize:
+                self._scripts.popitem(last=False)
+            return script
+
+    def drop_buffer(self, bufnr):
+        with self._lock:
+            self._drop_buffer(bufnr)
+            self._changedticks.pop(bufnr, None)
+
+    def _drop_buffer(self, bufnr):
+        for key in [k for k in self._scripts if k[0] == bufnr]:
+            del self._scripts[key]
+
+    def clear(self):
+        with self._lock:
+            self._scripts.clear()
+            self._changedticks.clear()
+
+
+script_cache = ScriptCache()
+
+
+class Metrics(object):
+    """
+    Latencies and result sizes per operation, shown by :JediStats.
+
+    Only the last `maxlen` measurements per operation are kept, next to the
+    total count.  Safe to use from the background thread.
+    """
+    def __init__(self, maxlen=1000):
+        self.maxlen = maxlen
+        self._operations = OrderedDict()
+        self._lock = threading.Lock()
+        self._sizes = threading.local()
+
+    def add(self, operation, seconds, size=None):
+        with self._lock:
+            try:
+                count, latencies, sizes = self._operations[operation]
+            except KeyError:
+                count = 0
+                latencies = deque(maxlen=self.maxlen)
+                sizes = deque(maxlen=self.maxlen)
+            latencies.append(seconds)
+            if size is not None:
+                sizes.append(size)
+            self._operations[operation] = count + 1, latencies, sizes
+
+    def measure(self, operation):
+        """
+        Decorator that records how long the function takes.  The size of its
+        result can be set with `set_size` meanwhile.
+        """
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                stack = self._size_stack()
+                stack.append(None)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add(operation, time.perf_counter() - start,
+                             stack.pop())
+            return wrapper
+        return decorator
+
+    def _size_stack(self):
+        try:
+            return self._sizes.stack
+        except AttributeError:
+            stack = self._sizes.stack = []
+            return stack
+
+    def set_size(self, size):
+        """Sets the result size of the innermost measured operation."""
+        stack = self._size_stack()
+        if stack:
+            stack[-1] = size
+
+    def summary(self):
+        """Returns a JSON serializable dict with the statistics."""
+        operations = OrderedDict()
+        with self._lock:
+            items = [(op, count, sorted(latencies), list(sizes))
+                     for op, (count, latencies, sizes)
+                     in self._operations.items()]
+        for operation, count, latencies, sizes in items:
+            ms = [round(seconds * 1000, 2) for seconds in latencies]
+            operation_summary = OrderedDict([
+                ('count', count),
+                ('p50_ms', _percentile(ms, 50)),
+                ('p95_ms', _percentile(ms, 95)),
+                ('max_ms', ms[-1]),
+            ])
+            if sizes:
+                operation_summary['mean_size'] = round(sum(sizes) / len(sizes), 1)
+                operation_summary['max_size'] = max(sizes)
+            operations[operation] = operation_summary
+
+        caches = OrderedDict()
+        for name, cache in (('scripts', script_cache),
+                            ('completions', completion_cache),
+                            ('signatures', signature_cache),
+                            ('docstrings', completion_docs._cache),
+                            ('documentation', documentation_cache)):
+            caches[name] = OrderedDict([('hits', cache.hits),
+                                        ('misses', cache.misses)])
+        return OrderedDict([('operations', operations), ('caches', caches),
+                            ('startup_ms', OrderedDict(
+                                (step, round(seconds * 1000, 2))
+                                for step, seconds in startup_times.items()))])
+
+    def clear(self):
+        with self._lock:
+            self._operations.clear()
+
+
+def _percentile(sorted_values, percent):
+    """The nearest-rank percentile of a non-empty sorted list."""
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[index]
+
+
+metrics = Metrics()
+
+
+@vim_request
+@catch_and_print_exceptions
+def show_stats():
+    summary = metrics.summary()
+    if not summary['operations']:
+        echo_highlight('No requests were measured yet.')
+        return
+    lines = ['%-24s %7s %9s %9s %9s %9s' % (
+        'operation', 'count', 'p50 ms', 'p95 ms', 'max ms', 'max size')]
+    for operation, values in summary['operations'].items():
+        lines.append('%-24s %7d %9.1f %9.1f %9.1f %9s' % (
+            operation, values['count'], values['p50_ms'], values['p95_ms'],
+            values['max_ms'], values.get('max_size', '')))
+    lines.append('')
+    for name, values in summary['caches'].items():
+        lines.append('%s cache: %d hits, %d misses' % (
+            name, values['hits'], values['misses']))
+    for line in lines:
+        vim_command('echo %s' % repr(PythonToVimStr(line)))
+
+
+@vim_request
+@catch_and_print_exceptions
+def dump_stats():
+    """Returns the statistics as JSON to Vim, see `jedi#stats_json()`."""
+    vim_return(json.dumps(metrics.summary(), indent=2))
+
+
+def get_script_key(snapshot, path, project, source=None):
+    """
+    :param source: Only needed if it is not the source of the snapshot.
+    """
+    return snapshot.buffer.number, snapshot.changedtick, path, project, source
+
+
+_worker_pools = {}
+"""Tuples of the worker settings and the pool, by purpose."""
+
+
+def get_worker_pool(settings, purpose='backend'):
+    """
+    Returns the pool for `g:jedi#backend` ("backend") or for searching
+    usages with `g:jedi#usages_workers` ("usages").
+    """
+    if purpose == 'usages':
+        size = settings.usages_workers
+    else:
+        size = settings.worker_count
+    key = (settings.worker_python, size, settings.worker_max_memory)
+    old_key, pool = _worker_pools.get(purpose, (None, None))
+    if key != old_key:
+        if pool is not None:
+            pool.shutdown()
+        pool = jedi_vim_worker.WorkerPool(
+            python=settings.worker_python,
+            size=size,
+            max_memory=settings.worker_max_memory * 1024,
+        )
+        _worker_pools[purpose] = key, pool
+    return pool
+
+
+@atexit.register
+def _shutdown_worker_pool():
+    for _, pool in _worker_pools.values():
+        pool.shutdown()
+
+
+def _project_args(project):
+    """The arguments for the `jedi.Project` in a worker process."""
+    return dict(path=str(project.path),
+                environment_path=project._environment_path,
+                added_sys_path=list(project.added_sys_path))
+
+
+def _script_factory(source, path, project, dynamic_modules, settings):
+    """
+    Returns a function that creates the script, which might be called on the
+    background thread.
+    """
+    if settings.backend == 'subprocess':
+        pool = get_worker_pool(settings)
+        project_args = _project_args(project)
+        jedi_settings = dict(
+            additional_dynamic_modules=dynamic_modules,
+            case_insensitive_completion=settings.case_insensitive_completion)
+        return lambda: jedi_vim_worker.RemoteScript(
+            pool, source, path, project_args, jedi_settings)
+    return lambda: jedi.Script(source, path=path, project=project)
+
+
+_import_regex = re.compile(
+    r'^[ \t]*(?:from[ \t]+(\.*)([\w.]*)[ \t]+import[ \t]+\(?([^#\n)]*)'
+    r'|import[ \t]+([^#\n;]*))',
+    re.MULTILINE)
+
+
+def _iter_imports(source, module_name, is_package):
+    """
+    Yields the dotted names imported by `source` (including the parent
+    packages).  This is a fast approximation based on regular expressions.
+    """
+    if module_name is None:
+        package = None
+    else:
+        package = module_name.split('.')
+        if not is_package:
+            package.pop()
+
+    for dots, from_name, from_names, import_names in \
+            _import_regex.findall(source):
+        names = []
+        if not dots and not from_name:
+            # import x, y as z
+            names = [part.split()[0] for part in import_names.split(',')
+                     if part.strip()]
+        else:
+            if dots:
+                if package is None:
+                    continue
+                base = package[:len(package) - len(dots) + 1]
+                if from_name:
+                    base = base + [from_name]
+                from_name = '.'.join(base)
+            if from_name:
+                names.append(from_name)
+            names += [from_name + '.' + part.split()[0]
+                      for part in from_names.split(',')
+                      if part.strip() and part.strip() != '*']
+
+        for name in names:
+            parts = name.split('.')
+            for i in range(1, len(parts) + 1):
+                yield '.'.join(parts[:i])
+
+
+def _get_module_names(path, roots):
+    """
+    Returns the possible dotted names of a module path below `roots` and if
+    it is a package.
+    """
+    names = []
+    is_package = False
+    for root in roots:
+        rel = os.path.relpath(path, root)
+        if rel.startswith(os.pardir):
+            continue
+        parts = os.path.splitext(rel)[0].split(os.sep)
+        if parts[-1] == '__init__':
+            parts.pop()
+            is_package = True
+        if parts and all(p.isidentifier() for p in parts):
+            names.append('.'.join(parts))
+    return names, is_package
+
+
+class DynamicModules(object):
+    """
+    Paths of Python buffers for jedi's dynamic analysis (see
+    `jedi.settings.additional_dynamic_modules`).
+
+    The listed Python buffers are tracked via autocommands, instead of
+    looking at all buffers for every request.  With the "imports" mode only
+    buffers that are reachable in the import graph of the current buffer are
+    used.
+    """
+    def __init__(self):
+        self._paths = None
+        self._imports_cache = {}
+
+    def _get_paths(self):
+        if self._paths is None:
+            self._paths = {}
+            for buf in vim.buffers:
+                self.update(buf.number)
+        return self._paths
+
+    def update(self, bufnr):
+        """Called when a buffer is added, renamed or (un)listed."""
+        if self._paths is None:
+            return
+        try:
+            buf = vim.buffers[bufnr]
+        except KeyError:
+            return self.remove(bufnr)
+        if (buf.name and buf.name.endswith('.py')
+                and buf.options['buflisted']):
+            self._paths[bufnr] = buf.name
+        else:
+            self.remove(bufnr)
+
+    def remove(self, bufnr):
+        """Called when a buffer is deleted."""
+        if self._paths is not None:
+            self._paths.pop(bufnr, None)
+        self._imports_cache.pop(bufnr, None)
+
+    def get(self, mode, path=None, project=None):
+        """
+        :param mode: "buffers" (all listed buffers) or "imports".
+        """
+        paths = self._get_paths()
+        if mode != 'imports' or path is None:
+            return list(paths.values())
+
+        roots = [str(project.path), os.path.dirname(path)]
+        roots += [str(p) for p in project.added_sys_path]
+        modules = {}
+        for bufnr, buf_path in paths.items():
+            for name in _get_module_names(buf_path, roots)[0]:
+                modules.setdefault(name, []).append(bufnr)
+
+        current = vim.current.buffer.number
+        reachable = {current}
+        todo = [current]
+        while todo:
+            bufnr = todo.pop()
+            for name in self._get_imports(bufnr, roots):
+                for imported in modules.get(name, ()):
+                    if imported not in reachable:
+                        reachable.add(imported)
+                        todo.append(imported)
+        return [paths[bufnr] for bufnr in reachable if bufnr in paths]
+
+    def _get_imports(self, bufnr, roots):
+        buf = vim.buffers[bufnr]
+        if int(VimCompat.call('bufloaded', bufnr)):
+            snapshot = get_buffer_snapshot(buf)
+            state = snapshot.changedtick
+        else:
+            snapshot = None
+            try:
+                state = os.path.getmtime(buf.name)
+            except OSError:
+                return set()
+
+        try:
+            cached_state, cached_roots, imports = self._imports_cache[bufnr]
+        except KeyError:
+            pass
+        else:
+            if cached_state == state and cached_roots == roots:
+                return imports
+
+        if snapshot is None:
+            try:
+                with open(buf.name, encoding='utf-8', errors='replace') as f:
+                    source = f.read()
+            except OSError:
+                return set()
+        else:
+            source = snapshot.source
+        names, is_package = _get_module_names(buf.name or '', roots)
+        imports = set(_iter_imports(source, names[0] if names else None,
+                                    is_package))
+        self._imports_cache[bufnr] = state, roots, imports
+        return imports
+
+
+dynamic_modules = DynamicModules()
+
+
+def get_dynamic_modules():
+    mode = get_settings().dynamic_modules
+    if mode == 'imports':
+        return dynamic_modules.get(mode, get_buffer_path(), get_project())
+    return dynamic_modules.get(mode)
+
+
+@catch_and_print_exceptions
+def get_script(source=None):
+    """
+    Returns a `jedi.Script` for the current buffer, or a proxy for one in a
+    worker process with `g:jedi#backend` set to "subprocess".
+    """
+    dynamic_modules = get_dynamic_modules()
+    jedi.settings.additional_dynamic_modules = dynamic_modules
+    snapshot = get_buffer_snapshot()
+    path = get_buffer_path()
+    project = get_project()
+    key = get_script_key(snapshot, path, project, source)
+    if source is None:
+        source = snapshot.source
+
+    return script_cache.get(key, _script_factory(
+        source, path, project, dynamic_modules, get_settings()))
 
 
 def get_pos(column=None):
@@ -324,72 +1288,518 @@ def get_pos(column=None):
     return row, column
 
 
+@vim_request
 @_check_jedi_availability(show_error=False)
 @catch_and_print_exceptions
 def completions():
+    settings = get_settings()
     jedi.settings.case_insensitive_completion = \
-        bool(int(vim_eval("get(b:, 'jedi_case_insensitive_completion', "
-                          "g:jedi#case_insensitive_completion)")))
+        settings.case_insensitive_completion
+
+    row, column = vim.current.window.cursor
+    # Clear call signatures in the buffer so they aren't seen by the completer.
+    # Call signatures in the command line can stay.
+    if settings.show_call_signatures == 1:
+        clear_call_signatures()
+    if vim.eval('a:findstart') == '1':
+        count = 0
+        for char in reversed(vim.current.line[:column]):
+            if not re.match(r'[\w\d]', char):
+                break
+            count += 1
+        vim.command('return %i' % (column - count))
+    else:
+        base = vim.eval('a:base')
+        start = time.perf_counter()
+        # Vim removed the base from the buffer, so this is the source jedi
+        # needs for unfiltered completions.
+        snapshot = get_buffer_snapshot()
+        path = get_buffer_path()
+        key = _completion_key(snapshot, path, row, column)
+        try:
+            def complete():
+                script = get_script()
+                return (script.complete(row, column),
+                        script.get_signatures(row, column))
+
+            completions, signatures = completion_cache.get(key, complete)
+            completions = _filter_completions(completions, base, settings)
+
+            generation = completion_docs.next_generation()
+            out = _completion_items(completions,
+                                    _completions_add_info(settings.completeopt),
+                                    path, generation)
+            completion_docs.store(generation, completions, path)
+            if _refresh_completions(settings):
+                # Vim can only filter by prefix and would lose matches.
+                out = dict(words=out, refresh='always')
+        except Exception:
+            # print to stdout, will be in :messages
+            print(traceback.format_exc())
+            out = []
+            completions = []
+            signatures = []
+        metrics.add('completions', time.perf_counter() - start,
+                    len(completions))
+
+        show_call_signatures(signatures)
+        vim_return(out)
+
+
+class CompletionDocs(object):
+    """
+    Docstrings of completions, which are only looked up once an item of the
+    popup menu gets selected (see `show_completion_info`).
+
+    Docstrings are cached by the full name of the completion, except for names
+    of the current buffer, which might have changed since.
+    """
+    def __init__(self, maxsize=256):
+        self._cache = LRUCache(maxsize)
+        self._generations = itertools.count()
+        self._completions = None, [], None
+
+    def next_generation(self):
+        """Identifies the completions of one popup menu in their user_data."""
+        return next(self._generations)
+
+    def store(self, generation, completions, path):
+        self._completions = generation, completions, path
+
+    def docstring(self, completion, path):
+        module_path = completion.module_path
+        if completion.full_name is None or module_path is None \
+                or str(module_path) == path:
+            return completion.docstring()
+        return self._cache.get((completion.full_name, completion.type),
+                               completion.docstring)
+
+    def resolve(self, user_data):
+        """Returns the docstring for an item's user_data or None."""
+        match = re.match(r'jedi-vim:(\d+):(\d+)$', user_data)
+        if match is None:
+            return None
+        generation, completions, path = self._completions
+        if int(match.group(1)) != generation:
+            return None
+        return self.docstring(completions[int(match.group(2))], path)
+
+    def clear(self):
+        self._cache.clear()
+        self._completions = None, [], None
+
+
+completion_docs = CompletionDocs()
+
+_supports_lazy_info = None
+
+
+def _completions_add_info(completeopt):
+    """
+    Returns "lazy" if the docstrings can be filled in once an item gets
+    selected, "eager" if they have to be part of the items or "".
+    """
+    global _supports_lazy_info
+    options = completeopt.split(",")
+    if "popup" in options or "popuphidden" in options:
+        if _supports_lazy_info is None:
+            _supports_lazy_info = bool(int(vim_eval(
+                "exists('*popup_findinfo') || exists('*nvim__complete_set')")))
+        if _supports_lazy_info:
+            return "lazy"
+        return "eager"
+    if "preview" in options:
+        # The preview window cannot be updated while the menu is open.
+        return "eager"
+    return ""
+
+
+completion_cache = LRUCache(maxsize=2)
+"""Unfiltered completions and signatures, see `_completion_key`."""
+
+
+def _completion_key(snapshot, path, row, column, source=None):
+    """
+    Completions are looked up without the identifier that is being typed and
+    filtered afterwards.  They only need to be computed again once the source
+    without that identifier changes.
+
+    :param source: Only needed if it is not the source of the snapshot.
+    """
+    if source is None:
+        source = snapshot.source
+    return (snapshot.buffer.number, path, get_project(), row, column,
+            source)
+
+
+def _fuzzy_match(name, base):
+    """
+    Returns None if the characters of `base` do not appear in `name` in
+    order, otherwise where the match starts and how long it is, to rank it.
+    """
+    start = name.find(base[0])
+    if start == -1:
+        return None
+    position = start + 1
+    for char in base[1:]:
+        position = name.find(char, position) + 1
+        if not position:
+            return None
+    return start, position - start
+
+
+def _filter_completions(completions, base, settings):
+    """
+    Narrows down completions looked up without a prefix to the ones matching
+    `base`.  Exact prefix matches come first, then case insensitive ones and
+    with `g:jedi#completion_filter` set to "fuzzy" the remaining fuzzy matches.
+    """
+    if base:
+        case_insensitive = settings.case_insensitive_completion
+        fuzzy = settings.completion_filter == 'fuzzy'
+        lower_base = base.lower()
+        exact = []
+        prefix = []
+        other = []
+        for c in completions:
+            name = c.name
+            if name.startswith(base):
+                exact.append(c)
+                continue
+            if case_insensitive:
+                name = name.lower()
+                if name.startswith(lower_base):
+                    prefix.append(c)
+                    continue
+            if fuzzy:
+                rank = _fuzzy_match(
+                    name, lower_base if case_insensitive else base)
+                if rank is not None:
+                    other.append((rank, c))
+        other.sort(key=lambda item: item[0])
+        completions = exact + prefix + [c for _, c in other]
+
+    if settings.max_completions > 0:
+        completions = completions[:settings.max_completions]
+    return completions
+
+
+def _refresh_completions(settings):
+    """Whether Vim has to ask for completions again for every typed char."""
+    return settings.completion_filter == 'fuzzy' or settings.max_completions > 0
+
+
+def _completion_items(completions, add_info, path=None, generation=None):
+    """
+    :param completions: Completions looked up without a prefix, see
+        `_filter_completions`.
+    """
+    out = []
+    for i, c in enumerate(completions):
+        d = dict(word=PythonToVimStr(c.complete),
+                 abbr=PythonToVimStr(c.name_with_symbols),
+                 # stuff directly behind the completion
+                 menu=PythonToVimStr(c.description),
+                 icase=1,  # case insensitive
+                 dup=1  # allow duplicates (maybe later remove this)
+                 )
+        if add_info == "lazy":
+            # Vim only opens the info popup for items with an info.
+            d["info"] = " "
+            d["user_data"] = "jedi-vim:%d:%d" % (generation, i)
+        elif add_info:
+            try:
+                d["info"] = PythonToVimStr(completion_docs.docstring(c, path))
+            except Exception:
+                print("jedi-vim: error with docstring for %r: %s" % (
+                    c, traceback.format_exc()))
+        out.append(d)
+    return out
+
+
+@_check_jedi_availability(show_error=False, wait=False)
+@catch_and_print_exceptions
+def show_completion_info():
+    """Fills the info popup of the selected completion (CompleteChanged)."""
+    user_data = vim_eval("get(v:event.completed_item, 'user_data', '')")
+    if not isinstance(user_data, str):
+        return
+    try:
+        docstring = completion_docs.resolve(user_data)
+    except Exception:
+        print("jedi-vim: error with docstring for %r: %s" % (
+            user_data, traceback.format_exc()))
+        return
+    if docstring is not None:
+        VimCompat.call('jedi#_set_completion_info', PythonToVimStr(docstring))
+
+
+_pending_completion = None
+"""The request state and future of the current asynchronous completion."""
+
+
+def _async_completion_job(key, script_key, create_script, dynamic_modules,
+                          settings, pos, base, add_info, path, generation):
+    """Runs on the background thread, must not use the vim module."""
+    def complete():
+        jedi.settings.additional_dynamic_modules = dynamic_modules
+        jedi.settings.case_insensitive_completion = \
+            settings.case_insensitive_completion
+        script = script_cache.get(script_key, create_script)
+        return script.complete(*pos), script.get_signatures(*pos)
+
+    completions, signatures = completion_cache.get(key, complete)
+    completions = _filter_completions(completions, base, settings)
+    out = _completion_items(completions, add_info, path, generation)
+    return completions, out, signatures
+
+
+def _async_completion_state():
+    """Everything that invalidates a pending completion when changed."""
+    bufnr, changedtick, mode = vim_eval("[bufnr('%'), b:changedtick, mode()]")
+    return (int(bufnr), int(changedtick), tuple(vim.current.window.cursor),
+            mode)
+
+
+@vim_request
+@_check_jedi_availability(show_error=False, wait=False)
+@catch_and_print_exceptions
+def complete_async():
+    """
+    Schedules a completion for the cursor position on the background thread.
+    Returns True, or `JEDI_BUSY` while the previous one is still running,
+    and it has to be tried again.
+
+    The result is polled for by `complete_async_poll` and dropped if the
+    buffer, the cursor or the mode has changed in the meantime.
+    """
+    global _pending_completion
+    autocomplete = int(vim.eval('a:autocomplete'))
+    completeopt = vim.eval('a:completeopt')
+    if _pending_completion is not None:
+        # Superseded, drop the result (or don't even start it).
+        _pending_completion[1].cancel()
+        _pending_completion = None
+
+    settings = get_settings()
+    # Call signatures in the buffer should not be seen by the completer.
+    if settings.show_call_signatures == 1:
+        clear_call_signatures()
+
+    state = _async_completion_state()
+    if state[3] != 'i':
+        return True
+    row, column = state[2]
+    line = vim.current.line
+    start = column
+    while start > 0 and re.match(r'[\w\d]', line[start - 1]):
+        start -= 1
+    base = line[start:column]
+
+    # Completions are looked up without the base, see `_completion_key`.
+    snapshot = get_buffer_snapshot()
+    source = snapshot.with_line(row, line[:start] + line[column:])
+    path = get_buffer_path()
+    key = _completion_key(snapshot, path, row, start, source)
+    add_info = _completions_add_info(completeopt)
+    generation = completion_docs.next_generation()
+    request = dict(state=state, startcol=start + 1, completeopt=completeopt,
+                   autocomplete=autocomplete, path=path, generation=generation,
+                   started=time.perf_counter())
+
+    cached = completion_cache.cached(key)
+    if cached is not None:
+        # Only the base changed, no need to wait for jedi.
+        completions = _filter_completions(cached[0], base, settings)
+        out = _completion_items(completions, add_info, path, generation)
+        _show_async_completions(request, completions, out, cached[1])
+        return True
+
+    project = get_project()
+    dynamic_modules = get_dynamic_modules()
+    future = background_runner.submit(
+        _async_completion_job,
+        key,
+        get_script_key(snapshot, path, project, source),
+        _script_factory(source, path, project, dynamic_modules, settings),
+        dynamic_modules,
+        settings,
+        (row, start),
+        base,
+        add_info,
+        path,
+        generation,
+    )
+    _pending_completion = request, future
+    return True
+
+
+@vim_request
+@catch_and_print_exceptions
+def complete_async_poll():
+    """Returns 1 while the pending completion is still being computed."""
+    global _pending_completion
+    if _pending_completion is None:
+        return 0
+    request, future = _pending_completion
+    if not future.done():
+        return 1
+    _pending_completion = None
+
+    if future.cancelled():
+        return 0
+    if request['state'] != _async_completion_state():
+        # Stale: the user moved on while jedi was busy.
+        return 0
+    try:
+        completions, out, signatures = future.result()
+    except Exception:
+        # print to stdout, will be in :messages
+        print(traceback.format_exc())
+        return 0
+
+    _show_async_completions(request, completions, out, signatures)
+    return 0
+
+
+def _show_async_completions(request, completions, out, signatures):
+    metrics.add('completions (async)', time.perf_counter() - request['started'],
+                len(completions))
+    completion_docs.store(request['generation'], completions, request['path'])
+    show_call_signatures(signatures)
+    VimCompat.call('jedi#_complete_async_show', request['startcol'], out,
+                   request['completeopt'], request['autocomplete'])
+
+
+WARMUP_PRIORITY = 10
+"""Warm-up jobs run after all other jobs on the background thread."""
+
+WARMUP_IDLE_SECONDS = 0.5
+"""Warm-up steps are only started this long after the last request."""
+
+
+def _warmup_buffer_job(script_key, create_script):
+    """Runs on the background thread, must not use the vim module."""
+    script_cache.get(script_key, create_script).get_signatures(1, 0)
+
+
+def _warmup_module_job(create_script, position):
+    """Runs on the background thread, must not use the vim module."""
+    create_script().complete(*position)
+
+
+class Warmup(object):
+    """
+    Fills jedi's caches in idle time (see `g:jedi#warmup`): parses buffers,
+    imports what they import and `g:jedi#preload_modules`.
+
+    The steps are submitted to the background thread one at a time by
+    `poll`, and not at all in insert mode or right after a request, so that
+    they hold `jedi_lock` only briefly and do not delay completions while
+    typing.  Requests that wait for `jedi_lock` only wait for the current
+    step, which imports a single module.
+    """
+    def __init__(self):
+        self._steps = deque()
+        self._future = None
+        self._done = 0
+        self._started = None
+        self._warmed = set()
+
+    @property
+    def total(self):
+        return self._done + len(self._steps) + (self._future is not None)
+
+    def add(self, key, job, *args):
+        """Queues a job, unless one with the same key was queued before."""
+        if key in self._warmed:
+            return
+        self._warmed.add(key)
+        if self._started is None:
+            self._started = time.time()
+        self._steps.append((job, args))
+
+    def poll(self, insert_mode):
+        """
+        Submits the next step once the current one is done.  Returns a tuple
+        of the number of steps done and the total, or None when all are done.
+        """
+        if self._future is not None:
+            if not self._future.done():
+                return self._done, self.total
+            # Failures are not reported, the step just didn't help.
+            self._future = None
+            self._done += 1
+        if not self._steps:
+            return None
+        idle = time.perf_counter() - _last_foreground_request
+        if not insert_mode and idle > WARMUP_IDLE_SECONDS:
+            job, args = self._steps.popleft()
+            self._future = background_runner.submit(job, *args,
+                                                    priority=WARMUP_PRIORITY)
+        return self._done, self.total
+
+    def finish(self):
+        """Returns the number of steps and the seconds they took."""
+        if self._started is None:
+            return 0, 0.0
+        result = self._done, time.time() - self._started
+        self._done = 0
+        self._started = None
+        return result
+
+    def clear(self):
+        self._warmed.clear()
+
+
+warmups = Warmup()
+
+
+@vim_request
+@_check_jedi_availability(show_error=False)
+@catch_and_print_exceptions
+def warmup():
+    """
+    Queues the warm-up of the current buffer: parsing it, then importing its
+    imports and `g:jedi#preload_modules` (like `jedi.preload_module`, but in
+    the project's environment).  They are run by `warmup_poll`.
+    """
+    settings = get_settings()
+    project = get_project()
+    snapshot = get_buffer_snapshot()
+    path = get_buffer_path()
+    dynamic_modules = get_dynamic_modules()
+    warmups.add(
+        get_script_key(snapshot, path, project),
+        _warmup_buffer_job,
+        get_script_key(snapshot, path, project),
+        _script_factory(snapshot.source, path, project, dynamic_modules,
+                        settings),
+    )
 
-    row, column = vim.current.window.cursor
-    # Clear call signatures in the buffer so they aren't seen by the completer.
-    # Call signatures in the command line can stay.
-    if int(vim_eval("g:jedi#show_call_signatures")) == 1:
-        clear_call_signatures()
-    if vim.eval('a:findstart') == '1':
-        count = 0
-        for char in reversed(vim.current.line[:column]):
-            if not re.match(r'[\w\d]', char):
-                break
-            count += 1
-        vim.command('return %i' % (column - count))
-    else:
-        base = vim.eval('a:base')
-        source = ''
-        for i, line in enumerate(vim.current.buffer):
-            # enter this path again, otherwise source would be incomplete
-            if i == row - 1:
-                source += line[:column] + base + line[column:]
-            else:
-                source += line
-            source += '\n'
-        # here again hacks, because jedi has a different interface than vim
-        column += len(base)
-        try:
-            script = get_script(source=source)
-            completions = script.complete(*get_pos(column))
-            signatures = script.get_signatures(*get_pos(column))
+    modules = list(dict.fromkeys(_iter_imports(snapshot.source, None, False)))
+    modules += settings.preload_modules
+    for name in modules:
+        source = 'import %s as x; x.' % name
+        warmups.add(
+            (project.path, settings.environment_path, settings.backend, name),
+            _warmup_module_job,
+            _script_factory(source, None, project, [], settings),
+            (1, len(source)),
+        )
 
-            add_info = \
-                any(option in vim.eval("&completeopt").split(",")
-                    for option in ("preview", "popup"))
-            out = []
-            for c in completions:
-                d = dict(word=PythonToVimStr(c.name[:len(base)] + c.complete),
-                         abbr=PythonToVimStr(c.name_with_symbols),
-                         # stuff directly behind the completion
-                         menu=PythonToVimStr(c.description),
-                         icase=1,  # case insensitive
-                         dup=1  # allow duplicates (maybe later remove this)
-                         )
-                if add_info:
-                    try:
-                        d["info"] = PythonToVimStr(c.docstring())
-                    except Exception:
-                        print("jedi-vim: error with docstring for %r: %s" % (
-                            c, traceback.format_exc()))
-                out.append(d)
-
-            strout = str(out)
-        except Exception:
-            # print to stdout, will be in :messages
-            print(traceback.format_exc())
-            strout = ''
-            completions = []
-            signatures = []
 
-        show_call_signatures(signatures)
-        vim.command('return ' + strout)
+@vim_request
+@catch_and_print_exceptions
+def warmup_poll():
+    """Returns 1 while the warm-up is not done, and reports the progress."""
+    progress = warmups.poll(vim_eval('mode()') in ('i', 'R'))
+    if progress is not None:
+        VimCompat.call('jedi#_warmup_progress', progress[0], progress[1], -1)
+        return 1
+    steps, seconds = warmups.finish()
+    VimCompat.call('jedi#_warmup_progress', steps, steps, seconds)
+    return 0
 
 
 @contextmanager
@@ -404,6 +1814,8 @@ def tempfile(content):
         os.unlink(f.name)
 
 
+@vim_request
+@metrics.measure('goto')
 @_check_jedi_availability(show_error=True)
 @catch_and_print_exceptions
 def goto(mode="goto"):
@@ -421,6 +1833,7 @@ def goto(mode="goto"):
         names = script.goto(*pos)
     elif mode == "stubs":
         names = script.goto(*pos, follow_imports=True, only_stubs=True)
+    metrics.set_size(len(names))
 
     if not names:
         echo_highlight("Couldn't find any definitions for this.")
@@ -443,43 +1856,49 @@ def _goto_specific_name(n, options=''):
                 % (name, n.full_name or n.name)
             )
     else:
-        using_tagstack = int(vim_eval('g:jedi#use_tag_stack')) == 1
-        result = set_buffer(n.module_path, options=options,
-                            using_tagstack=using_tagstack)
-        if not result:
-            return []
-        if (using_tagstack and n.module_path and
-                n.module_path.exists()):
-            tagname = n.name
-            with tempfile('{0}\t{1}\t{2}'.format(
-                    tagname, n.module_path, 'call cursor({0}, {1})'.format(
-                        n.line, n.column + 1))) as f:
-                old_tags = vim.eval('&tags')
-                old_wildignore = vim.eval('&wildignore')
-                try:
-                    # Clear wildignore to ensure tag file isn't ignored
-                    vim.command('set wildignore=')
-                    vim.command('let &tags = %s' %
-                                repr(PythonToVimStr(f.name)))
-                    vim.command('tjump %s' % tagname)
-                finally:
-                    vim.command('let &tags = %s' %
-                                repr(PythonToVimStr(old_tags)))
-                    vim.command('let &wildignore = %s' %
-                                repr(PythonToVimStr(old_wildignore)))
-        vim.current.window.cursor = n.line, n.column
-
-
-def relpath(path):
+        _goto_location(n.name, n.module_path, n.line, n.column, options)
+
+
+def _goto_location(tagname, path, line, column, options=''):
+    using_tagstack = get_settings().use_tag_stack
+    result = set_buffer(path, options=options, using_tagstack=using_tagstack)
+    if not result:
+        return []
+    if using_tagstack and path and path.exists():
+        with tempfile('{0}\t{1}\t{2}'.format(
+                tagname, path, 'call cursor({0}, {1})'.format(
+                    line, column + 1))) as f:
+            old_tags = vim.eval('&tags')
+            old_wildignore = vim.eval('&wildignore')
+            try:
+                # Clear wildignore to ensure tag file isn't ignored
+                vim.command('set wildignore=')
+                vim.command('let &tags = %s' %
+                            repr(PythonToVimStr(f.name)))
+                vim.command('tjump %s' % tagname)
+            finally:
+                vim.command('let &tags = %s' %
+                            repr(PythonToVimStr(old_tags)))
+                vim.command('let &wildignore = %s' %
+                            repr(PythonToVimStr(old_wildignore)))
+    vim.current.window.cursor = line, column
+
+
+def relpath(path, cwd=None):
     """Make path relative to cwd if it is below."""
+    if cwd is None:
+        cwd = os.getcwd()
     abspath = os.path.abspath(path)
-    if abspath.startswith(os.getcwd()):
-        return os.path.relpath(path)
+    if abspath.startswith(cwd):
+        return os.path.relpath(path, cwd)
     return path
 
 
-def annotate_description(n):
-    code = n.get_line_code().strip()
+def annotate_description(n, code=None):
+    """:param code: The line of the name, if known already."""
+    if code is None:
+        code = n.get_line_code()
+    code = code.strip()
     if n.type == 'statement':
         return code
     if n.type == 'function':
@@ -491,31 +1910,131 @@ def annotate_description(n):
     return '[%s] %s' % (typ, code)
 
 
+class _MappedLines(object):
+    """The lines of a memory-mapped file, found up to the ones needed."""
+    def __init__(self, data):
+        self._data = data
+        self._starts = [0]
+
+    def get(self, index):
+        starts = self._starts
+        while len(starts) <= index:
+            newline = self._data.find(b'\n', starts[-1])
+            if newline < 0:
+                return None
+            starts.append(newline + 1)
+        if starts[index] >= len(self._data):
+            return None
+        end = self._data.find(b'\n', starts[index])
+        return self._data[starts[index]:end if end >= 0 else len(self._data)]
+
+    def close(self):
+        self._data.close()
+
+
+class _ReadLines(list):
+    def get(self, index):
+        return self[index] if index < len(self) else None
+
+    def close(self):
+        pass
+
+
+class LineCache(object):
+    """
+    The lines of the files of many names, e.g. thousands of usages, for a
+    single request.  Each file is read once, files of `MMAP_SIZE` or more are
+    memory-mapped.  The lines of loaded buffers are taken from Vim instead,
+    because they might differ from the files.
+    """
+    MMAP_SIZE = 1024 * 1024
+
+    def __init__(self):
+        self._buffers = None
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        for lines in self._files.values():
+            if lines is not None:
+                lines.close()
+        self._files.clear()
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size >= self.MMAP_SIZE:
+                    return _MappedLines(mmap.mmap(f.fileno(), 0,
+                                                  access=mmap.ACCESS_READ))
+                return _ReadLines(f.read().splitlines())
+        except (OSError, ValueError):
+            return None
+
+    def get_line(self, path, lnum):
+        """Returns the line `lnum` (1-based) of a file or None."""
+        if self._buffers is None:
+            self._buffers = {
+                buf.name: buf for buf in vim.buffers
+                if buf.name and int(VimCompat.call('bufloaded', buf.number))}
+        buf = self._buffers.get(path)
+        if buf is not None:
+            return buf[lnum - 1] if 0 < lnum <= len(buf) else None
+        try:
+            lines = self._files[path]
+        except KeyError:
+            lines = self._files[path] = self._read(path)
+        if lines is None or lnum < 1:
+            return None
+        line = lines.get(lnum - 1)
+        if line is None:
+            return None
+        return line.decode('utf-8', 'replace').rstrip('\r')
+
+
+def _qf_items(names):
+    """
+    Returns the quickfix items for names, annotated in one pass, with the
+    lines of their files read once (see `LineCache`).
+    """
+    cwd = os.getcwd()
+    filenames = {}
+    items = []
+    with LineCache() as line_cache:
+        for n in names:
+            if n.column is None:
+                # Typically a namespace, in the future maybe other things as
+                # well.
+                items.append(dict(text=PythonToVimStr(n.description)))
+                continue
+            path = str(n.module_path)
+            try:
+                filename = filenames[path]
+            except KeyError:
+                filename = filenames[path] = PythonToVimStr(relpath(path, cwd))
+            code = line_cache.get_line(path, n.line)
+            items.append(dict(filename=filename, lnum=n.line, col=n.column + 1,
+                              text=PythonToVimStr(annotate_description(n, code))))
+    return items
+
+
 def show_goto_multi_results(names, mode):
     """Create (or reuse) a quickfix list for multiple names."""
     global _current_names
 
-    lst = []
+    lst = _qf_items(names)
     (row, col) = vim.current.window.cursor
     current_idx = None
     current_def = None
-    for n in names:
-        if n.column is None:
-            # Typically a namespace, in the future maybe other things as
-            # well.
-            lst.append(dict(text=PythonToVimStr(n.description)))
-        else:
-            text = annotate_description(n)
-            lst.append(dict(filename=PythonToVimStr(relpath(str(n.module_path))),
-                            lnum=n.line, col=n.column + 1,
-                            text=PythonToVimStr(text)))
-
+    for i, n in enumerate(names):
+        if n.column is not None:
             # Select current/nearest entry via :cc later.
             if n.line == row and n.column <= col:
                 if (current_idx is None
                         or (abs(lst[current_idx]["col"] - col)
                             > abs(n.column - col))):
-                    current_idx = len(lst)
+                    current_idx = i + 1
                     current_def = n
 
     # Build qflist title.
@@ -548,17 +2067,35 @@ def _same_names(a, b):
     Ref: https://github.com/davidhalter/jedi-vim/issues/952)
     """
     return all(
-        x._name.start_pos == y._name.start_pos
+        (x.line, x.column) == (y.line, y.column)
         and x.module_path == y.module_path
         and x.name == y.name
         for x, y in zip(a, b)
     )
 
 
+@vim_request
+@metrics.measure('usages')
+@_check_jedi_availability(show_error=True)
 @catch_and_print_exceptions
 def usages(visuals=True):
     script = get_script()
-    names = script.get_references(*get_pos())
+    settings = get_settings()
+    # Renaming always needs all usages.
+    scope = settings.usages_scope if visuals else 'project'
+    if scope == 'file':
+        names = script.get_references(*get_pos(), scope='file')
+    elif (visuals and (scope == 'tiered' or settings.usages_streaming)
+            and VimCompat.has('timers')):
+        return _stream_usages(script, settings)
+    elif settings.usages_workers > 0:
+        names, search = _reference_search(script, settings)
+        if search is not None:
+            names = sorted(names + search.run(), key=lambda n: (
+                str(n.module_path), n.line or 0, n.column or 0))
+    else:
+        names = script.get_references(*get_pos())
+    metrics.set_size(len(names))
     if not names:
         echo_highlight("No usages found here.")
         return names
@@ -582,17 +2119,197 @@ def usages(visuals=True):
     return names
 
 
+USAGES_PRIORITY = 5
+"""Streaming usages run after completions, but before the warm-up."""
+
+
+class UsagesStream(object):
+    """
+    The search for usages in the other files of the project (see
+    `g:jedi#usages_scope` and `g:jedi#usages_streaming`).  Its steps are
+    submitted to the background thread one at a time by `poll`, so that
+    completions can run in between.  A search in worker processes
+    (`g:jedi#usages_workers`) is only polled.
+    """
+    def __init__(self, search, names):
+        self.search = search
+        self.names = names
+        """The usages shown, extended with the ones found."""
+        self.started = time.perf_counter()
+        self._future = None
+        self._parallel = isinstance(
+            search, jedi_vim_references.ParallelReferenceSearch)
+        if not self._parallel:
+            self._submit()
+
+    def _submit(self):
+        self._future = background_runner.submit(self.search.step,
+                                                priority=USAGES_PRIORITY)
+
+    def poll(self):
+        """
+        Returns the usages found by the last step and submits the next one,
+        or None while the step is running.
+        """
+        if self._parallel:
+            names = self.search.collect()
+            return names if names or self.search.done else None
+        if not self._future.done():
+            return None
+        names = self._future.result()
+        if not self.search.done:
+            self._submit()
+        return names
+
+    def cancel(self):
+        if self._future is not None:
+            self._future.cancel()
+        self.search.cancel()
+
+
+def _reference_search(script, settings):
+    """
+    Returns the usages in the current file and the search for the ones in
+    the other files of the project (None without usages), which uses worker
+    processes with `g:jedi#usages_workers`.
+    """
+    row, column = pos = get_pos()
+    names = script.get_references(*pos, scope='file')
+    if not names:
+        return names, None
+    definitions = script.goto(*pos, follow_imports=True)
+
+    name = names[0].name
+    for n in names:
+        if n.line == row and n.column <= column <= n.column + len(n.name):
+            name = n.name
+    path = get_buffer_path()
+    project = get_project()
+    keys = set(map(jedi_vim_references.name_key, names))
+    first_paths = []
+    for d in definitions:
+        if d.module_path is None or d.line is None or d.in_builtin_module():
+            continue
+        if project.path in d.module_path.parents:
+            first_paths.append(str(d.module_path))
+        elif jedi_vim_references.name_key(d) not in keys:
+            # Like jedi, only search the project, but show the definition.
+            names.append(d)
+    sources = {buf.name: '\n'.join(buf[:]) for buf in vim.buffers
+               if buf.name and int(buf.options['modified'])}
+    kwargs = dict(
+        targets=map(jedi_vim_references.name_key, names + definitions),
+        searched=[path],
+        first_paths=first_paths,
+        sources=sources,
+        # Like jedi: parameters are local, short names are too common.
+        search_project=len(name) > 2 and not any(
+            n.type == 'param' for n in names + definitions),
+    )
+    if settings.usages_workers > 0:
+        search = jedi_vim_references.ParallelReferenceSearch(
+            get_worker_pool(settings, 'usages'), _project_args(project),
+            project, name, **kwargs)
+    else:
+        search = jedi_vim_references.ReferenceSearch(project, name, **kwargs)
+    return names, search
+
+
+def _stream_usages(script, settings):
+    """
+    Shows the usages in the current file and starts the search in the other
+    files of the project, whose results are added by `usages_poll`.
+    """
+    global _current_names, _usages_stream
+    names, search = _reference_search(script, settings)
+    metrics.set_size(len(names))
+    if not names:
+        echo_highlight("No usages found here.")
+        return names
+
+    clear_usages()
+    show_goto_multi_results(names, "usages")
+    _current_names = names
+    highlight_usages()
+    _usages_stream = UsagesStream(search, names)
+    vim_command('call jedi#_start_usages_stream()')
+    return names
+
+
 _current_names = None
 """Current definitions to use for highlighting."""
-_pending_names = {}
-"""Pending definitions for unloaded buffers."""
+_pending_usages = {}
+"""Pending usage positions for unloaded buffers, by buffer name."""
+_unplaced_usages = {}
+"""Sorted usage positions not highlighted yet by buffer number (lazy mode)."""
 _placed_names_in_buffers = set()
 """Set of buffers for faster cleanup."""
+_usages_stream = None
+"""The running `UsagesStream` of the current usages."""
+
+
+@vim_request
+@catch_and_print_exceptions
+def usages_poll():
+    """
+    Adds the usages found by the streaming search since the last call to the
+    quickfix list and highlights them.  Returns 1 while the search is running.
+    """
+    global _usages_stream
+    stream = _usages_stream
+    if stream is None:
+        return 0
+    try:
+        names = stream.poll()
+    except Exception:
+        _usages_stream = None
+        # print to stdout, will be in :messages
+        print(traceback.format_exc())
+        return 0
+    if names is None:
+        return 1
+
+    search = stream.search
+    if names:
+        context = id(stream.names)
+        if VimCompat.can_update_current_qflist_for_context(context) is False:
+            # Another quickfix list was created meanwhile, e.g. by :make.
+            cancel_usages()
+            return 0
+        stream.names.extend(names)
+        VimCompat.appendqflist(_qf_items(names))
+        _highlight_names(names)
+    if not search.done:
+        VimCompat.call('jedi#_usages_progress', search.files_searched,
+                       search.files_total, len(stream.names), -1)
+        return 1
+
+    _usages_stream = None
+    seconds = time.perf_counter() - stream.started
+    metrics.add('usages (streaming)', seconds, len(stream.names))
+    VimCompat.call('jedi#_usages_progress', search.files_searched,
+                   search.files_total, len(stream.names), seconds)
+    return 0
+
+
+@vim_request
+@catch_and_print_exceptions
+def cancel_usages():
+    """Stops the streaming search, the usages found so far are kept."""
+    global _usages_stream
+    stream = _usages_stream
+    if stream is None:
+        return
+    _usages_stream = None
+    stream.cancel()
+    echo_highlight('Stopped searching usages after {0:d} of {1:d} files.'.format(
+        stream.search.files_searched, stream.search.files_total))
 
 
 IS_NVIM = hasattr(vim, 'from_nvim')
 if IS_NVIM:
     vim_prop_add = None
+    _usages_namespace = None
 else:
     vim_prop_type_added = False
     try:
@@ -601,14 +2318,23 @@ else:
         vim_prop_add = None
     else:
         vim_prop_remove = vim.Function("prop_remove")
+        try:
+            vim_prop_add_list = vim.Function("prop_add_list")
+        except ValueError:
+            vim_prop_add_list = None
 
 
 def clear_usages():
     """Clear existing highlights."""
-    global _current_names
+    global _current_names, _usages_stream
+    if _usages_stream is not None:
+        _usages_stream.cancel()
+        _usages_stream = None
     if _current_names is None:
         return
     _current_names = None
+    _pending_usages.clear()
+    _unplaced_usages.clear()
 
     if IS_NVIM:
         for buf in _placed_names_in_buffers:
@@ -635,99 +2361,164 @@ def highlight_usages():
     """Set usage names to be highlighted.
 
     With Neovim it will use the nvim_buf_add_highlight API to highlight all
-    buffers already.
+    buffers already, in one batch per buffer.
 
     With Vim without support for text-properties only the current window is
     highlighted via matchaddpos, and autocommands are setup to highlight other
     windows on demand.  Otherwise Vim's text-properties are used.
+
+    With `g:jedi#highlight_usages_lazily` only the lines visible in windows
+    are highlighted, the others once they get scrolled into view.
     """
-    global _current_names, _pending_names
+    _pending_usages.clear()
+    _unplaced_usages.clear()
+    _highlight_names(_current_names)
 
-    names = _current_names
-    _pending_names = {}
 
+def _highlight_names(names):
+    """Highlights (some of) the current usages, see `highlight_usages`."""
     if IS_NVIM or vim_prop_add:
         bufs = {x.name: x for x in vim.buffers}
-        defs_per_buf = {}
+        positions_per_buf = {}
         for name in names:
             try:
                 buf = bufs[str(name.module_path)]
             except KeyError:
                 continue
-            defs_per_buf.setdefault(buf, []).append(name)
-
-        if IS_NVIM:
-            # We need to remember highlight ids with Neovim's API.
-            buf_src_ids = {}
-            for buf, names in defs_per_buf.items():
-                buf_src_ids[buf] = []
-                for name in names:
-                    src_id = _add_highlighted_name(buf, name)
-                    buf_src_ids[buf].append(src_id)
-            for buf, src_ids in buf_src_ids.items():
-                buf.vars['_jedi_usages_src_ids'] = src_ids
-        else:
-            for buf, names in defs_per_buf.items():
-                try:
-                    for name in names:
-                        _add_highlighted_name(buf, name)
-                except vim.error as exc:
-                    if exc.args[0].startswith('Vim:E275:'):
-                        # "Cannot add text property to unloaded buffer"
-                        _pending_names.setdefault(buf.name, []).extend(
-                            names)
+            position = _usage_position(name)
+            if position is not None:
+                positions_per_buf.setdefault(buf, []).append(position)
+
+        if get_settings().highlight_usages_lazily:
+            for buf, positions in positions_per_buf.items():
+                _unplaced_usages[buf.number] = sorted(
+                    _unplaced_usages.get(buf.number, []) + positions)
+            highlight_visible_usages()
+            if _unplaced_usages:
+                vim_command('call jedi#_setup_lazy_usages()')
+            return
+
+        for buf, positions in positions_per_buf.items():
+            _add_highlighted_usages(buf, positions)
     else:
         highlight_usages_for_vim_win()
 
 
+@vim_request
 def _handle_pending_usages_for_buf():
     """Add (pending) highlights for the current buffer (Vim with textprops)."""
     buf = vim.current.buffer
-    bufname = buf.name
     try:
-        buf_names = _pending_names[bufname]
+        positions = _pending_usages.pop(buf.name)
     except KeyError:
+        pass
+    else:
+        if get_settings().highlight_usages_lazily:
+            _unplaced_usages[buf.number] = sorted(positions)
+        else:
+            _add_highlighted_usages(buf, positions)
+    highlight_visible_usages()
+
+
+@vim_request
+@catch_and_print_exceptions
+def highlight_visible_usages():
+    """
+    Highlights the usages in (and around) the lines visible in the windows of
+    the current tab page (`g:jedi#highlight_usages_lazily`).
+    """
+    if not _unplaced_usages:
         return
-    for name in buf_names:
-        _add_highlighted_name(buf, name)
-    del _pending_names[bufname]
+    windows = vim_eval(
+        "map(filter(getwininfo(), 'v:val.tabnr == tabpagenr()'),"
+        " '[v:val.bufnr, v:val.topline, v:val.botline]')")
+    for bufnr, top, bottom in windows:
+        bufnr, top, bottom = int(bufnr), int(top), int(bottom)
+        positions = _unplaced_usages.get(bufnr)
+        if not positions:
+            continue
+        # Also highlight a screen above and below, for scrolling a bit.
+        height = bottom - top + 1
+        start = bisect.bisect_left(positions, (top - height,))
+        end = bisect.bisect_left(positions, (bottom + height + 1,))
+        if start == end:
+            continue
+        visible = positions[start:end]
+        del positions[start:end]
+        if not positions:
+            del _unplaced_usages[bufnr]
+        _add_highlighted_usages(vim.buffers[bufnr], visible)
 
 
-def _add_highlighted_name(buf, name):
-    lnum = name.line
-    start_col = name.column
+def forget_unplaced_usages(bufnr):
+    """Lazy highlights for a changed buffer would end up in wrong places."""
+    _unplaced_usages.pop(bufnr, None)
 
+
+def _usage_position(name):
+    """Returns the line, column and length of a name to highlight or None."""
     # Skip highlighting of module definitions that point to the start
     # of the file.
-    if name.type == 'module' and lnum == 1 and start_col == 0:
-        return
-
-    _placed_names_in_buffers.add(buf)
+    if name.type == 'module' and name.line == 1 and name.column == 0:
+        return None
 
     # TODO: validate that name.name is at this position?
     # Would skip the module definitions from above already.
+    return name.line, name.column, len(name.name)
+
+
+_NVIM_ADD_HIGHLIGHTS = """
+local buf, ns, positions = ...
+for _, p in ipairs(positions) do
+  vim.api.nvim_buf_add_highlight(buf, ns, 'jediUsage', p[1] - 1, p[2],
+                                 p[2] + p[3])
+end
+"""
+
+
+def _add_highlighted_usages(buf, positions):
+    """Highlights the positions of usages in a buffer, in a single call."""
+    global _usages_namespace, vim_prop_type_added
+    if not positions:
+        return
 
-    length = len(name.name)
-    if vim_prop_add:
-        # XXX: needs jediUsage highlight (via after/syntax/python.vim).
-        global vim_prop_type_added
-        if not vim_prop_type_added:
-            vim.eval("prop_type_add('jediUsage', {'highlight': 'jediUsage'})")
-            vim_prop_type_added = True
-        vim_prop_add(lnum, start_col+1, {
-            'type': 'jediUsage',
-            'bufnr': buf.number,
-            'length': length,
-        })
+    if IS_NVIM:
+        if _usages_namespace is None:
+            _usages_namespace = vim.funcs.nvim_create_namespace('jedi_usages')
+        vim.exec_lua(_NVIM_ADD_HIGHLIGHTS, buf.number, _usages_namespace,
+                     positions)
+        # We need to remember highlight ids with Neovim's API.
+        buf.vars['_jedi_usages_src_ids'] = [_usages_namespace]
+        _placed_names_in_buffers.add(buf)
         return
 
-    assert IS_NVIM
-    end_col = name.column + length
-    src_id = buf.add_highlight('jediUsage', lnum-1, start_col, end_col,
-                               src_id=0)
-    return src_id
+    # XXX: needs jediUsage highlight (via after/syntax/python.vim).
+    if not vim_prop_type_added:
+        vim.eval("prop_type_add('jediUsage', {'highlight': 'jediUsage'})")
+        vim_prop_type_added = True
+    try:
+        if vim_prop_add_list:
+            vim_prop_add_list(
+                {'type': 'jediUsage', 'bufnr': buf.number},
+                [[lnum, column + 1, lnum, column + 1 + length]
+                 for lnum, column, length in positions])
+        else:
+            for lnum, column, length in positions:
+                vim_prop_add(lnum, column + 1, {
+                    'type': 'jediUsage',
+                    'bufnr': buf.number,
+                    'length': length,
+                })
+    except vim.error as exc:
+        if exc.args[0].startswith('Vim:E275:'):
+            # "Cannot add text property to unloaded buffer"
+            _pending_usages.setdefault(buf.name, []).extend(positions)
+            return
+        raise
+    _placed_names_in_buffers.add(buf)
 
 
+@vim_request
 def highlight_usages_for_vim_win():
     """Highlight usages in the current window.
 
@@ -750,15 +2541,15 @@ def highlight_usages_for_vim_win():
     matchids = []
     if _current_names:
         buffer_path = vim.current.buffer.name
-        for name in _current_names:
-            if (str(name.module_path) or '') == buffer_path:
-                positions = [
-                    [name.line,
-                     name.column + 1,
-                     len(name.name)]
-                ]
-                expr = "matchaddpos('jediUsage', %s)" % repr(positions)
-                matchids.append(int(vim_eval(expr)))
+        positions = [
+            [name.line, name.column + 1, len(name.name)]
+            for name in _current_names
+            if (str(name.module_path) or '') == buffer_path
+        ]
+        # matchaddpos() takes up to 8 positions at once.
+        for i in range(0, len(positions), 8):
+            matchids.append(int(VimCompat.call(
+                'matchaddpos', 'jediUsage', positions[i:i + 8])))
 
     if matchids:
         vim.current.window.vars['_jedi_usages_vim_matchids'] = [
@@ -772,6 +2563,8 @@ def highlight_usages_for_vim_win():
     vim.current.buffer.vars['_jedi_usages_needs_clear'] = bool(matchids)
 
 
+@vim_request
+@metrics.measure('documentation')
 @_check_jedi_availability(show_error=True)
 @catch_and_print_exceptions
 def show_documentation():
@@ -783,42 +2576,175 @@ def show_documentation():
         names = []
         print("Exception, this shouldn't happen.")
         print(traceback.format_exc())
+    metrics.set_size(len(names))
 
     if not names:
         echo_highlight('No documentation found for that.')
         vim.command('return')
         return
 
+    docs = _documentation(names, get_buffer_path(),
+                          get_settings().environment_path)
+    text = DOCUMENTATION_SEPARATOR.join(
+        doc or '|No Docstring for %s|' % n for n, doc in zip(names, docs))
+    vim.vars['_jedi_documentation'] = PythonToVimStr(text)
+    return True
+
+
+DOCUMENTATION_SEPARATOR = '\n' + '-' * 79 + '\n'
+
+documentation_cache = LRUCache(maxsize=256)
+"""Rendered documentation by `_documentation_key`."""
+
+
+def _documentation_key(name, path, environment_path):
+    """
+    Returns the key of the documentation of a name in `documentation_cache`,
+    or None if it is not cached: names without a full name, and the ones of
+    the current buffer, which might have changed since.  The modification
+    time of the module drops it once the module was changed.
+    """
+    if name.full_name is None:
+        return None
+    module_path = name.module_path
+    mtime = None
+    if module_path is not None:
+        if str(module_path) == path:
+            return None
+        try:
+            mtime = os.stat(module_path).st_mtime
+        except OSError:
+            return None
+    return (environment_path, name.full_name, name.type, str(module_path),
+            mtime)
+
+
+def _render_documentation(name):
+    doc = name.docstring()
+    if not doc:
+        return ''
+    title = 'Docstring for %s %s' % (name.type, name.full_name or name.name)
+    return '%s\n%s\n%s' % (title, '=' * len(title), doc)
+
+
+def _documentation(names, path, environment_path):
+    """
+    Returns the rendered documentation of each name, or '' for the ones
+    without a docstring.
+    """
     docs = []
     for n in names:
-        doc = n.docstring()
-        if doc:
-            title = 'Docstring for %s %s' % (n.type, n.full_name or n.name)
-            underline = '=' * len(title)
-            docs.append('%s\n%s\n%s' % (title, underline, doc))
+        key = _documentation_key(n, path, environment_path)
+        if key is None:
+            docs.append(_render_documentation(n))
         else:
-            docs.append('|No Docstring for %s|' % n)
-        text = ('\n' + '-' * 79 + '\n').join(docs)
-        vim.command('let l:doc = %s' % repr(PythonToVimStr(text)))
-        vim.command('let l:doc_lines = %s' % len(text.split('\n')))
+            docs.append(documentation_cache.get(
+                key, lambda n=n: _render_documentation(n)))
+    return docs
+
+
+def _hover_documentation_job(script_key, create_script, dynamic_modules, pos,
+                             path, environment_path):
+    """Runs on the background thread, must not use the vim module."""
+    jedi.settings.additional_dynamic_modules = dynamic_modules
+    names = script_cache.get(script_key, create_script).help(*pos)
+    docs = _documentation(names, path, environment_path)
+    return DOCUMENTATION_SEPARATOR.join(doc for doc in docs if doc)
+
+
+_pending_hover = None
+"""The request and future of the documentation looked up for hovering."""
+
+
+@vim_request
+@_check_jedi_availability(show_error=False, wait=False)
+@catch_and_print_exceptions
+def hover_documentation():
+    """
+    Looks up the documentation of the name under the cursor on the
+    background thread (see `g:jedi#hover_documentation`).  Returns True if
+    it does, and `hover_documentation_poll` shows it then.
+    """
+    global _pending_hover
+    if _pending_hover is not None:
+        _pending_hover[1].cancel()
+        _pending_hover = None
+    row, column = get_pos()
+    if not re.match(r'\w', vim.current.line[column:column + 1]):
+        return False
+
+    settings = get_settings()
+    snapshot = get_buffer_snapshot()
+    path = get_buffer_path()
+    project = get_project()
+    dynamic_modules = get_dynamic_modules()
+    future = background_runner.submit(
+        _hover_documentation_job,
+        get_script_key(snapshot, path, project),
+        _script_factory(snapshot.source, path, project, dynamic_modules,
+                        settings),
+        dynamic_modules,
+        (row, column),
+        path,
+        settings.environment_path,
+    )
+    request = dict(state=_async_completion_state(),
+                   started=time.perf_counter())
+    _pending_hover = request, future
     return True
 
 
+@vim_request
+@catch_and_print_exceptions
+def hover_documentation_poll():
+    """
+    Returns 1 while the documentation for hovering is being looked up.  It is
+    dropped if the buffer, the cursor or the mode has changed meanwhile.
+    """
+    global _pending_hover
+    if _pending_hover is None:
+        return 0
+    request, future = _pending_hover
+    if not future.done():
+        return 1
+    _pending_hover = None
+
+    if future.cancelled() or request['state'] != _async_completion_state():
+        return 0
+    try:
+        text = future.result()
+    except Exception:
+        # print to stdout, will be in :messages
+        print(traceback.format_exc())
+        return 0
+    metrics.add('documentation (hover)',
+                time.perf_counter() - request['started'])
+    if text:
+        VimCompat.call('jedi#_show_hover_documentation', PythonToVimStr(text))
+    return 0
+
+
+@vim_request
 @catch_and_print_exceptions
 def clear_call_signatures():
+    settings = get_settings()
     # Check if using command line call signatures
-    if int(vim_eval("g:jedi#show_call_signatures")) == 2:
+    if settings.show_call_signatures == 2:
         vim_command('echo ""')
         return
+    if settings.show_call_signatures == 3:
+        # Popups or virtual text, the buffer was not changed.
+        VimCompat.call('jedi#_clear_call_signature_popups')
+        return
     cursor = vim.current.window.cursor
-    e = vim_eval('g:jedi#call_signature_escape')
+    e = settings.call_signature_escape
     # We need two turns here to search and replace certain lines:
     # 1. Search for a line with a call signature and save the appended
     #    characters
     # 2. Actually replace the line and redo the status quo.
     py_regex = r'%sjedi=([0-9]+), (.*?)%s.*?%sjedi%s'.replace(
         '%s', re.escape(e))
-    for i, line in enumerate(vim.current.buffer):
+    for i, line in enumerate(get_buffer_snapshot().lines):
         match = re.search(py_regex, line)
         if match is not None:
             # Some signs were added to minimize syntax changes due to call
@@ -830,10 +2756,15 @@ def clear_call_signatures():
     vim.current.window.cursor = cursor
 
 
-@_check_jedi_availability(show_error=False)
+@vim_request
+@metrics.measure('signatures')
+@_check_jedi_availability(show_error=False, wait=False)
 @catch_and_print_exceptions
 def show_call_signatures(signatures=()):
-    if int(vim_eval("has('conceal') && g:jedi#show_call_signatures")) == 0:
+    settings = get_settings()
+    if not settings.show_call_signatures:
+        return
+    if not (settings.conceal or settings.show_call_signatures == 3):
         return
 
     # We need to clear the signatures before we calculate them again. The
@@ -841,13 +2772,16 @@ def show_call_signatures(signatures=()):
     # buffer.
     clear_call_signatures()
     if signatures == ():
-        signatures = get_script().get_signatures(*get_pos())
+        signatures = get_signatures()
+    metrics.set_size(len(signatures))
 
     if not signatures:
         return
 
-    if int(vim_eval("g:jedi#show_call_signatures")) == 2:
+    if settings.show_call_signatures == 2:
         return cmdline_call_signatures(signatures)
+    if settings.show_call_signatures == 3:
+        return popup_call_signatures(signatures)
 
     seen_sigs = []
     for i, signature in enumerate(signatures):
@@ -886,11 +2820,7 @@ def show_call_signatures(signatures=()):
         text = ' ' * (insert_column - len(line)) + text
         end_column = insert_column + len(text) - 2  # -2 due to bold symbols
 
-        # Need to decode it with utf8, because vim returns always a python 2
-        # string even if it is unicode.
-        e = vim_eval('g:jedi#call_signature_escape')
-        if hasattr(e, 'decode'):
-            e = e.decode('UTF-8')
+        e = settings.call_signature_escape
         # replace line before with cursor
         regex = "xjedi=%sx%sxjedix".replace('x', e)
 
@@ -910,7 +2840,243 @@ def show_call_signatures(signatures=()):
         tup = '%s, %s' % (len(add), replace)
         repl = prefix + (regex % (tup, text)) + add + line[end_column:]
 
-        vim_eval('setline(%s, %s)' % (line_to_replace, repr(PythonToVimStr(repl))))
+        VimCompat.call('setline', line_to_replace, PythonToVimStr(repl))
+
+
+class CachedParam(NamedTuple):
+    name: str
+    description: str
+    kind: str
+
+
+class CachedSignature(NamedTuple):
+    """The parts of a `jedi.api.classes.Signature` needed to show it."""
+    name: str
+    params: list
+    bracket_start: tuple
+    index: Optional[int]
+
+
+class Call(NamedTuple):
+    """
+    A call around the cursor, as found by `find_call`.  Its arguments up to
+    the cursor are tuples of the number of stars, the name at the start (if
+    any) and whether it is a keyword argument.
+    """
+    bracket_start: tuple
+    callee: str
+    arguments: tuple
+
+
+_SIGNATURE_SCAN_LINES = 30
+"""How many lines above the cursor `find_call` looks for the bracket."""
+
+
+def find_call(lines, row, column):
+    """
+    Finds the innermost open "(" before the cursor with a rough scan of the
+    lines above it, ignoring strings and comments.  Returns None if there is
+    none or it is not an obvious call.
+    """
+    stack = []
+    quote = None
+    for r in range(max(1, row - _SIGNATURE_SCAN_LINES), row + 1):
+        line = lines[r - 1]
+        if r == row:
+            line = line[:column]
+        i = 0
+        while i < len(line):
+            char = line[i]
+            if quote is not None:
+                if char == '\\':
+                    i += 2
+                elif line.startswith(quote, i):
+                    i += len(quote)
+                    quote = None
+                else:
+                    i += 1
+                continue
+            if char == '#':
+                break
+            if char in '"\'':
+                quote = line[i:i + 3]
+                if quote not in ('"""', "'''"):
+                    quote = char
+                i += len(quote)
+                continue
+            if char in '([{':
+                # bracket, its position and where its arguments start
+                stack.append((char, (r, i), [(r, i + 1)]))
+            elif char in ')]}':
+                if stack:
+                    stack.pop()
+            elif char == ',' and stack:
+                stack[-1][2].append((r, i + 1))
+            i += 1
+        if quote is not None and len(quote) == 1:
+            quote = None
+    if quote is not None:
+        return None
+
+    for char, (r, c), starts in reversed(stack):
+        if char == '(':
+            break
+    else:
+        return None
+    match = re.search(r'[\w.]+\s*$', lines[r - 1][:c])
+    if match is None or match.group(0)[0].isdigit():
+        return None
+
+    arguments = []
+    ends = [(sr, sc - 1) for sr, sc in starts[1:]] + [(row, column)]
+    for (start_row, start_column), (end_row, end_column) in zip(starts, ends):
+        if start_row == end_row:
+            text = lines[start_row - 1][start_column:end_column]
+        else:
+            text = '\n'.join([lines[start_row - 1][start_column:]]
+                             + lines[start_row:end_row - 1]
+                             + [lines[end_row - 1][:end_column]])
+        text = text.strip()
+        if not text and len(starts) == 1:
+            break
+        stars = len(text) - len(text.lstrip('*'))
+        name = re.match(r'([^\W\d]\w*)\s*(=(?!=))?', text[stars:])
+        if name is not None \
+                and (name.group(2) or stars + name.end() == len(text)):
+            arguments.append((stars, name.group(1), bool(name.group(2))))
+        elif stars == len(text):
+            # Nothing typed yet, which may still become a keyword
+            arguments.append((stars, '', False))
+        else:
+            arguments.append((stars, None, False))
+    return Call((r, c), match.group(0).rstrip(), tuple(arguments))
+
+
+def _signature_index(params, call):
+    """The index of the current param, computed like jedi's."""
+    if not call.arguments:
+        return 0 if params else None
+
+    positional_count = 0
+    used_names = set()
+    is_kwarg = False
+    for i, (stars, key_start, had_equal) in enumerate(call.arguments):
+        is_kwarg |= had_equal or stars == 2
+        if not stars and i + 1 != len(call.arguments):
+            if had_equal:
+                used_names.add(key_start)
+            else:
+                positional_count += 1
+
+    for i, param in enumerate(params):
+        kind = param.kind
+        if not is_kwarg:
+            if kind == 'VAR_POSITIONAL':
+                return i
+            if kind in ('POSITIONAL_OR_KEYWORD', 'POSITIONAL_ONLY') \
+                    and i == positional_count:
+                return i
+        if key_start is not None and stars != 1 or stars == 2:
+            if param.name not in used_names \
+                    and (kind == 'KEYWORD_ONLY'
+                         or kind == 'POSITIONAL_OR_KEYWORD'
+                         and positional_count <= i):
+                if stars:
+                    return i
+                if had_equal:
+                    if param.name == key_start:
+                        return i
+                elif param.name.startswith(key_start):
+                    return i
+            if kind == 'VAR_KEYWORD':
+                return i
+    return None
+
+
+def _cached_signature(signature):
+    params = [CachedParam(p.name, p.description,
+                          getattr(p.kind, 'name', p.kind))
+              for p in signature.params]
+    return CachedSignature(signature.name, params,
+                           tuple(signature.bracket_start), signature.index)
+
+
+signature_cache = LRUCache(maxsize=16)
+"""Signatures by buffer, bracket position and callee, see `get_signatures`."""
+
+
+def get_signatures():
+    """
+    Returns the signatures for the cursor position.
+
+    While the cursor stays within the same call (with an unchanged position
+    of the bracket and callee, and unchanged lines before and after it) only
+    the index of the current param is computed again, jedi is not asked.
+    Signatures are only cached if jedi agrees with `find_call` about the
+    bracket and the index.
+    """
+    row, column = vim.current.window.cursor
+    snapshot = get_buffer_snapshot()
+    call = find_call(snapshot.lines, row, column)
+    if call is None:
+        return get_script().get_signatures(row, column)
+
+    # The lines are mostly the same objects (see `BufferSnapshot`), whose
+    # hashes Python caches.
+    lines = snapshot.lines
+    key = (snapshot.buffer.number, get_buffer_path(), call.bracket_start,
+           call.callee, hash(tuple(lines[:call.bracket_start[0] - 1])),
+           hash(tuple(lines[row:])))
+    cached = signature_cache.cached(key)
+    if cached is not None:
+        return [s._replace(index=_signature_index(s.params, call))
+                for s in cached]
+
+    signatures = get_script().get_signatures(row, column)
+    if signatures:
+        cached = [_cached_signature(s) for s in signatures]
+        if all(s.bracket_start == call.bracket_start
+               and s.index == _signature_index(s.params, call)
+               for s in cached):
+            signature_cache.set(key, cached)
+    return signatures
+
+
+@catch_and_print_exceptions
+def popup_call_signatures(signatures):
+    """
+    Shows the signatures above their brackets in popups (Vim) or as virtual
+    text (Neovim), see `jedi#_show_call_signature_popups()`.
+    """
+    entries = []
+    seen_sigs = []
+    for signature in signatures:
+        params = [p.description.replace('\n', '').replace('param ', '', 1)
+                  for p in signature.params]
+        if params in seen_sigs:
+            continue
+        seen_sigs.append(params)
+
+        text = '%s(%s)' % (signature.name, ', '.join(params))
+        # The byte range of the current param, for highlighting it.
+        current = []
+        index = signature.index
+        if index is not None and index < len(params):
+            before = '%s(%s' % (signature.name, ', '.join(params[:index]))
+            if index:
+                before += ', '
+            current = [len(before.encode('utf-8')),
+                       len(params[index].encode('utf-8'))]
+
+        line, column = signature.bracket_start
+        entries.append(dict(
+            lnum=line,
+            col=column + 1,
+            offset=len(signature.name),
+            text=PythonToVimStr(text),
+            current=current,
+        ))
+    VimCompat.call('jedi#_show_call_signature_popups', entries)
 
 
 @catch_and_print_exceptions
@@ -935,10 +3101,11 @@ def cmdline_call_signatures(signatures):
 
     index = next(iter(s.index for s in signatures if s.index is not None), None)
 
+    settings = get_settings()
     # Allow 12 characters for showcmd plus 18 for ruler - setting
     # noruler/noshowcmd here causes incorrect undo history
-    max_msg_len = int(vim_eval('&columns')) - 12
-    if int(vim_eval('&ruler')):
+    max_msg_len = settings.columns - 12
+    if settings.ruler:
         max_msg_len -= 18
     max_msg_len -= len(signatures[0].name) + 2  # call name + parentheses
 
@@ -973,8 +3140,8 @@ def cmdline_call_signatures(signatures):
     if index is not None:
         max_num_spaces -= len(join())
     _, column = signatures[0].bracket_start
-    spaces = min(int(vim_eval('g:jedi#first_col +'
-                              'wincol() - col(".")')) +
+    spaces = min(settings.first_col +
+                 int(vim_eval('wincol() - col(".")')) +
                  column - len(signatures[0].name),
                  max_num_spaces) * ' '
 
@@ -996,6 +3163,7 @@ def cmdline_call_signatures(signatures):
                     % (spaces, signatures[0].name, text))
 
 
+@vim_request
 @_check_jedi_availability(show_error=True)
 @catch_and_print_exceptions
 def rename(delete_word=True):
@@ -1047,6 +3215,9 @@ def rename(delete_word=True):
             return do_rename(replace)
 
 
+@vim_request
+@_check_jedi_availability(show_error=True)
+@catch_and_print_exceptions
 def rename_visual(use_selected_text_as_prompt_answer=False):
     orig = vim.eval('getline(".")[(getpos("\'<")[2]-1):getpos("\'>")[2]'
                     '-((&selection ==# "exclusive") ? 2 : 1)]')
@@ -1061,7 +3232,15 @@ def rename_visual(use_selected_text_as_prompt_answer=False):
     do_rename(replace, orig)
 
 
+@metrics.measure('rename')
+@_check_jedi_availability(show_error=True)
 def do_rename(replace, orig=None):
+    """
+    Renames all usages, grouped per file.  Loaded buffers are changed in
+    place without switching windows.  Other files are handled according to
+    `g:jedi#rename_unloaded_files`.  All changes end up in the quickfix list.
+    """
+    global _rename_backups
     if not len(replace):
         echo_highlight('No rename possible without name.')
         return
@@ -1073,68 +3252,289 @@ def do_rename(replace, orig=None):
         echo_highlight('Jedi did 0 renames.')
         return
 
-    # Save original window / tab.
-    saved_tab = int(vim_eval('tabpagenr()'))
-    saved_win = int(vim_eval('winnr()'))
-
+    mode = get_settings().rename_unloaded_files
+    script = get_script()
+    pos = get_pos()
     temp_rename = usages(visuals=False)
-    # Sort the whole thing reverse (positions at the end of the line
-    # must be first, because they move the stuff before the position).
-    temp_rename = sorted(temp_rename, reverse=True,
-                         key=lambda x: (str(x.module_path), x.line, x.column))
-    buffers = set()
+    positions_per_path = {}
     for r in temp_rename:
-        if r.in_builtin_module():
+        if r.in_builtin_module() or r.module_path is None:
+            continue
+        positions_per_path.setdefault(str(r.module_path), {}).setdefault(
+            r.line, []).append(r.column)
+
+    loaded = {buf.name: buf for buf in vim.buffers
+              if int(VimCompat.call('bufloaded', buf.number))}
+    unloaded = [path for path in positions_per_path if path not in loaded]
+    refactoring_files = {}
+    if unloaded and mode == 'refactoring':
+        refactoring_files = _refactoring_changed_files(script, pos, replace)
+
+    count = 0
+    buffers = []
+    backups = []
+    failed = []
+    qf_items = []
+    for path in sorted(positions_per_path):
+        positions = positions_per_path[path]
+        buf = loaded.get(path)
+        if buf is None and mode == 'open':
+            bufnr = int(VimCompat.call('bufadd', path))
+            VimCompat.call('bufload', bufnr)
+            VimCompat.call('setbufvar', bufnr, '&buflisted', 1)
+            buf = vim.buffers[bufnr]
+
+        try:
+            if buf is not None:
+                renamed = _rename_in_buffer(buf, positions, orig, replace)
+                buffers.append(buf.name)
+            else:
+                renamed, backup = _rename_on_disk(
+                    path, positions, orig, replace,
+                    refactoring_files.get(path))
+                if backup is not None:
+                    backups.append(backup)
+        except (OSError, UnicodeError, vim.error) as e:
+            print('Failed to rename in %s: %s' % (path, e))
+            failed.append(relpath(path))
             continue
 
-        result = set_buffer(r.module_path)
-        if not result:
-            echo_highlight('Failed to create buffer window for %s!' % (r.module_path))
+        count += len(renamed)
+        for lnum, column, line in renamed:
+            qf_items.append(dict(filename=PythonToVimStr(relpath(path)),
+                                 lnum=lnum, col=column + 1,
+                                 text=PythonToVimStr(line.strip())))
+
+    metrics.set_size(count)
+    if backups:
+        _rename_backups = backups
+    VimCompat.setqflist(qf_items, 'jedi rename: %s -> %s' % (orig, replace),
+                        id(qf_items))
+
+    files = len(buffers) + len(backups)
+    if backups:
+        summary = ('Jedi did {0:d} renames in {1:d} files, {2:d} of them on '
+                   'disk (:JediUndoRename reverts those)!'.format(
+                       count, files, len(backups)))
+    elif files > 1:
+        summary = 'Jedi did {0:d} renames in {1:d} buffers!'.format(
+            count, files)
+    else:
+        summary = 'Jedi did {0:d} renames!'.format(count)
+    if failed:
+        summary += ' Failed in: {0}'.format(', '.join(failed))
+    echo_highlight(summary)
+
+
+_rename_backups = []
+"""Original and new source of the files the last rename changed on disk."""
+
+
+def _rename_line(line, columns, orig, replace):
+    """Returns the line with `orig` at `columns` replaced and the columns of
+    the new names."""
+    renamed = []
+    for column in sorted(columns, reverse=True):
+        if line[column:column + len(orig)] != orig:
             continue
+        line = line[:column] + replace + line[column + len(orig):]
+        renamed = [c + len(replace) - len(orig) for c in renamed]
+        renamed.append(column)
+    return line, renamed[::-1]
 
-        buffers.add(vim.current.buffer.name)
 
-        # Replace original word.
-        r_line = vim.current.buffer[r.line - 1]
-        vim.current.buffer[r.line - 1] = (r_line[:r.column] + replace +
-                                          r_line[r.column + len(orig):])
+def _rename_in_buffer(buf, positions, orig, replace):
+    """
+    Changes a loaded buffer without making it the current one, assigning
+    consecutive changed lines at once.  Returns the renamed positions.
+    """
+    renamed = []
+    changed = {}
+    for lnum in sorted(positions):
+        line, columns = _rename_line(buf[lnum - 1], positions[lnum], orig,
+                                     replace)
+        if columns:
+            changed[lnum] = line
+            renamed.extend((lnum, column, line) for column in columns)
+
+    lnums = sorted(changed)
+    while lnums:
+        first = last = lnums.pop(0)
+        while lnums and lnums[0] == last + 1:
+            last = lnums.pop(0)
+        buf[first - 1:last] = [changed[lnum]
+                               for lnum in range(first, last + 1)]
+    return renamed
+
+
+def _refactoring_changed_files(script, pos, replace):
+    """The new source per path from jedi's `Script.rename` or {}."""
+    try:
+        refactoring = script.rename(*pos, new_name=replace)
+    except Exception:
+        # E.g. the worker backend, or jedi refusing the rename.
+        print(traceback.format_exc())
+        return {}
+    return {str(path): changed_file.get_new_code()
+            for path, changed_file in refactoring.get_changed_files().items()}
 
-    # Restore previous tab and window.
-    vim_command('tabnext {0:d}'.format(saved_tab))
-    vim_command('{0:d}wincmd w'.format(saved_win))
 
-    if len(buffers) > 1:
-        echo_highlight('Jedi did {0:d} renames in {1:d} buffers!'.format(
-            len(temp_rename), len(buffers)))
+def _rename_on_disk(path, positions, orig, replace, new_source=None):
+    """
+    Patches a file that is not loaded and replaces it atomically.  Returns the
+    renamed positions and the backup for `undo_rename`.  With `new_source`
+    the positions are the ones of `replace` in the lines it changes.
+    """
+    import parso
+
+    with open(path, encoding='utf-8', newline='') as f:
+        source = f.read()
+    lines = parso.split_lines(source, keepends=True)
+    renamed = []
+    if new_source is None:
+        for lnum in sorted(positions):
+            if lnum > len(lines):
+                continue
+            line, columns = _rename_line(lines[lnum - 1], positions[lnum],
+                                         orig, replace)
+            lines[lnum - 1] = line
+            renamed.extend((lnum, column, line) for column in columns)
+        new_source = ''.join(lines)
     else:
-        echo_highlight('Jedi did {0:d} renames!'.format(len(temp_rename)))
+        # jedi's changes may differ from the usages, e.g. in imports.
+        pattern = re.compile(r'(?<!\w)%s(?!\w)' % re.escape(replace))
+        new_lines = parso.split_lines(new_source, keepends=True)
+        for lnum, line in enumerate(new_lines, 1):
+            if lnum <= len(lines) and lines[lnum - 1] == line:
+                continue
+            renamed.extend((lnum, match.start(), line)
+                           for match in pattern.finditer(line))
+    if new_source == source:
+        return renamed, None
+    _replace_file(path, new_source)
+    return renamed, (path, source, new_source)
+
+
+def _replace_file(path, content):
+    """Writes a file via a temporary file next to it, so it is never left
+    half written."""
+    fd, temp_path = mkstemp(dir=os.path.dirname(path),
+                            prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+@vim_request
+@catch_and_print_exceptions
+def undo_rename():
+    """Reverts the files the last rename changed on disk, if unchanged since."""
+    global _rename_backups
+    reverted = 0
+    for path, original, new_source in _rename_backups:
+        try:
+            with open(path, encoding='utf-8', newline='') as f:
+                current = f.read()
+        except OSError as e:
+            echo_highlight('Cannot revert %s: %s' % (path, e))
+            continue
+        if current != new_source:
+            echo_highlight('Not reverting %s, it was changed since.' % path)
+            continue
+        _replace_file(path, original)
+        reverted += 1
+    _rename_backups = []
+    echo_highlight('Reverted the rename in {0:d} files.'.format(reverted))
 
 
+def get_pyimport_index():
+    """
+    Returns the `jedi_vim_index.SymbolIndex` of the current project, or None
+    if `g:jedi#pyimport_index` is off or the index was not built yet.  A
+    refresh is started in the background if it is missing or stale.
+    """
+    if not get_settings().pyimport_index:
+        return None
+    project = get_project()
+    environment = project.get_environment()
+    index = jedi_vim_index.get_index(jedi.settings.cache_directory,
+                                     str(project.path), environment.executable)
+    if index.is_stale() and not index.refreshing:
+        roots = [str(project.path)] + [str(p) for p in project.added_sys_path]
+        roots += environment.get_sys_path()
+        index.refresh_in_background(roots)
+    return index if index.ready else None
+
+
+def _index_location_is_current(import_path, location):
+    """
+    Whether the line of an indexed name still defines it, as the file might
+    have changed since the index was refreshed.
+    """
+    if location.type == 'module':
+        return os.path.exists(location.path)
+    name = import_path.rpartition('.')[2]
+    with LineCache() as line_cache:
+        line = line_cache.get_line(location.path, location.line)
+    if line is None or not line.startswith(name, location.column):
+        return False
+    rest = line[location.column + len(name):]
+    return not rest[:1].isidentifier() and not rest[:1].isdigit()
+
+
+@vim_request
+@metrics.measure('pyimport')
 @_check_jedi_availability(show_error=True)
 @catch_and_print_exceptions
 def py_import():
     args = shsplit(vim.eval('a:args'))
     import_path = args.pop()
+    cmd_args = ' '.join([a.replace(' ', '\\ ') for a in args])
+    index = get_pyimport_index()
+    if index is not None:
+        location = index.lookup(import_path)
+        # Imported names are left to Jedi, which follows them.
+        if (location is not None and location.type != 'import'
+                and _index_location_is_current(import_path, location)):
+            _goto_location(import_path.rpartition('.')[2], Path(location.path),
+                           location.line, location.column, options=cmd_args)
+            return
     name = next(get_project().search(import_path), None)
     if name is None:
         echo_highlight('Cannot find %s in your project or on sys.path!' % import_path)
     else:
-        cmd_args = ' '.join([a.replace(' ', '\\ ') for a in args])
         _goto_specific_name(name, options=cmd_args)
 
 
+@vim_request
+@metrics.measure('pyimport completions')
 @catch_and_print_exceptions
 def py_import_completions():
     argl = vim.eval('a:argl')
-    if jedi is None:
+    if not load_jedi():
         print('Pyimport completion requires jedi module: https://github.com/davidhalter/jedi')
         comps = []
     else:
-        names = get_project().complete_search(argl)
-        comps = [argl + n for n in sorted(set(c.complete for c in names))]
+        with jedi_lock:
+            index = get_pyimport_index()
+            comps = []
+            if index is not None:
+                fuzzy = get_settings().completion_filter == 'fuzzy'
+                comps = index.complete(argl, _fuzzy_match if fuzzy else None)
+            if not comps:
+                # Also for names the index does not know, like star imports.
+                names = get_project().complete_search(argl)
+                comps = [argl + n for n in sorted(set(c.complete for c in names))]
+        metrics.set_size(len(comps))
     vim.command("return '%s'" % '\n'.join(comps))
 
 
+@vim_request
 @catch_and_print_exceptions
 def set_buffer(path: Optional[Path], options='', using_tagstack=False):
     """
@@ -1147,11 +3547,12 @@ def set_buffer(path: Optional[Path], options='', using_tagstack=False):
         return True
 
     path = relpath(path)
+    settings = get_settings()
     # options are what you can to edit the edit options
-    if int(vim_eval('g:jedi#use_tabs_not_buffers')) == 1:
+    if settings.use_tabs_not_buffers:
         _tabnew(path, options)
-    elif not vim_eval('g:jedi#use_splits_not_buffers') in [1, '1']:
-        user_split_option = vim_eval('g:jedi#use_splits_not_buffers')
+    elif settings.use_splits_not_buffers != '1':
+        user_split_option = settings.use_splits_not_buffers
         split_options = {
             'top': 'topleft split',
             'left': 'topleft vsplit',
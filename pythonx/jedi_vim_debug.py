@@ -2,7 +2,7 @@
 import sys
 
 import vim
-from jedi_vim import PythonToVimStr, jedi
+from jedi_vim import PythonToVimStr
 
 
 def echo(msg):
@@ -33,10 +33,10 @@ def format_exc_info(exc_info=None, tb_indent=2):
 
 
 def get_known_environments():
-    """Get known Jedi environments."""
-    envs = list(jedi.find_virtualenvs())
-    envs.extend(jedi.find_system_environments())
-    return envs
+    """Get known Jedi environments (cached, see jedi_vim_environments)."""
+    import jedi_vim
+
+    return jedi_vim.get_known_environments()
 
 
 def display_debug_info():
@@ -53,8 +53,8 @@ def display_debug_info():
             format_exc_info()))
         return
 
-    if jedi_vim.jedi is None:
-        if hasattr(jedi_vim, 'jedi_import_error'):
+    if not jedi_vim.load_jedi():
+        if jedi_vim.jedi_import_error is not None:
             error_msg = format_exc_info(jedi_vim.jedi_import_error)
         else:
             error_msg = 'unknown error'
@@ -87,10 +87,18 @@ def display_debug_info():
         for p in sys_path:
             echo('    - `{0}`'.format(p))
 
+        script_cache = jedi_vim.script_cache
+        echo(' - script cache: {0} hits, {1} misses'.format(
+            script_cache.hits, script_cache.misses))
+        echo(' - startup times: {0}'.format(', '.join(
+            '{0}: {1:.1f} ms'.format(step, seconds * 1000)
+            for step, seconds in jedi_vim.startup_times.items())))
+
         if environment:
             echo('\n##### Known environments\n\n')
             for environment in get_known_environments():
-                echo(' - {0} ({1})\n'.format(
-                    environment,
+                echo(' - {0} {1} ({2})\n'.format(
+                    environment.kind,
+                    environment.version,
                     environment.executable,
                 ))
@@ -0,0 +1,143 @@
+"""
+Cache of the Python environments found by Jedi (see :JediChooseEnvironment).
+
+Finding environments starts every interpreter on the PATH and in the
+virtualenv directories, which takes seconds when there are many of them.  The
+results are stored in the cache directory, together with the modification
+time of each executable.  They are shown right away, as long as the
+executables did not change, and revalidated on a thread of its own.  This
+module must not import vim.
+"""
+import json
+import os
+import threading
+import time
+from typing import NamedTuple
+
+CACHE_VERSION = 1
+
+
+class KnownEnvironment(NamedTuple):
+    executable: str
+    version: str
+    kind: str
+    """"system" or "virtualenv"."""
+    mtime: float
+
+    def is_valid(self):
+        try:
+            return os.stat(self.executable).st_mtime == self.mtime
+        except OSError:
+            return False
+
+
+def discover(jedi, paths):
+    """
+    Returns the `KnownEnvironment`s that Jedi finds, system environments
+    first, and virtualenvs in `paths` (default: the current directory).
+    """
+    found = [(env, 'system') for env in jedi.find_system_environments()]
+    found += [(env, 'virtualenv')
+              for env in jedi.find_virtualenvs(paths=paths or None)]
+    environments = []
+    seen = set()
+    for env, kind in found:
+        if env.executable in seen:
+            continue
+        seen.add(env.executable)
+        try:
+            mtime = os.stat(env.executable).st_mtime
+        except OSError:
+            continue
+        version = '.'.join(str(part) for part in env.version_info[:3])
+        environments.append(KnownEnvironment(env.executable, version, kind, mtime))
+    return environments
+
+
+class EnvironmentCache(object):
+    """
+    The environments found the last time, per list of virtualenv paths.
+
+    `get` only returns environments whose executable did not change since.
+    `refresh_in_background` runs the discovery again and stores the result.
+    """
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.generation = 0
+        """Incremented whenever a refresh has finished."""
+        self._entries = None
+        self._lock = threading.Lock()
+        self._threads = {}
+
+    @staticmethod
+    def _key(paths):
+        return json.dumps(sorted(paths or []))
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == CACHE_VERSION:
+            self._entries = {
+                key: (entry['refreshed'],
+                      [KnownEnvironment(*env) for env in entry['environments']])
+                for key, entry in data['entries'].items()
+            }
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temporary = '%s.%d.tmp' % (self.cache_path, os.getpid())
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': {
+                key: {'refreshed': refreshed, 'environments': environments}
+                for key, (refreshed, environments) in self._entries.items()
+            }}, f)
+        os.replace(temporary, self.cache_path)
+
+    def get(self, paths):
+        """
+        Returns the cached environments for `paths` that are still valid, or
+        None if they were never discovered.
+        """
+        with self._lock:
+            self._load()
+            try:
+                _, environments = self._entries[self._key(paths)]
+            except KeyError:
+                return None
+        return [env for env in environments if env.is_valid()]
+
+    def refresh(self, jedi, paths):
+        """Discovers the environments and stores them.  Returns them."""
+        environments = discover(jedi, paths)
+        with self._lock:
+            self._load()
+            self._entries[self._key(paths)] = time.time(), environments
+            self.generation += 1
+            try:
+                self._save()
+            except OSError:
+                pass
+        return environments
+
+    def refresh_in_background(self, jedi, paths):
+        """Starts a refresh, unless one for the same paths is running."""
+        key = self._key(paths)
+        with self._lock:
+            thread = self._threads.get(key)
+            if thread is not None and thread.is_alive():
+                return
+            thread = self._threads[key] = threading.Thread(
+                target=self.refresh, args=(jedi, paths),
+                name='jedi-vim-environments')
+            thread.daemon = True
+            thread.start()
+
+    def refreshing(self):
+        with self._lock:
+            return any(thread.is_alive() for thread in self._threads.values())
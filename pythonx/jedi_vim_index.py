@@ -0,0 +1,335 @@
+"""
+Persistent index of importable modules and their top-level names, used by
+:Pyimport and its completion (see `g:jedi#pyimport_index`).
+
+There is one index per project and environment.  It is stored as JSON in the
+cache directory, refreshed incrementally by comparing file modification times
+and rebuilt on a thread of its own, so that lookups never wait for a walk of
+sys.path.  Top-level names are found with regular expressions instead of a
+parser, which is much faster and good enough to jump to them.  This module
+must not import vim.
+"""
+import bisect
+import hashlib
+import json
+import keyword
+import os
+import re
+import threading
+import time
+from typing import NamedTuple
+
+INDEX_VERSION = 1
+
+REFRESH_INTERVAL = 60
+"""Seconds after which a refresh is started when the index is used."""
+
+MAX_FILE_SIZE = 1024 * 1024
+"""Bigger files are indexed without their top-level names."""
+
+SOURCE_SUFFIXES = ('.py', '.pyi')
+
+_DEFINITION_PATTERN = re.compile(
+    r'^(?:(?:async[ \t]+)?def|class)[ \t]+([^\W\d]\w*)'
+    r'|^([^\W\d]\w*)[ \t]*(?::[^=\n]*)?=(?!=)'
+    r'|^from[ \t]+[\w.]+[ \t]+import[ \t]+(\([^)]*\)|[^\n#]*)'
+    r'|^import[ \t]+[\w.]+[ \t]+as[ \t]+([^\W\d]\w*)',
+    re.MULTILINE
+)
+_IMPORTED_NAME_PATTERN = re.compile(r'([^\W\d]\w*)(?:\s+as\s+([^\W\d]\w*))?')
+
+
+class Location(NamedTuple):
+    path: str
+    line: int
+    column: int
+    type: str
+    """"module", "class", "function", "statement" or "import"."""
+
+
+def _module_name(filename):
+    """The module name of a file name or None if it cannot be imported."""
+    for suffix in SOURCE_SUFFIXES:
+        if filename.endswith(suffix):
+            name = filename[:-len(suffix)]
+            break
+    else:
+        # Extension modules, like `_ssl.cpython-311-x86_64-linux-gnu.so`.
+        if not filename.endswith(('.so', '.pyd')):
+            return None
+        name = filename.partition('.')[0]
+    return name if name.isidentifier() else None
+
+
+def _line_and_column(source, offset, line_starts):
+    line = bisect.bisect_right(line_starts, offset)
+    return line, offset - line_starts[line - 1]
+
+
+def find_top_level_names(source):
+    """
+    Returns `[name, line, column, type]` for the names defined at the top
+    level of a module.  Names imported with `from x import y` or `import x as
+    y` are included as "import", to be looked up by Jedi, which follows them.
+    """
+    line_starts = [0] + [m.end() for m in re.finditer('\n', source)]
+    names = []
+    for match in _DEFINITION_PATTERN.finditer(source):
+        definition, statement, imported, alias = match.groups()
+        if definition is not None:
+            typ = 'class' if source.startswith('class', match.start()) else 'function'
+            offset = match.start(1)
+            found = [(definition, offset)]
+        elif statement is not None:
+            if keyword.iskeyword(statement):
+                continue
+            typ = 'statement'
+            offset = match.start(2)
+            found = [(statement, offset)]
+        elif alias is not None:
+            typ = 'import'
+            found = [(alias, match.start(4))]
+        else:
+            typ = 'import'
+            found = []
+            for m in _IMPORTED_NAME_PATTERN.finditer(imported.strip('()')):
+                name = m.group(2) or m.group(1)
+                if name not in ('as', 'import'):
+                    found.append((name, match.start(3) + m.start()))
+        for name, offset in found:
+            line, column = _line_and_column(source, offset, line_starts)
+            names.append([name, line, column, typ])
+    return names
+
+
+def _read_top_level_names(path):
+    try:
+        if os.path.getsize(path) > MAX_FILE_SIZE:
+            return []
+        with open(path, encoding='utf-8', errors='replace') as f:
+            return find_top_level_names(f.read())
+    except OSError:
+        return []
+
+
+class SymbolIndex(object):
+    """
+    The modules found in `roots` (sys.path order, first one wins) and the
+    top-level names of their source files.
+
+    `files` maps each indexed file to `[mtime, module name, names]`; the
+    lookup tables are derived from it after every load and refresh.  Lookups
+    use whatever the last completed refresh produced.
+    """
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.files = {}
+        self.refreshed = 0
+        self._children = {}
+        self._locations = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return bool(self.refreshed)
+
+    @property
+    def refreshing(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def load(self):
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != INDEX_VERSION:
+            return False
+        self.files = data['files']
+        self.refreshed = data['refreshed']
+        self._build_lookup()
+        return True
+
+    def save(self):
+        directory = os.path.dirname(self.cache_path)
+        os.makedirs(directory, exist_ok=True)
+        temporary = '%s.%d.tmp' % (self.cache_path, os.getpid())
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'refreshed': self.refreshed,
+                       'files': self.files}, f)
+        os.replace(temporary, self.cache_path)
+
+    def _walk(self, roots):
+        """
+        Yields `(path, module name)` for all importable modules.  Directories
+        without `__init__.py` are walked as namespace packages, directories
+        reached a second time through symbolic links are skipped.
+        """
+        seen = set()
+        for root in roots:
+            if not os.path.isdir(root):
+                continue
+            visited = {os.path.realpath(root)}
+            stack = [(root, '')]
+            while stack:
+                directory, package = stack.pop()
+                try:
+                    entries = sorted(os.scandir(directory), key=lambda e: e.name)
+                except OSError:
+                    continue
+                for entry in entries:
+                    if entry.is_dir():
+                        if (entry.name.isidentifier()
+                                and entry.name != '__pycache__'):
+                            real_path = os.path.realpath(entry.path)
+                            if real_path not in visited:
+                                visited.add(real_path)
+                                stack.append((entry.path, package + entry.name + '.'))
+                        continue
+                    name = _module_name(entry.name)
+                    if name is None:
+                        continue
+                    if name == '__init__':
+                        if not package:
+                            continue
+                        module = package[:-1]
+                    else:
+                        module = package + name
+                    if module not in seen:
+                        seen.add(module)
+                        yield entry.path, module
+
+    def refresh(self, roots):
+        """
+        Walks `roots` and reads only the files that were added or changed
+        since the last refresh.  Returns the number of files read.
+        """
+        files = {}
+        read = 0
+        for path, module in self._walk(roots):
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            old = self.files.get(path)
+            if old is not None and old[0] == mtime and old[1] == module:
+                files[path] = old
+                continue
+            names = []
+            if path.endswith(SOURCE_SUFFIXES):
+                names = _read_top_level_names(path)
+            files[path] = [mtime, module, names]
+            read += 1
+        self.files = files
+        self.refreshed = time.time()
+        self._build_lookup()
+        try:
+            self.save()
+        except OSError:
+            # E.g. a read-only cache directory, the index is still used.
+            pass
+        return read
+
+    def refresh_in_background(self, roots):
+        """Starts a refresh, unless one is running already."""
+        with self._lock:
+            if self.refreshing:
+                return
+            self._thread = threading.Thread(
+                target=self.refresh, args=(roots,), name='jedi-vim-index')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def is_stale(self):
+        return time.time() - self.refreshed > REFRESH_INTERVAL
+
+    def _build_lookup(self):
+        children = {}
+        locations = {}
+        listed = set()
+
+        def add(full_name, location):
+            if full_name in locations:
+                return
+            locations[full_name] = location
+            add_child(full_name)
+
+        def add_child(full_name):
+            if full_name in listed:
+                return
+            listed.add(full_name)
+            parent, _, name = full_name.rpartition('.')
+            if parent:
+                # Namespace packages have no location of their own.
+                add_child(parent)
+            children.setdefault(parent, []).append(name)
+
+        # Modules first, so that they win over names of the same package.
+        for path, (_, module, _) in self.files.items():
+            add(module, Location(path, 1, 0, 'module'))
+        for path, (_, module, names) in self.files.items():
+            for name, line, column, typ in names:
+                add(module + '.' + name, Location(path, line, column, typ))
+        for names in children.values():
+            names.sort()
+        # Swapped at once, so that lookups on other threads stay consistent.
+        self._children, self._locations = children, locations
+
+    def lookup(self, full_name):
+        """Returns the `Location` of a module or top-level name, or None."""
+        return self._locations.get(full_name)
+
+    def complete(self, query, fuzzy_match=None):
+        """
+        Returns the full names that complete `query`, which is a (partial)
+        dotted name.  The last part of it is matched as a prefix, or with
+        `fuzzy_match(name, base)` if given, for names without prefix match.
+        """
+        parent, dot, base = query.rpartition('.')
+        names = self._children.get(parent, [])
+        start = bisect.bisect_left(names, base)
+        end = bisect.bisect_left(names, base + '\U0010ffff')
+        matches = names[start:end]
+        if fuzzy_match is not None and base:
+            ranked = []
+            for name in names:
+                if name.startswith(base):
+                    continue
+                match = fuzzy_match(name, base)
+                if match is not None:
+                    ranked.append((match[1], match[0], name))
+            matches += [name for _, _, name in sorted(ranked)]
+        return [parent + dot + name for name in matches]
+
+
+_indexes = {}
+
+
+def get_index(cache_directory, project_path, environment_executable):
+    """
+    Returns the `SymbolIndex` of a project and environment, loaded from the
+    cache directory the first time.
+    """
+    key = project_path, environment_executable
+    try:
+        return _indexes[key]
+    except KeyError:
+        pass
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+    cache_path = os.path.join(cache_directory, 'jedi-vim',
+                              'index-%s.json' % digest)
+    index = _indexes[key] = SymbolIndex(cache_path)
+    index.load()
+    return index
+
+
+def wait_for_refreshes(timeout=None):
+    """Waits until the running refreshes are done (used by the tests)."""
+    for index in list(_indexes.values()):
+        if index.refreshing:
+            index._thread.join(timeout)
+
+
+def clear():
+    _indexes.clear()
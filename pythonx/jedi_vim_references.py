@@ -0,0 +1,282 @@
+"""
+Search for the references of a name in the files of a project, one file after
+the other, for streaming usages (see `g:jedi#usages_streaming`).
+
+`jedi.Script.get_references` only returns once all the files of the project
+that contain the name were searched.  Here each file is searched with Jedi's
+search in a single module (`scope='file'`), so that the results can be shown
+while the search goes on, and it can be stopped between files.  This module
+must not import vim.
+
+The references are the same as Jedi's for the files that are searched, but
+the files are not: all the Python files of the project are searched, without
+Jedi's limits of 30 files that contain the name and 2000 files in total, and
+the directories are skipped by `iter_python_files` instead of by Jedi's rules
+(e.g. `.gitignore` is not read).
+"""
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import CancelledError, FIRST_COMPLETED, wait
+from pathlib import Path
+
+STEP_SECONDS = 0.1
+"""Files are searched for about this long per step."""
+
+CHUNK_SIZE = 8
+"""Files per request with `ParallelReferenceSearch`."""
+
+SKIPPED_DIRECTORIES = frozenset(['__pycache__', 'node_modules'])
+
+SOURCE_SUFFIXES = ('.py', '.pyi')
+
+
+def iter_python_files(root):
+    """Yields the Python files below `root`, except in hidden directories and virtualenvs."""
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if not d.startswith('.') and d not in SKIPPED_DIRECTORIES
+            and not os.path.exists(os.path.join(directory, d, 'pyvenv.cfg')))
+        for filename in sorted(filenames):
+            if filename.endswith(SOURCE_SUFFIXES):
+                yield os.path.join(directory, filename)
+
+
+def name_key(name):
+    return str(name.module_path), name.line, name.column
+
+
+class Reference(object):
+    """
+    The parts of a `jedi.api.classes.Name` that jedi-vim shows for usages.
+    They are copied, so that the scripts of the searched files can be freed,
+    and can be sent from worker processes.
+    """
+    __slots__ = ('name', 'type', 'module_path', 'line', 'column',
+                 'description', 'line_code')
+
+    full_name = None
+    is_keyword = False
+
+    def __init__(self, name, type, module_path, line, column, description,
+                 line_code):
+        self.name = name
+        self.type = type
+        self.module_path = Path(module_path)
+        self.line = line
+        self.column = column
+        self.description = description
+        self.line_code = line_code
+
+    @classmethod
+    def from_name(cls, name):
+        return cls(name.name, name.type, name.module_path, name.line,
+                   name.column, name.description, name.get_line_code())
+
+    def to_dict(self):
+        d = {attribute: getattr(self, attribute) for attribute in self.__slots__}
+        d['module_path'] = str(self.module_path)
+        return d
+
+    def in_builtin_module(self):
+        return False
+
+    def get_line_code(self):
+        return self.line_code
+
+    def __repr__(self):
+        return '<%s: %s:%s:%s %s>' % (type(self).__name__, self.module_path,
+                                      self.line, self.column, self.name)
+
+
+def search_module(script, name, targets):
+    """
+    Returns the names in the module of `script` that refer to one of the
+    `targets` (see `name_key`), sorted by their position.
+
+    The names that Jedi connects with a target in the module are added
+    first, e.g. the ones of later assignments.  Then the other names called
+    `name` are followed with `goto`, and once one of them leads to a target,
+    the names connected with it are added.
+    """
+    found = {}
+
+    def add_references(line, column):
+        for reference in script.get_references(line, column, scope='file'):
+            found.setdefault(name_key(reference), reference)
+
+    path = str(script.path)
+    for key in sorted(targets):
+        if key[0] == path and key not in found:
+            add_references(*key[1:])
+    for candidate in script.get_names(all_scopes=True, definitions=True,
+                                      references=True):
+        key = name_key(candidate)
+        if candidate.name != name or key in found:
+            continue
+        if any(name_key(d) in targets
+               for d in candidate.goto(follow_imports=True)):
+            found[key] = candidate
+            add_references(candidate.line, candidate.column)
+    return sorted(found.values(), key=lambda n: (n.line, n.column))
+
+
+class ReferenceSearch(object):
+    """
+    Searches the files of a project for the references of a name, which was
+    already searched for in the current file.
+
+    `step` is called repeatedly, on the background thread, until `done`.
+    The files where the targets are defined are searched first, then the
+    other files of the project that contain the name.
+    """
+    def __init__(self, project, name, targets, searched, first_paths=(),
+                 sources=None, search_project=True):
+        """
+        :param targets: The `name_key`s of the names that are referenced,
+            usually the references in the current file and their definitions.
+        :param searched: Paths that are not searched (again).
+        :param sources: The sources of modified buffers by path, which are
+            used instead of the files.
+        """
+        self.project = project
+        self.name = name
+        self.targets = set(targets)
+        self.sources = sources or {}
+        self.search_project = search_project
+        self.files_searched = 0
+        self.files_total = 0
+        self.done = False
+        self._searched = set(searched)
+        self._first_paths = list(first_paths)
+        self._paths = None
+        self._regex = re.compile(r'\b%s\b' % re.escape(name))
+
+    def _collect_paths(self):
+        paths = list(self._first_paths)
+        if self.search_project:
+            paths.extend(iter_python_files(str(self.project.path)))
+        self._paths = deque(dict.fromkeys(
+            path for path in paths if path not in self._searched))
+        self.files_total = len(self._paths)
+
+    def _read(self, path):
+        source = self.sources.get(path)
+        if source is None:
+            try:
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    source = f.read()
+            except OSError:
+                return None
+        return source if self._regex.search(source) else None
+
+    def search_file(self, path):
+        """Returns the `Reference`s in a file."""
+        import jedi
+
+        source = self._read(path)
+        if source is None:
+            return []
+        script = jedi.Script(source, path=path, project=self.project)
+        return [Reference.from_name(n)
+                for n in search_module(script, self.name, self.targets)]
+
+    def step(self, seconds=STEP_SECONDS):
+        """
+        Searches files for about `seconds` (at least one file).  Returns the
+        `Reference`s found.
+        """
+        if self._paths is None:
+            self._collect_paths()
+        found = []
+        deadline = time.perf_counter() + seconds
+        while self._paths:
+            path = self._paths.popleft()
+            self._searched.add(path)
+            found += self.search_file(path)
+            self.files_searched += 1
+            if time.perf_counter() > deadline:
+                break
+        self.done = not self._paths
+        return found
+
+    def run(self):
+        """Searches all files.  Returns the `Reference`s found."""
+        found = []
+        while not self.done:
+            found += self.step()
+        return found
+
+    def cancel(self):
+        pass
+
+
+class ParallelReferenceSearch(ReferenceSearch):
+    """
+    Searches the files in the worker processes of a
+    `jedi_vim_worker.WorkerPool`, `CHUNK_SIZE` files per request, which are
+    spread evenly over the workers.  The workers live on, so that parso's
+    and Jedi's caches of the modules that the files import are reused.
+
+    Unlike the steps of `ReferenceSearch`, `collect` does not need jedi in
+    this process and does not wait.
+    """
+    def __init__(self, pool, project_args, *args, **kwargs):
+        """
+        :param project_args: dict with the path, environment_path and
+            added_sys_path of the project.
+        """
+        super(ParallelReferenceSearch, self).__init__(*args, **kwargs)
+        self.pool = pool
+        self.project_args = project_args
+        self._requests = None
+
+    def _start(self):
+        self._collect_paths()
+        paths = list(self._paths)
+        self._paths.clear()
+        targets = sorted(self.targets)
+        self._requests = []
+        for affinity, start in enumerate(range(0, len(paths), CHUNK_SIZE)):
+            chunk = paths[start:start + CHUNK_SIZE]
+            args = dict(project=self.project_args, name=self.name,
+                        targets=targets, paths=chunk,
+                        sources={p: self.sources[p] for p in chunk
+                                 if p in self.sources})
+            future, request_id = self.pool.request('search_references', args,
+                                                   affinity)
+            self._requests.append((future, request_id, affinity, len(chunk)))
+
+    def collect(self):
+        """Returns the `Reference`s of the requests that are done."""
+        if self._requests is None:
+            self._start()
+        found = []
+        pending = []
+        for request in self._requests:
+            future = request[0]
+            if not future.done():
+                pending.append(request)
+                continue
+            self.files_searched += request[3]
+            try:
+                found += [Reference(**d) for d in future.result()]
+            except CancelledError:
+                pass
+        self._requests = pending
+        self.done = not pending
+        return found
+
+    def step(self, seconds=STEP_SECONDS):
+        """Waits up to `seconds` for requests.  Returns what `collect` does."""
+        if self._requests is None:
+            self._start()
+        wait([request[0] for request in self._requests], timeout=seconds,
+             return_when=FIRST_COMPLETED)
+        return self.collect()
+
+    def cancel(self):
+        for _, request_id, affinity, _ in self._requests or ():
+            self.pool.cancel(request_id, affinity)
@@ -0,0 +1,550 @@
+"""
+Out-of-process jedi backend (see `g:jedi#backend`).
+
+Script operations are forwarded to worker processes over stdio, using one
+JSON message per line.  This module is both the worker (when run as a
+script) and the client used by jedi_vim.  It must not import vim.
+
+Requests look like `{"id": 1, "op": "complete", "priority": 0, "args":
+{...}}`, responses like `{"id": 1, "result": ..., "memory": 1234}` (or with
+"error" instead of "result").  `{"cancel": 1}` drops a request that has not
+been started yet.
+"""
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from pathlib import Path
+from queue import PriorityQueue
+
+WORKER_PATH = os.path.abspath(__file__)
+
+PRIORITIES = {
+    'complete': 0,
+    'completion_docstring': 0,
+    'goto': 0,
+    'infer': 0,
+    'help': 0,
+    'get_signatures': 1,
+    'get_references': 2,
+    'search_references': 3,
+}
+"""Lower values are handled first."""
+
+SCRIPT_OPS = ('complete', 'get_signatures', 'goto', 'infer', 'help',
+              'get_references')
+
+JEDI_SETTINGS = ('additional_dynamic_modules', 'case_insensitive_completion')
+"""The `jedi.settings` that are forwarded to workers."""
+
+
+class WorkerError(Exception):
+    pass
+
+
+class MissingScriptError(WorkerError):
+    """The worker does not know the script (anymore), e.g. after a restart."""
+
+
+def write_message(stream, message):
+    stream.write(json.dumps(message).encode('ascii') + b'\n')
+    stream.flush()
+
+
+def iter_messages(stream):
+    for line in iter(stream.readline, b''):
+        yield json.loads(line.decode('ascii'))
+
+
+def get_memory_usage():
+    """The resident set size of the current process in KiB (0 if unknown)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        maxrss //= 1024  # bytes
+    return maxrss
+
+
+# ------------------------------------------------------------------------
+# Worker
+# ------------------------------------------------------------------------
+def _serialize_name(name, docstring=False):
+    try:
+        line_code = name.get_line_code()
+    except Exception:
+        line_code = ''
+    d = dict(
+        name=name.name,
+        type=name.type,
+        module_path=str(name.module_path) if name.module_path else None,
+        line=name.line,
+        column=name.column,
+        description=name.description,
+        full_name=name.full_name,
+        is_keyword=name.is_keyword,
+        in_builtin_module=name.in_builtin_module(),
+        line_code=line_code,
+        repr=str(name),
+    )
+    if docstring:
+        d['docstring'] = name.docstring()
+    return d
+
+
+def _serialize_completion(completion):
+    return dict(
+        name=completion.name,
+        complete=completion.complete,
+        name_with_symbols=completion.name_with_symbols,
+        description=completion.description,
+        type=completion.type,
+        full_name=completion.full_name,
+        module_path=str(completion.module_path) if completion.module_path
+        else None,
+    )
+
+
+def _serialize_signature(signature):
+    return dict(
+        name=signature.name,
+        index=signature.index,
+        bracket_start=signature.bracket_start,
+        params=[dict(name=p.name, description=p.description,
+                     kind=p.kind.name)
+                for p in signature.params],
+    )
+
+
+class Server(object):
+    """Handles requests on stdin in the order of their priority."""
+    def __init__(self, infile, outfile, max_scripts=8):
+        self._infile = infile
+        self._outfile = outfile
+        self._queue = PriorityQueue()
+        self._cancelled = set()
+        self._max_scripts = max_scripts
+        self._scripts = OrderedDict()
+        self._projects = {}
+        self._completions = OrderedDict()
+
+    def _read(self):
+        try:
+            for message in iter_messages(self._infile):
+                if 'cancel' in message:
+                    self._cancelled.add(message['cancel'])
+                else:
+                    self._queue.put((message.get('priority', 0),
+                                     message['id'], message))
+        finally:
+            # The client went away.
+            self._queue.put((-1, -1, None))
+
+    def serve(self):
+        thread = threading.Thread(target=self._read)
+        thread.daemon = True
+        thread.start()
+        while True:
+            _, request_id, message = self._queue.get()
+            if message is None:
+                return
+            if request_id in self._cancelled:
+                self._cancelled.discard(request_id)
+                continue
+            response = {'id': request_id}
+            try:
+                response['result'] = self._handle(message)
+            except MissingScriptError:
+                response['error'] = 'missing-script'
+            except Exception:
+                response['error'] = traceback.format_exc()
+            response['memory'] = get_memory_usage()
+            write_message(self._outfile, response)
+
+    def _get_project(self, args):
+        import jedi
+
+        key = (args['path'], args['environment_path'],
+               tuple(args['added_sys_path']))
+        try:
+            return self._projects[key]
+        except KeyError:
+            project = self._projects[key] = jedi.Project(
+                args['path'],
+                environment_path=args['environment_path'],
+                added_sys_path=args['added_sys_path'])
+            return project
+
+    def _get_script(self, args):
+        import jedi
+
+        key = args['key']
+        if 'source' not in args:
+            try:
+                script = self._scripts[key]
+            except KeyError:
+                raise MissingScriptError(key)
+            self._scripts.move_to_end(key)
+            return script
+
+        script = self._scripts[key] = jedi.Script(
+            args['source'], path=args['path'],
+            project=self._get_project(args['project']))
+        while len(self._scripts) > self._max_scripts:
+            self._scripts.popitem(last=False)
+        return script
+
+    def _handle(self, message):
+        import jedi
+
+        op = message['op']
+        args = message['args']
+        if op == 'search_references':
+            import jedi_vim_references
+
+            search = jedi_vim_references.ReferenceSearch(
+                self._get_project(args['project']), args['name'],
+                [tuple(target) for target in args['targets']], searched=(),
+                sources=args['sources'])
+            return [reference.to_dict() for path in args['paths']
+                    for reference in search.search_file(path)]
+        if op == 'completion_docstring':
+            try:
+                completions = self._completions[args['request']]
+            except KeyError:
+                return ''
+            return completions[args['index']].docstring()
+        if op not in SCRIPT_OPS:
+            raise ValueError('Unknown operation: %s' % op)
+
+        script = self._get_script(args['script'])
+        for name, value in args['jedi_settings'].items():
+            if name in JEDI_SETTINGS:
+                setattr(jedi.settings, name, value)
+
+        result = getattr(script, op)(*args['args'], **args['kwargs'])
+        if op == 'complete':
+            # Docstrings are fetched via "completion_docstring" on demand.
+            self._completions[message['id']] = result
+            while len(self._completions) > 4:
+                self._completions.popitem(last=False)
+            return [_serialize_completion(c) for c in result]
+        if op == 'get_signatures':
+            return [_serialize_signature(s) for s in result]
+        return [_serialize_name(n, docstring=op == 'help') for n in result]
+
+
+def main():
+    pythonx = os.path.dirname(WORKER_PATH)
+    for name in ('parso', 'jedi'):
+        sys.path.insert(0, os.path.join(pythonx, name))
+    Server(sys.stdin.buffer, sys.stdout.buffer).serve()
+
+
+# ------------------------------------------------------------------------
+# Client
+# ------------------------------------------------------------------------
+def find_python(python=None):
+    """The interpreter for workers (Vim's sys.executable might be Vim)."""
+    if python:
+        return python
+    if os.path.basename(sys.executable).startswith('python'):
+        return sys.executable
+    return shutil.which('python3') or shutil.which('python')
+
+
+class WorkerProcess(object):
+    """A single worker process, which gets (re)started on demand."""
+    def __init__(self, python, max_memory=0):
+        """
+        :param max_memory: Restart the worker once it uses more than this
+            (in KiB, 0 for no limit).
+        """
+        self.python = python
+        self.max_memory = max_memory
+        self.restarts = 0
+        self._process = None
+        self._pending = {}
+        self._bloated = False
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._process is not None:
+            self.restarts += 1
+        self._bloated = False
+        process = self._process = subprocess.Popen(
+            [self.python, '-u', WORKER_PATH],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        thread = threading.Thread(target=self._read, args=(process,),
+                                  name='jedi-vim-worker')
+        thread.daemon = True
+        thread.start()
+
+    def _needs_start(self):
+        if self._process is None or self._process.poll() is not None:
+            return True
+        if self._bloated and not self._pending:
+            self._stop(self._process)
+            return True
+        return False
+
+    def send(self, message, future):
+        with self._lock:
+            if self._needs_start():
+                self._start()
+            self._pending[message['id']] = future
+            process = self._process
+        try:
+            write_message(process.stdin, message)
+        except OSError:
+            with self._lock:
+                self._pending.pop(message['id'], None)
+            raise WorkerError('Could not send request to jedi worker.')
+
+    def cancel(self, request_id):
+        with self._lock:
+            future = self._pending.pop(request_id, None)
+            process = self._process
+        if future is not None:
+            future.cancel()
+            try:
+                write_message(process.stdin, {'cancel': request_id})
+            except OSError:
+                pass
+
+    def _read(self, process):
+        for response in iter_messages(process.stdout):
+            with self._lock:
+                future = self._pending.pop(response['id'], None)
+                if (self.max_memory
+                        and response.get('memory', 0) > self.max_memory):
+                    self._bloated = True
+            if future is None or not future.set_running_or_notify_cancel():
+                continue
+            error = response.get('error')
+            if error == 'missing-script':
+                future.set_exception(MissingScriptError())
+            elif error is not None:
+                future.set_exception(WorkerError(error))
+            else:
+                future.set_result(response['result'])
+
+        # The process exited (crashed or stopped).
+        with self._lock:
+            if self._process is not process:
+                return
+            pending = self._pending
+            self._pending = {}
+        for future in pending.values():
+            if future.set_running_or_notify_cancel():
+                future.set_exception(WorkerError('jedi worker exited.'))
+
+    def _stop(self, process):
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def stop(self):
+        with self._lock:
+            process = self._process
+        if process is not None:
+            self._stop(process)
+
+
+class WorkerPool(object):
+    """
+    Dispatches requests to worker processes.  Requests with the same
+    affinity (the module path) go to the same worker, so that its caches
+    are reused.
+    """
+    def __init__(self, python=None, size=1, max_memory=0):
+        python = find_python(python)
+        if python is None:
+            raise WorkerError('Cannot find a Python interpreter for workers.')
+        self.workers = [WorkerProcess(python, max_memory)
+                        for _ in range(max(size, 1))]
+        self._counter = itertools.count(1)
+
+    def get_worker(self, affinity):
+        return self.workers[hash(affinity) % len(self.workers)]
+
+    def request(self, op, args, affinity=None):
+        """Returns a `Future` for the result."""
+        worker = self.get_worker(affinity)
+        request_id = next(self._counter)
+        future = Future()
+        worker.send(dict(id=request_id, op=op, args=args,
+                         priority=PRIORITIES.get(op, 0)), future)
+        return future, request_id
+
+    def cancel(self, request_id, affinity=None):
+        """Drops a request, unless the worker has started it already."""
+        self.get_worker(affinity).cancel(request_id)
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.stop()
+
+
+class RemoteName(object):
+    """The parts of `jedi.api.classes.Name` that jedi-vim uses."""
+    def __init__(self, d):
+        self.name = d['name']
+        self.type = d['type']
+        self.module_path = Path(d['module_path']) if d['module_path'] else None
+        self.line = d['line']
+        self.column = d['column']
+        self.description = d['description']
+        self.full_name = d['full_name']
+        self.is_keyword = d['is_keyword']
+        self._in_builtin_module = d['in_builtin_module']
+        self._line_code = d['line_code']
+        self._docstring = d.get('docstring', '')
+        self._repr = d['repr']
+
+    def in_builtin_module(self):
+        return self._in_builtin_module
+
+    def get_line_code(self):
+        return self._line_code
+
+    def docstring(self):
+        return self._docstring
+
+    def __repr__(self):
+        return self._repr
+
+
+class RemoteCompletion(object):
+    """The parts of `jedi.api.classes.Completion` that jedi-vim uses."""
+    def __init__(self, d, script, request_id, index):
+        self.name = d['name']
+        self.complete = d['complete']
+        self.name_with_symbols = d['name_with_symbols']
+        self.description = d['description']
+        self.type = d['type']
+        self.full_name = d['full_name']
+        self.module_path = Path(d['module_path']) if d['module_path'] else None
+        self._script = script
+        self._request_id = request_id
+        self._index = index
+
+    def docstring(self):
+        return self._script._request(
+            'completion_docstring',
+            dict(request=self._request_id, index=self._index),
+        )[0]
+
+
+class RemoteParam(object):
+    def __init__(self, d):
+        self.name = d['name']
+        self.description = d['description']
+        self.kind = d['kind']
+
+
+class RemoteSignature(object):
+    """The parts of `jedi.api.classes.Signature` that jedi-vim uses."""
+    def __init__(self, d):
+        self.name = d['name']
+        self.index = d['index']
+        self.bracket_start = tuple(d['bracket_start'])
+        self.params = [RemoteParam(p) for p in d['params']]
+
+
+class RemoteScript(object):
+    """A proxy for a `jedi.Script` in a worker process."""
+    _ids = itertools.count()
+
+    def __init__(self, pool, source, path, project, jedi_settings):
+        """
+        :param project: dict with the path, environment_path and
+            added_sys_path of the project.
+        """
+        self._pool = pool
+        self._source = source
+        self._path = path
+        self._project = project
+        self._jedi_settings = jedi_settings
+        self._key = '%d-%d' % (os.getpid(), next(self._ids))
+        self._sent_to = None
+
+    def _script_args(self, worker):
+        args = dict(key=self._key)
+        if self._sent_to is not worker:
+            args.update(source=self._source, path=self._path,
+                        project=self._project)
+        return args
+
+    def _request(self, op, args):
+        worker = self._pool.get_worker(self._path)
+        for _ in range(2):
+            if op != 'completion_docstring':
+                args['script'] = self._script_args(worker)
+            future, request_id = self._pool.request(op, args, self._path)
+            try:
+                result = future.result()
+            except CancelledError:
+                # Superseded by a newer request.
+                return [], request_id
+            except MissingScriptError:
+                self._sent_to = None
+                continue
+            self._sent_to = worker
+            return result, request_id
+        raise WorkerError('jedi worker lost the script.')
+
+    def _script_request(self, op, *args, **kwargs):
+        return self._request(op, dict(args=args, kwargs=kwargs,
+                                      jedi_settings=self._jedi_settings))
+
+    def complete(self, *args, **kwargs):
+        result, request_id = self._script_request('complete', *args, **kwargs)
+        return [RemoteCompletion(d, self, request_id, i)
+                for i, d in enumerate(result)]
+
+    def get_signatures(self, *args, **kwargs):
+        result, _ = self._script_request('get_signatures', *args, **kwargs)
+        return [RemoteSignature(d) for d in result]
+
+    def _names(self, op, *args, **kwargs):
+        result, _ = self._script_request(op, *args, **kwargs)
+        return [RemoteName(d) for d in result]
+
+    def goto(self, *args, **kwargs):
+        return self._names('goto', *args, **kwargs)
+
+    def infer(self, *args, **kwargs):
+        return self._names('infer', *args, **kwargs)
+
+    def help(self, *args, **kwargs):
+        return self._names('help', *args, **kwargs)
+
+    def get_references(self, *args, **kwargs):
+        return self._names('get_references', *args, **kwargs)
+
+
+if __name__ == '__main__':
+    main()
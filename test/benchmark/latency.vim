@@ -0,0 +1,120 @@
+" End-to-end latencies of jedi-vim's features in a headless Vim or Neovim.
+"
+" This is run by test/benchmark/run.py, which generates the fixtures and
+" evaluates the results:
+"
+"     python test/benchmark/run.py
+"
+" Environment variables:
+"   JEDI_BENCH_FIXTURES  directory with the generated fixtures
+"   JEDI_BENCH_OUTPUT    file to append the samples to (JSON, one per line)
+"   JEDI_BENCH_ROUNDS    number of rounds per benchmark, the first is "cold"
+
+set runtimepath^=.
+set hidden
+filetype plugin on
+let g:jedi#use_tag_stack = 0
+let g:jedi#show_call_signatures = 1
+let g:jedi#popup_select_first = 0
+
+let s:fixtures = $JEDI_BENCH_FIXTURES
+let s:output = $JEDI_BENCH_OUTPUT
+let s:rounds = str2nr($JEDI_BENCH_ROUNDS)
+let g:jedi#project_path = s:fixtures
+
+function! s:write(sample) abort
+    call writefile([json_encode(a:sample)], s:output, 'a')
+endfunction
+
+if !has('python3')
+    call s:write({'error': 'no Python 3 support'})
+    qall!
+endif
+runtime plugin/jedi.vim
+
+" Opens a fixture and puts the cursor on the first match of a pattern, at its
+" end with a:at_end.
+function! s:open(name, pattern, at_end) abort
+    execute 'edit! ' . fnameescape(s:fixtures . '/' . a:name)
+    call cursor(1, 1)
+    call search(a:pattern, a:at_end ? 'ce' : 'c')
+endfunction
+
+let s:size = -1
+
+function! BenchRecordPopup() abort
+    let s:size = len(complete_info(['items']).items)
+    return ''
+endfunction
+
+" Typing a dot at the end of the line, until the popup menu is filled.
+function! s:complete() abort
+    call feedkeys("A.\<C-r>=BenchRecordPopup()\<CR>\<C-e>\<Esc>", 'xt')
+endfunction
+
+function! s:goto() abort
+    call jedi#goto()
+    let s:size = line('.')
+endfunction
+
+function! s:usages() abort
+    call jedi#usages()
+    let s:size = len(getqflist())
+endfunction
+
+function! s:signatures() abort
+    python3 jedi_vim.show_call_signatures()
+endfunction
+
+function! s:rename() abort
+    python3 jedi_vim.do_rename('renamed_name', 'original_name')
+    let s:size = len(getqflist())
+endfunction
+
+" [name, fixture, pattern, cursor at the end, action, cleanup]
+let s:benchmarks = [
+    \ ['completion', 'main.py', '^leaf$', 1, 's:complete', 'silent! undo'],
+    \ ['completion/large file', 'large.py', '^instance$', 1, 's:complete',
+    \  'silent! undo'],
+    \ ['completion/real file', 'real_argparse.py', '^_os$', 1, 's:complete',
+    \  'silent! undo'],
+    \ ['goto/deep imports', 'main.py', 'DeepLeaf(', 0, 's:goto', ''],
+    \ ['usages/thousands', 'usages.py', '^target', 0, 's:usages',
+    \  'call jedi#clear_usages() | cclose'],
+    \ ['signatures/refresh', 'main.py', 'leaf.method(1, ', 1, 's:signatures',
+    \  'python3 jedi_vim.clear_call_signatures()'],
+    \ ['rename/hundreds', 'rename.py', '^original_name', 0, 's:rename',
+    \  'edit! | cclose'],
+    \ ]
+
+function! s:run(name, fixture, pattern, at_end, action, cleanup) abort
+    for round in range(s:rounds)
+        call s:open(a:fixture, a:pattern, a:at_end)
+        let s:size = -1
+        let start = reltime()
+        call call(a:action, [])
+        let ms = reltimefloat(reltime(start)) * 1000
+        execute a:cleanup
+        call s:write({'name': a:name, 'round': round, 'ms': ms,
+                    \ 'size': s:size})
+    endfor
+endfunction
+
+try
+    for s:benchmark in s:benchmarks
+        call call('s:run', s:benchmark)
+    endfor
+
+    " Many buffers, which are all used for dynamic analysis.
+    for s:path in glob(s:fixtures . '/many/*.py', 0, 1)
+        execute 'edit ' . fnameescape(s:path)
+    endfor
+    call s:run('completion/many buffers', 'main.py', '^leaf$', 1,
+                \ 's:complete', 'silent! undo')
+catch
+    call s:write({'error': v:exception . ' (' . v:throwpoint . ')'})
+endtry
+
+qall!
+
+" vim: et:ts=4:sw=4
@@ -0,0 +1,57 @@
+" Compares handing completion lists from Python to Vim as a Vimscript literal
+" (the old `vim.command('return ' + str(out))`) with jedi_vim.vim_return().
+"
+" Run it from the root of the repository with Vim or Neovim:
+"
+"     vim -Nu NONE -i NONE -es -S test/benchmark/marshalling.vim
+"     nvim --headless -u NONE -i NONE -S test/benchmark/marshalling.vim
+"
+" The results are written to stdout.
+
+set runtimepath^=.
+let s:rounds = 20
+let s:results = []
+
+python3 << PYEOF
+import vim
+import jedi_vim
+from jedi_vim import PythonToVimStr
+
+
+def bench_items(n):
+    return [dict(word=PythonToVimStr('name_%d' % i),
+                 abbr=PythonToVimStr('name_%d' % i),
+                 menu=PythonToVimStr('def name_%d(a, b="x")' % i),
+                 info=PythonToVimStr('name_%d(a, b="x")\n\nA "docstring".' % i),
+                 icase=1,
+                 dup=1)
+            for i in range(n)]
+PYEOF
+
+function! s:via_repr() abort
+    python3 vim.command('return ' + str(bench_out))
+endfunction
+
+function! s:via_vim_return() abort
+    python3 jedi_vim.vim_return(bench_out)
+endfunction
+
+for s:n in [1000, 5000]
+    python3 bench_out = bench_items(int(vim.eval('s:n')))
+    let s:expected = s:via_repr()
+    for s:name in ['repr', 'vim_return']
+        let s:F = function('s:via_' . s:name)
+        if s:F() != s:expected
+            call add(s:results, 'ERROR: different results for ' . s:name)
+        endif
+        let s:start = reltime()
+        for s:i in range(s:rounds)
+            call s:F()
+        endfor
+        let s:ms = reltimefloat(reltime(s:start)) * 1000 / s:rounds
+        call add(s:results, printf('%5d items  %-10s  %8.2f ms', s:n, s:name, s:ms))
+    endfor
+endfor
+
+call writefile(s:results, '/dev/stdout')
+qall!
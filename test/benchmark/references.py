@@ -0,0 +1,109 @@
+"""
+Measures how the search for usages in worker processes scales with the number
+of workers (see `g:jedi#usages_workers`).
+
+    python test/benchmark/references.py [--max-workers 8] [--rounds 5]
+
+The usages of a name that is imported by many generated modules are searched
+in-process (the steps of `g:jedi#usages_streaming`) and with 1, 2, 4, ... up
+to `--max-workers` processes (default: the number of CPUs).  The first round
+with a pool is reported as "cold", because the workers have to start and
+import the modules first, the median of the others as "warm".
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(root, 'pythonx'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import jedi  # noqa: E402
+import jedi_vim_references  # noqa: E402
+import jedi_vim_worker  # noqa: E402
+from run import generate_fixtures  # noqa: E402
+
+ORIGIN = os.path.join('many', 'mod_010.py')
+POSITION = 5, 20
+"""The `target` in `return value + target`."""
+
+
+def _search_arguments(fixtures):
+    project = jedi.Project(fixtures)
+    path = os.path.join(fixtures, ORIGIN)
+    script = jedi.Script(path=path, project=project)
+    names = script.get_references(*POSITION, scope='file')
+    definitions = script.goto(*POSITION, follow_imports=True)
+    return project, names[0].name, dict(
+        targets=[jedi_vim_references.name_key(n) for n in names + definitions],
+        searched=[path],
+        first_paths=[str(d.module_path) for d in definitions],
+    )
+
+
+def _median(values):
+    values = sorted(values)
+    return values[(len(values) - 1) // 2]
+
+
+def measure(create_search, rounds):
+    """Returns the seconds of all rounds and the number of usages found."""
+    seconds = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        found = create_search().run()
+        seconds.append(time.perf_counter() - start)
+    return seconds, len(found)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--modules', type=int, default=400,
+                        help='Number of generated modules that use the name.')
+    args = parser.parse_args(argv)
+
+    fixtures = tempfile.mkdtemp(prefix='jedi-vim-references-')
+    try:
+        generate_fixtures(fixtures, modules=args.modules)
+        project, name, kwargs = _search_arguments(fixtures)
+        project_args = dict(path=fixtures, environment_path=None,
+                            added_sys_path=[])
+
+        print('%-12s %9s %9s %8s %7s' % (
+            'workers', 'cold s', 'warm s', 'speedup', 'usages'))
+        seconds, count = measure(
+            lambda: jedi_vim_references.ReferenceSearch(project, name, **kwargs),
+            args.rounds)
+        print('%-12s %9.2f %9.2f %8s %7d' % ('in-process', seconds[0],
+                                             _median(seconds[1:] or seconds),
+                                             '-', count))
+
+        workers = 1
+        single = None
+        while workers <= args.max_workers:
+            pool = jedi_vim_worker.WorkerPool(size=workers)
+            try:
+                seconds, count = measure(
+                    lambda: jedi_vim_references.ParallelReferenceSearch(
+                        pool, project_args, project, name, **kwargs),
+                    args.rounds)
+            finally:
+                pool.shutdown()
+            warm = _median(seconds[1:] or seconds)
+            if single is None:
+                single = warm
+            print('%-12d %9.2f %9.2f %7.1fx %7d' % (
+                workers, seconds[0], warm, single / warm, count))
+            workers *= 2
+    finally:
+        shutil.rmtree(fixtures)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
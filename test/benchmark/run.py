@@ -0,0 +1,239 @@
+"""
+Runs test/benchmark/latency.vim in headless Vim and Neovim, and compares the
+results with a baseline.
+
+    python test/benchmark/run.py [--editor vim] [--rounds 15] [--save-baseline]
+
+The fixtures are generated (large files, a deep import chain, thousands of
+usages, many buffers) or copied from the standard library, so everything runs
+offline.  The first round of each benchmark is reported as "cold", the median
+and spread of the others as "warm".  Baselines are stored per editor in
+build/benchmark/ by default.  A warm median that is slower than the baseline
+by more than the threshold (and the noise floor) is flagged as a regression,
+and makes this exit with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LATENCY_VIM = os.path.join('test', 'benchmark', 'latency.vim')
+BASELINE_DIR = os.path.join(root, 'build', 'benchmark')
+
+NOISE_FLOOR_MS = 2.0
+"""Differences below this are never regressions."""
+
+
+def _write(path, lines):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def generate_fixtures(directory, depth=15, classes=300, usages=2500,
+                      renames=300, modules=200):
+    """Writes the fixtures used by latency.vim to `directory`."""
+    # A deep import chain, each package re-exporting the next one.
+    package = os.path.join(directory, 'deep')
+    _write(os.path.join(package, '__init__.py'), [''])
+    for level in range(depth):
+        package = os.path.join(package, 'level%d' % level)
+        if level < depth - 1:
+            lines = ['from .level%d import DeepLeaf' % (level + 1)]
+        else:
+            lines = ['class DeepLeaf:',
+                     '    """The end of the import chain."""',
+                     '    def method(self, a, b, *args, key=None, **kwargs):',
+                     '        return a + b']
+            for i in range(30):
+                lines += ['    def method_%d(self):' % i, '        return %d' % i]
+        _write(os.path.join(package, '__init__.py'), lines)
+
+    _write(os.path.join(directory, 'main.py'), [
+        'import os',
+        'from deep.level0 import DeepLeaf',
+        'from usages import target',
+        '',
+        'leaf = DeepLeaf()',
+        'leaf.method(1, 2)',
+        'leaf',
+    ])
+
+    lines = ['import os', 'import collections', '']
+    for c in range(classes):
+        lines += ['', 'class Class%04d(object):' % c,
+                  '    """Docstring of class %d."""' % c,
+                  '    attribute = %d' % c, '']
+        for m in range(8):
+            lines += ['    def method_%d(self, value=%d):' % (m, m),
+                      '        return os.path.join(str(value), "%d")' % c]
+    lines += ['', 'instance = Class%04d()' % (classes // 2), 'instance']
+    _write(os.path.join(directory, 'large.py'), lines)
+
+    source = argparse.__file__
+    with open(source) as f:
+        real = f.read()
+    _write(os.path.join(directory, 'real_argparse.py'), [real.rstrip('\n'), '_os'])
+
+    _write(os.path.join(directory, 'usages.py'),
+           ['target = 0'] + ['print(target + %d)' % i for i in range(usages)])
+
+    _write(os.path.join(directory, 'rename.py'),
+           ['original_name = 1']
+           + ['print(original_name, %d)' % i for i in range(renames)])
+
+    many = os.path.join(directory, 'many')
+    _write(os.path.join(many, '__init__.py'), [''])
+    for i in range(modules):
+        lines = ['from usages import target', '']
+        if i:
+            lines.insert(0, 'from many.mod_%03d import function_%03d' % (i - 1, i - 1))
+        for f in range(10):
+            lines += ['def function_%03d_%d(value):' % (i, f),
+                      '    return value + target', '']
+        lines += ['def function_%03d(value):' % i, '    return value']
+        _write(os.path.join(many, 'mod_%03d.py' % i), lines)
+
+
+def editor_command(editor):
+    if editor == 'nvim':
+        return ['nvim', '--headless', '-u', 'NONE', '-i', 'NONE', '-S', LATENCY_VIM]
+    return [editor, '-Nu', 'NONE', '-i', 'NONE', '-es', '-S', LATENCY_VIM]
+
+
+def run_editor(editor, fixtures, rounds, timeout):
+    """Returns the samples of one editor run, or raises RuntimeError."""
+    fd, output = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    env = dict(os.environ, JEDI_BENCH_FIXTURES=fixtures,
+               JEDI_BENCH_OUTPUT=output, JEDI_BENCH_ROUNDS=str(rounds))
+    try:
+        subprocess.run(editor_command(editor), cwd=root, env=env,
+                       stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=timeout)
+        with open(output) as f:
+            samples = [json.loads(line) for line in f if line.strip()]
+    except subprocess.TimeoutExpired:
+        raise RuntimeError('timed out after %ds' % timeout)
+    finally:
+        os.remove(output)
+    for sample in samples:
+        if 'error' in sample:
+            raise RuntimeError(sample['error'])
+    if not samples:
+        raise RuntimeError('no results')
+    return samples
+
+
+def _percentile(sorted_values, percent):
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[index]
+
+
+def summarize(samples):
+    """
+    Returns the statistics per benchmark, in the order they were run: the
+    cold (first) round, and the median, 90th percentile, minimum and median
+    absolute deviation of the warm rounds.
+    """
+    rounds = {}
+    for sample in samples:
+        rounds.setdefault(sample['name'], []).append(sample)
+    summary = {}
+    for name, benchmark_samples in rounds.items():
+        benchmark_samples.sort(key=lambda s: s['round'])
+        cold = benchmark_samples[0]
+        warm = sorted(s['ms'] for s in benchmark_samples[1:]) or [cold['ms']]
+        median = _percentile(warm, 50)
+        deviations = sorted(abs(ms - median) for ms in warm)
+        summary[name] = dict(
+            cold_ms=round(cold['ms'], 2),
+            median_ms=round(median, 2),
+            p90_ms=round(_percentile(warm, 90), 2),
+            min_ms=round(warm[0], 2),
+            mad_ms=round(_percentile(deviations, 50), 2),
+            rounds=len(benchmark_samples),
+            size=benchmark_samples[-1]['size'],
+        )
+    return summary
+
+
+def compare(summary, baseline, threshold):
+    """Returns `(name, baseline median, median)` of the regressions."""
+    regressions = []
+    for name, values in summary.items():
+        old = baseline.get('benchmarks', {}).get(name)
+        if old is None:
+            continue
+        limit = max(old['median_ms'] * (1 + threshold),
+                    old['median_ms'] + NOISE_FLOOR_MS)
+        if values['median_ms'] > limit:
+            regressions.append((name, old['median_ms'], values['median_ms']))
+    return regressions
+
+
+def print_summary(editor, summary, baseline):
+    print('\n%s (%s, Python %s)' % (editor, platform.node(),
+                                    platform.python_version()))
+    print('%-26s %9s %9s %9s %9s %7s %9s' % (
+        'benchmark', 'cold ms', 'median', 'p90', 'mad', 'size', 'baseline'))
+    for name, values in summary.items():
+        old = baseline.get('benchmarks', {}).get(name)
+        print('%-26s %9.1f %9.1f %9.1f %9.1f %7d %9s' % (
+            name, values['cold_ms'], values['median_ms'], values['p90_ms'],
+            values['mad_ms'], values['size'],
+            '%.1f' % old['median_ms'] if old else '-'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--editor', action='append', choices=('vim', 'nvim'),
+                        help='Editor to benchmark (default: both, if found).')
+    parser.add_argument('--rounds', type=int, default=15)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Relative slowdown that counts as a regression.')
+    parser.add_argument('--baseline-dir', default=BASELINE_DIR)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store the results as the new baselines.')
+    parser.add_argument('--timeout', type=int, default=600)
+    args = parser.parse_args(argv)
+
+    editors = args.editor or [e for e in ('vim', 'nvim') if shutil.which(e)]
+    fixtures = tempfile.mkdtemp(prefix='jedi-vim-benchmark-')
+    regressions = []
+    try:
+        generate_fixtures(fixtures)
+        for editor in editors:
+            try:
+                samples = run_editor(editor, fixtures, args.rounds, args.timeout)
+            except (OSError, RuntimeError) as e:
+                print('\n%s: skipped (%s)' % (editor, e))
+                continue
+            summary = summarize(samples)
+            baseline_path = os.path.join(args.baseline_dir, '%s.json' % editor)
+            try:
+                with open(baseline_path) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError):
+                baseline = {}
+            print_summary(editor, summary, baseline)
+            for name, old, new in compare(summary, baseline, args.threshold):
+                print('REGRESSION: %s %s: %.1f ms -> %.1f ms' % (editor, name, old, new))
+                regressions.append(name)
+            if args.save_baseline:
+                _write(baseline_path, [json.dumps(dict(
+                    node=platform.node(), python=platform.python_version(),
+                    rounds=args.rounds, benchmarks=summary), indent=2)])
+                print('Saved the baseline to %s' % baseline_path)
+    finally:
+        shutil.rmtree(fixtures)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
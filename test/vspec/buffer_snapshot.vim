@@ -0,0 +1,56 @@
+let g:jedi#completions_command = 'X'
+source plugin/jedi.vim
+
+describe 'buffer snapshot'
+    before
+        new
+        set filetype=python
+        call setline(1, ['import os', '', 'def target_func():', '    return 1'])
+        let g:lines_id = py3eval('id(jedi_vim.get_buffer_snapshot().lines)')
+    end
+
+    after
+        bd!
+    end
+
+    it 'follows changed, inserted and deleted lines'
+        call setline(2, 'x = 1')
+        Expect py3eval('jedi_vim.get_buffer_snapshot().lines') == getline(1, '$')
+        call append(0, ['import json', 'import sys'])
+        Expect py3eval('jedi_vim.get_buffer_snapshot().lines') == getline(1, '$')
+        2delete _
+        Expect py3eval('jedi_vim.get_buffer_snapshot().lines') == getline(1, '$')
+
+        " Several changes at once
+        call append('$', ['', 'y = 2', 'z = 3'])
+        call setline(1, 'import re')
+        $-1delete _
+        normal! ggdd
+        undo
+        Expect py3eval('jedi_vim.get_buffer_snapshot().lines') == getline(1, '$')
+        Expect py3eval('jedi_vim.get_buffer_snapshot().source')
+                    \ == join(getline(1, '$'), "\n")
+
+        if exists('*listener_add') || has('nvim')
+            " The lines were updated in place, not copied again.
+            Expect py3eval('id(jedi_vim.get_buffer_snapshot().lines)')
+                        \ == g:lines_id
+        endif
+    end
+
+    it 'completes and goes to definitions after changes'
+        call append(0, ['import json'])
+        call setline(4, 'def renamed_func():')
+        call append('$', ['', 'x = 1'])
+        $delete _
+        normal GorenamedX
+        Expect getline('.') == 'renamed_func'
+        Expect py3eval('jedi_vim.get_buffer_snapshot().lines') == getline(1, '$')
+
+        call jedi#goto()
+        Expect line('.') == 4
+        Expect col('.') == 5
+    end
+end
+
+" vim: et:ts=4:sw=4
@@ -0,0 +1,203 @@
+source plugin/jedi.vim
+
+" The names that jedi's script for the current buffer defines.
+function! s:script_names() abort
+    return py3eval('[n.name for n in jedi_vim.get_script().get_names()]')
+endfunction
+
+describe 'script cache'
+    before
+        new
+        set filetype=python
+        let g:sys_path = tempname()
+        call mkdir(g:sys_path)
+        call writefile(['x = 1'], g:sys_path.'/stale_cache_mod.py')
+        python3 jedi_vim.load_jedi()
+    end
+
+    after
+        let g:jedi#added_sys_path = []
+        python3 jedi_vim.invalidate_settings()
+        bd!
+        call delete(g:sys_path, 'rf')
+    end
+
+    it 'reuses the script until the buffer changes'
+        call setline(1, 'def old_name(): pass')
+        Expect s:script_names() == ['old_name']
+        let hits = py3eval('jedi_vim.script_cache.hits')
+        Expect s:script_names() == ['old_name']
+        Expect py3eval('jedi_vim.script_cache.hits') == hits + 1
+
+        call setline(1, 'def new_name(): pass')
+        Expect s:script_names() == ['new_name']
+    end
+
+    it 'uses a new script and project once the settings change'
+        call setline(1, 'import stale_cache_m')
+        let complete = '[c.name for c in jedi_vim.get_script().complete(1, 20)]'
+        Expect py3eval(complete) == []
+
+        " Same buffer state, but another project.
+        let g:jedi#added_sys_path = [g:sys_path]
+        python3 jedi_vim.invalidate_settings()
+        Expect py3eval(complete) == ['stale_cache_mod']
+    end
+end
+
+" The names of the files used for jedi's dynamic analysis.
+function! s:dynamic_modules() abort
+    python3 jedi_vim.invalidate_settings()
+    return sort(map(py3eval('jedi_vim.get_dynamic_modules()'),
+                \ 'fnamemodify(v:val, ":t")'))
+endfunction
+
+describe 'dynamic modules'
+    before
+        let g:project = tempname()
+        call mkdir(g:project)
+        call writefile(['import helper'], g:project.'/main.py')
+        call writefile(['x = 1'], g:project.'/helper.py')
+        call writefile(['y = 1'], g:project.'/other.py')
+        let g:jedi#project_path = g:project
+        set hidden
+        for name in ['other', 'helper', 'main']
+            execute 'edit '.g:project.'/'.name.'.py'
+        endfor
+        python3 jedi_vim.load_jedi()
+    end
+
+    after
+        let g:jedi#project_path = 'auto'
+        let g:jedi#dynamic_modules = 'buffers'
+        set nohidden
+        try | %bwipeout! | catch | endtry
+        call delete(g:project, 'rf')
+    end
+
+    it 'follows the listed buffers with "buffers"'
+        Expect s:dynamic_modules() == ['helper.py', 'main.py', 'other.py']
+        execute 'bwipeout '.bufnr(g:project.'/other.py')
+        Expect s:dynamic_modules() == ['helper.py', 'main.py']
+        execute 'buffer '.bufnr(g:project.'/helper.py')
+        setlocal nobuflisted
+        buffer main.py
+        Expect s:dynamic_modules() == ['main.py']
+        execute 'edit '.g:project.'/new.py'
+        buffer main.py
+        Expect s:dynamic_modules() == ['main.py', 'new.py']
+    end
+
+    it 'follows the changed imports with "imports"'
+        let g:jedi#dynamic_modules = 'imports'
+        Expect s:dynamic_modules() == ['helper.py', 'main.py']
+        call setline(1, 'import other')
+        Expect s:dynamic_modules() == ['main.py', 'other.py']
+        call append(1, 'import helper')
+        Expect s:dynamic_modules() == ['helper.py', 'main.py', 'other.py']
+    end
+end
+
+" Gets a setting like a request from Vim does.
+function! s:setting(name) abort
+    return py3eval('getattr(jedi_vim.vim_request(jedi_vim.get_settings)(), '
+                \ .string(a:name).')')
+endfunction
+
+describe 'settings'
+    before
+        new
+        set filetype=python
+    end
+
+    after
+        let g:jedi#usages_scope = 'project'
+        set completeopt&
+        %bwipeout!
+    end
+
+    it 'sees changed variables and options in the next request'
+        let g:jedi#usages_scope = 'file'
+        Expect s:setting('usages_scope') == 'file'
+        let g:jedi#usages_scope = 'tiered'
+        Expect s:setting('usages_scope') == 'tiered'
+
+        set completeopt=menuone
+        Expect s:setting('completeopt') == 'menuone'
+        set completeopt=menu,preview
+        Expect s:setting('completeopt') == 'menu,preview'
+    end
+
+    it 'keeps the buffer variables per buffer'
+        let b:jedi_case_insensitive_completion = 0
+        Expect s:setting('case_insensitive_completion') == v:false
+        new
+        Expect s:setting('case_insensitive_completion') == v:true
+        let b:jedi_case_insensitive_completion = 0
+        Expect s:setting('case_insensitive_completion') == v:false
+        unlet b:jedi_case_insensitive_completion
+        Expect s:setting('case_insensitive_completion') == v:true
+        wincmd p
+        Expect s:setting('case_insensitive_completion') == v:false
+    end
+end
+
+" The texts of the quickfix entries of the usages of the name under the
+" cursor.
+function! s:usage_texts() abort
+    let win = win_getid()
+    call jedi#usages()
+    call win_gotoid(win)
+    return map(getqflist(), 'v:val.text')
+endfunction
+
+describe 'line cache'
+    before
+        let g:project = tempname()
+        call mkdir(g:project)
+        call writefile(['def target_func():', '    pass'], g:project.'/a.py')
+        call writefile(['from a import target_func', 'target_func()'],
+                    \ g:project.'/b.py')
+        let g:jedi#project_path = g:project
+        set hidden
+        execute 'edit '.g:project.'/b.py'
+        execute 'edit '.g:project.'/a.py'
+        normal! w
+    end
+
+    after
+        let g:jedi#project_path = 'auto'
+        set nohidden
+        cclose
+        try | %bwipeout! | catch | endtry
+        call delete(g:project, 'rf')
+    end
+
+    it 'annotates usages with the current lines of buffers and files'
+        let b = bufnr(g:project.'/b.py')
+        call setbufline(b, 2, 'target_func()  # in the buffer')
+        Expect match(s:usage_texts(), '# in the buffer$') > -1
+
+        execute 'bwipeout! '.b
+        call writefile(['from a import target_func',
+                    \ 'target_func()  # on disk'], g:project.'/b.py')
+        let texts = s:usage_texts()
+        Expect match(texts, '# on disk$') > -1
+        Expect match(texts, '# in the buffer$') == -1
+    end
+
+    it 'reads the lines of big files'
+        let g:big = g:project.'/big.py'
+        let lines = map(range(1, 30000), '"x".v:val." = 1  # ".repeat("-", 40)')
+        " Without a newline at the end
+        call writefile(lines, g:big, 'b')
+        Expect getfsize(g:big) >= py3eval('jedi_vim.LineCache.MMAP_SIZE')
+        let get_line = 'jedi_vim.LineCache().get_line(vim.eval("g:big"), %d)'
+        Expect py3eval(printf(get_line, 1)) == lines[0]
+        Expect py3eval(printf(get_line, 25000)) == lines[24999]
+        Expect py3eval(printf(get_line, 30000)) == lines[-1]
+        Expect py3eval(printf(get_line, 30001) . ' is None') == 1
+    end
+end
+
+" vim: et:ts=4:sw=4
@@ -27,3 +27,54 @@ describe 'simple:'
         Expect getline('.') == 'foo'
     end
 end
+
+describe 'environment cache'
+    before
+        let g:env_dir = tempname()
+        call mkdir(g:env_dir)
+        let g:executable = g:env_dir.'/python'
+        call writefile([], g:executable)
+        python3 import json, os, jedi_vim_environments
+        python3 exe = vim.eval('g:executable')
+        " An entry for the default paths, like a previous discovery stores it.
+        python3 entry = {'refreshed': 0, 'environments': [
+                    \ [exe, '3.9.0', 'virtualenv', os.stat(exe).st_mtime]]}
+        python3 with open(vim.eval('g:env_dir') + '/cache.json', 'w') as f:
+                    \ json.dump({'version': jedi_vim_environments.CACHE_VERSION,
+                    \            'entries': {json.dumps([]): entry}}, f)
+        python3 cache = jedi_vim_environments.EnvironmentCache(
+                    \ vim.eval('g:env_dir') + '/cache.json')
+        let g:executables = '[e.executable for e in cache.get([])]'
+    end
+
+    after
+        call delete(g:env_dir, 'rf')
+    end
+
+    it 'drops environments whose executable changed'
+        Expect py3eval(g:executables) == [g:executable]
+        Expect py3eval('cache.get(["elsewhere"]) is None') == 1
+        python3 os.utime(exe, (0, 0))
+        Expect py3eval(g:executables) == []
+    end
+
+    it 'drops environments whose executable is gone'
+        Expect py3eval(g:executables) == [g:executable]
+        call delete(g:executable)
+        Expect py3eval(g:executables) == []
+    end
+
+    it 'replaces the environments with the ones discovered again'
+        python3 jedi_vim.load_jedi()
+        python3 cache.refresh_in_background(jedi_vim.jedi, [])
+        let i = 0
+        while py3eval('cache.refreshing()') && i < 300
+            sleep 100m
+            let i += 1
+        endwhile
+        Expect py3eval('cache.generation') == 1
+        Expect index(py3eval(g:executables), g:executable) == -1
+        python3 cache = jedi_vim_environments.EnvironmentCache(cache.cache_path)
+        Expect index(py3eval(g:executables), g:executable) == -1
+    end
+end
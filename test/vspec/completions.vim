@@ -115,4 +115,108 @@ describe 'smart completions'
     end
 end
 
+describe 'completion filter'
+    before
+        new
+        set filetype=python
+    end
+
+    after
+        " default
+        let g:jedi#completion_filter = 'prefix'
+        let g:jedi#max_completions = 0
+        bd!
+    end
+
+    it 'fuzzy'
+        let g:jedi#completion_filter = 'fuzzy'
+        normal oimport sbprcX
+        Expect getline('.') == 'import subprocess'
+    end
+
+    it 'max completions'
+        let g:jedi#max_completions = 1
+        normal oIndentationErrX
+        Expect getline('.') == 'IndentationError'
+    end
+end
+
+describe 'subprocess backend'
+    before
+        new
+        let g:jedi#backend = 'subprocess'
+        set filetype=python
+    end
+
+    after
+        " default
+        let g:jedi#backend = 'inprocess'
+        bd!
+    end
+
+    it 'import'
+        normal oimport subproX
+        Expect getline('.') == 'import subprocess'
+    end
+
+    it 'exception'
+        normal oIndentationErrX
+        Expect getline('.') == 'IndentationError'
+    end
+end
+
+describe 'stats'
+    before
+        new
+        set filetype=python
+        JediStats!
+    end
+
+    after
+        bd!
+    end
+
+    it 'counts completions'
+        normal oimport subproX
+        let g:stats = json_decode(jedi#stats_json())
+        Expect g:stats.operations.completions.count == 1
+        Expect g:stats.operations.completions.max_size == 1
+        Expect has_key(g:stats.caches, 'scripts') == 1
+    end
+end
+
+describe 'warm-up'
+    before
+        new
+        set filetype=python
+        let g:warmed_up = 0
+        autocmd User JediWarmupDone let g:warmed_up = 1
+    end
+
+    after
+        autocmd! User JediWarmupDone
+        unlet g:warmed_up
+        let g:jedi#preload_modules = []
+        bd!
+    end
+
+    it 'imports and preloads'
+        call setline(1, ['import os', 'from json import decoder'])
+        let g:jedi#preload_modules = ['subprocess']
+        call jedi#warmup()
+        let i = 0
+        while !g:warmed_up && i < 300
+            sleep 100m
+            if i == 0 && !g:warmed_up
+                Expect jedi#warmup_status() =~# '^jedi: warming up'
+            endif
+            let i += 1
+        endwhile
+        Expect g:warmed_up == 1
+        Expect jedi#warmup_status() == ''
+        normal Goos.patX
+        Expect getline('.') == 'os.path'
+    end
+end
+
 " vim: et:ts=4:sw=4
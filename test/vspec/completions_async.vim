@@ -0,0 +1,75 @@
+let g:jedi#completions_command = 'X'
+let g:jedi#async_completions = 1
+source plugin/jedi.vim
+
+" Collects the popup once the completion is done, then leaves Insert mode.
+function! s:wait_for_completion(timer) abort
+    let s:waited += 1
+    let s:max_gap = max([s:max_gap, reltimefloat(reltime(s:last_tick))])
+    let s:last_tick = reltime()
+    if s:move_cursor && !s:moved
+        if py3eval('jedi_vim._pending_completion is not None')
+            call feedkeys("\<Left>", 'nt')
+            let s:moved = 1
+        endif
+        return
+    endif
+    if pumvisible() || s:waited > 500
+                \ || (s:moved && py3eval('jedi_vim._pending_completion is None'))
+        let s:popup = pumvisible()
+                    \ ? map(complete_info(['items']).items, 'v:val.word') : []
+        call timer_stop(a:timer)
+        call feedkeys("\<Esc>", 'nt')
+    endif
+endfunction
+
+function! s:complete(keys, move_cursor) abort
+    let s:waited = 0
+    let s:max_gap = 0.0
+    let s:last_tick = reltime()
+    let s:move_cursor = a:move_cursor
+    let s:moved = 0
+    let s:popup = []
+    call timer_start(10, function('s:wait_for_completion'), {'repeat': -1})
+    call feedkeys(a:keys, 'tx!')
+    return s:popup
+endfunction
+
+describe 'async completions'
+    before
+        new
+        set filetype=python
+    end
+
+    after
+        bd!
+    end
+
+    it 'opens the popup once jedi is done'
+        let popup = s:complete('oimport subproX', 0)
+        Expect index(popup, 'subprocess') > -1
+    end
+
+    it 'drops the result once the cursor moved'
+        " Keep the background thread busy (without holding jedi_lock), so
+        " that the cursor moves while the completion is pending.
+        python3 import time; jedi_vim.background_runner.submit(lambda: (
+                    \ jedi_vim.jedi_lock.release(), time.sleep(0.5),
+                    \ jedi_vim.jedi_lock.acquire()))
+        let popup = s:complete('oimport collectX', 1)
+        Expect s:moved == 1
+        Expect popup == []
+    end
+
+    it 'does not wait for a running completion when triggered again'
+        " Both triggers find jedi busy, and are tried again once the
+        " background thread is done, while the timers keep running.
+        python3 import time; jedi_vim.background_runner.submit(time.sleep, 0.5)
+        let popup = s:complete("oimport subX\<BS>proX", 0)
+        Expect index(popup, 'subprocess') > -1
+        Expect getline('.') =~# '^import subpro'
+        Expect s:max_gap < 0.3
+    end
+end
+
+" vim: et:ts=4:sw=4
@@ -31,4 +31,58 @@ describe 'documentation docstrings'
     end
 end
 
+function! s:hover_windows() abort
+    if has('nvim')
+        return filter(nvim_list_wins(),
+                    \ '!empty(nvim_win_get_config(v:val).relative)')
+    endif
+    return popup_list()
+endfunction
+
+function! s:hover() abort
+    call jedi#hover_documentation()
+    let i = 0
+    while empty(s:hover_windows()) && i < 100
+        sleep 50m
+        let i += 1
+    endwhile
+    return s:hover_windows()
+endfunction
+
+describe 'hover documentation'
+    before
+        set filetype=python
+    end
+
+    after
+        call jedi#_close_hover_documentation()
+        try | %bwipeout! | catch | endtry
+    end
+
+    it 'shows the docstring in a popup and caches it'
+        put = 'ImportError'
+        normal! G
+        let windows = s:hover()
+        Expect len(windows) == 1
+        let lines = getbufline(winbufnr(windows[0]), 1, '$')
+        Expect lines[0] == "Docstring for class builtins.ImportError"
+        call jedi#_close_hover_documentation()
+        Expect empty(s:hover_windows()) == 1
+
+        let hits = py3eval('jedi_vim.documentation_cache.hits')
+        let windows = s:hover()
+        Expect len(windows) == 1
+        Expect getbufline(winbufnr(windows[0]), 1, '$') == lines
+        Expect py3eval('jedi_vim.documentation_cache.hits') > hits
+    end
+
+    it 'shows nothing without a name'
+        put = 'x = 2'
+        normal! G0l
+        call jedi#hover_documentation()
+        sleep 200m
+        Expect empty(s:hover_windows()) == 1
+    end
+end
+
 " vim: et:ts=4:sw=4
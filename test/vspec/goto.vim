@@ -174,4 +174,244 @@ describe 'goto wildignore'
 end
 
 
+describe 'streaming usages'
+    before
+        let g:project = tempname()
+        call mkdir(g:project)
+        call writefile(['def target_func():', '    pass'],
+                    \ g:project.'/a.py')
+        call writefile(['from a import target_func', 'target_func()'],
+                    \ g:project.'/b.py')
+        let g:jedi#project_path = g:project
+        let g:jedi#usages_streaming = 1
+        execute 'edit '.g:project.'/a.py'
+    end
+
+    after
+        let g:jedi#project_path = 'auto'
+        let g:jedi#usages_streaming = 0
+        cclose
+        try | %bwipeout! | catch | endtry
+        call delete(g:project, 'rf')
+    end
+
+    it 'adds the usages of other files'
+        normal! w
+        call jedi#usages()
+        Expect len(getqflist()) >= 1
+        let i = 0
+        while len(getqflist()) < 3 && i < 100
+            sleep 100m
+            let i += 1
+        endwhile
+        Expect map(getqflist(), 'v:val.lnum') == [1, 1, 2]
+        Expect map(getqflist(), 'fnamemodify(bufname(v:val.bufnr), ":t")')
+                    \ == ['a.py', 'b.py', 'b.py']
+    end
+end
+
+describe 'usages scope'
+    before
+        let g:project = tempname()
+        call mkdir(g:project)
+        call writefile(['def target_func():', '    pass', 'target_func()'],
+                    \ g:project.'/a.py')
+        call writefile(['from a import target_func', 'target_func()'],
+                    \ g:project.'/b.py')
+        let g:jedi#project_path = g:project
+        execute 'edit '.g:project.'/a.py'
+    end
+
+    after
+        let g:jedi#project_path = 'auto'
+        let g:jedi#usages_scope = 'project'
+        cclose
+        try | %bwipeout! | catch | endtry
+        call delete(g:project, 'rf')
+    end
+
+    it 'only searches the current file with "file"'
+        let g:jedi#usages_scope = 'file'
+        normal! w
+        call jedi#usages()
+        Expect map(getqflist(), 'v:val.lnum') == [1, 3]
+    end
+
+    it 'adds the usages of other files with "tiered"'
+        let g:jedi#usages_scope = 'tiered'
+        normal! w
+        call jedi#usages()
+        Expect map(getqflist(), 'v:val.lnum')[:1] == [1, 3]
+        let i = 0
+        while len(getqflist()) < 4 && i < 100
+            sleep 100m
+            let i += 1
+        endwhile
+        Expect map(getqflist(), 'fnamemodify(bufname(v:val.bufnr), ":t")')
+                    \ == ['a.py', 'a.py', 'b.py', 'b.py']
+    end
+end
+
+" Shows the usages of the name under the cursor and returns them as
+" [file, line, column] once the search in the other files is done.
+function! s:all_usages() abort
+    call jedi#usages()
+    let i = 0
+    while py3eval('jedi_vim._usages_stream is not None') && i < 100
+        sleep 100m
+        let i += 1
+    endwhile
+    let usages = map(getqflist(), '[fnamemodify(bufname(v:val.bufnr), ":.")'
+                \ .', v:val.lnum, v:val.col]')
+    cclose
+    return sort(usages)
+endfunction
+
+describe 'usages in other files'
+    before
+        let g:project = tempname()
+        call mkdir(g:project.'/pkg', 'p')
+        call writefile(['def target_func():', '    pass', 'target_func()'],
+                    \ g:project.'/a.py')
+        call writefile(['from a import target_func', 'target_func()'],
+                    \ g:project.'/b.py')
+        call writefile(['import a', 'a.target_func()'], g:project.'/c.py')
+        call writefile([], g:project.'/pkg/__init__.py')
+        call writefile(['from b import target_func', 'x = target_func',
+                    \ 'x()'], g:project.'/pkg/d.py')
+        " Names that do not refer to a.target_func
+        call writefile(['def target_func():', '    return 1',
+                    \ 'target_func()'], g:project.'/e.py')
+        call writefile(['class K:', '    def target_func(self):',
+                    \ '        pass', 'K().target_func()'], g:project.'/f.py')
+        let g:jedi#project_path = g:project
+        execute 'cd '.g:project
+        edit a.py
+        normal! w
+    end
+
+    after
+        cd -
+        let g:jedi#project_path = 'auto'
+        let g:jedi#usages_streaming = 0
+        let g:jedi#usages_scope = 'project'
+        let g:jedi#usages_workers = 0
+        try | %bwipeout! | catch | endtry
+        call delete(g:project, 'rf')
+    end
+
+    it 'finds the same usages as jedi when streaming'
+        let expected = s:all_usages()
+        Expect expected == [['a.py', 1, 5], ['a.py', 3, 1], ['b.py', 1, 15],
+                    \ ['b.py', 2, 1], ['c.py', 2, 3], ['pkg/d.py', 1, 15],
+                    \ ['pkg/d.py', 2, 5]]
+        let g:jedi#usages_streaming = 1
+        Expect s:all_usages() == expected
+    end
+
+    it 'finds the same usages as jedi with the "tiered" scope'
+        let expected = s:all_usages()
+        let g:jedi#usages_scope = 'tiered'
+        Expect s:all_usages() == expected
+    end
+
+    it 'finds the same usages in worker processes'
+        let expected = s:all_usages()
+        let g:jedi#usages_workers = 2
+        Expect s:all_usages() == expected
+        let g:jedi#usages_streaming = 1
+        Expect s:all_usages() == expected
+    end
+end
+
+" Returns the highlighted usages in a buffer as [lnum, col, length].
+function! s:usage_highlights(bufnr) abort
+    let highlights = []
+    if has('nvim')
+        let namespace = nvim_create_namespace('jedi_usages')
+        for [id, row, col, details] in nvim_buf_get_extmarks(a:bufnr,
+                    \ namespace, 0, -1, {'details': 1})
+            call add(highlights, [row + 1, col + 1, details.end_col - col])
+        endfor
+    elseif exists('*prop_add')
+        for lnum in range(1, len(getbufline(a:bufnr, 1, '$')))
+            for prop in prop_list(lnum, {'bufnr': a:bufnr})
+                if prop.type ==# 'jediUsage'
+                    call add(highlights, [lnum, prop.col, prop.length])
+                endif
+            endfor
+        endfor
+    else
+        for match in getmatches()
+            if match.group ==# 'jediUsage'
+                for i in range(1, 8)
+                    if has_key(match, 'pos'.i)
+                        call add(highlights, match['pos'.i])
+                    endif
+                endfor
+            endif
+        endfor
+    endif
+    return sort(highlights, {a, b -> a[0] == b[0] ? a[1] - b[1] : a[0] - b[0]})
+endfunction
+
+describe 'usage highlights'
+    before
+        " Usages are highlighted in the buffers of their files.
+        execute 'new '.tempname().'.py'
+        call setline(1, ['def target_func(): pass', 'target_func()',
+                    \ 'other = 1', 'other'])
+        let g:win = win_getid()
+    end
+
+    after
+        let g:jedi#highlight_usages_lazily = 0
+        call jedi#clear_usages()
+        cclose
+        bd!
+    end
+
+    it 'replaces the highlights of the previous usages'
+        normal! ggw
+        call jedi#usages()
+        call win_gotoid(g:win)
+        Expect s:usage_highlights(bufnr('%')) == [[1, 5, 11], [2, 1, 11]]
+
+        normal! 3G
+        call jedi#usages()
+        call win_gotoid(g:win)
+        Expect s:usage_highlights(bufnr('%')) == [[3, 1, 5], [4, 1, 5]]
+    end
+
+    it 'highlights the visible usages lazily'
+        " Needs text properties and WinScrolled.
+        if !(has('nvim') || exists('*prop_add')) || !exists('##WinScrolled')
+            return
+        endif
+        let g:jedi#highlight_usages_lazily = 1
+        call append('$', repeat(['target_func()'], 300))
+        normal! ggw
+        call jedi#usages()
+        call win_gotoid(g:win)
+        let placed = s:usage_highlights(bufnr('%'))
+        Expect placed[:1] == [[1, 5, 11], [2, 1, 11]]
+        Expect len(placed) < 302
+
+        normal! 150Gzz
+        redraw
+        doautocmd WinScrolled
+        Expect index(s:usage_highlights(bufnr('%')), [150, 1, 11]) > -1
+
+        " The usages that are not highlighted yet are dropped once the
+        " buffer changes, they would end up in the wrong lines.
+        call append(0, '')
+        doautocmd TextChanged
+        normal! Gzb
+        redraw
+        doautocmd WinScrolled
+        Expect filter(s:usage_highlights(bufnr('%')), 'v:val[0] > 250') == []
+    end
+end
+
+
 " vim: et:ts=4:sw=4
@@ -7,6 +7,31 @@ describe 'JediDebugInfo'
         Expect output[0] == 'You should run this in a buffer with filetype "python".'
 		Expect output[1] == '#### Jedi-vim debug information'
 		Expect output[-1] == '</details>'
+        Expect match(output, '^ - startup times: import jedi_vim: ') > 0
+    end
+end
+
+describe 'failed import of jedi'
+    before
+        python3 saved = (jedi_vim._jedi_import, jedi_vim.jedi,
+                    \ jedi_vim._jedi_checked)
+        python3 jedi_vim._jedi_import = (ImportError,
+                    \ ImportError('no jedi here'), None)
+        python3 jedi_vim.jedi, jedi_vim._jedi_checked = None, False
+    end
+
+    after
+        python3 jedi_vim._jedi_import, jedi_vim.jedi, jedi_vim._jedi_checked
+                    \ = saved
+        python3 jedi_vim.jedi_import_error = None
+    end
+
+    it 'shows the error on first use'
+        redir => msg
+        python3 jedi_vim.load_jedi()
+        redir END
+        Expect msg =~# 'jedi-vim error: could not import the "jedi" '
+                    \ .'Python module: ImportError: no jedi here'
     end
 end
 
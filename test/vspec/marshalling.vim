@@ -0,0 +1,42 @@
+source plugin/jedi.vim
+
+python3 values = {
+            \ 'nested': {'list': [1, [2, 3.5], {'deep': ['x']}],
+            \            'empty': [{}, [], '']},
+            \ 'unicode': 'äöü € ✓ (…)',
+            \ 'quotes': 'it\'s "quoted" \\ and \n a newline',
+            \ 'zero': jedi_vim.PythonToVimStr('a\0b'),
+            \ 'items': [dict(word=jedi_vim.PythonToVimStr('näme'),
+            \                info=jedi_vim.PythonToVimStr('f(a, b="x")\n\nDoc\'s.'),
+            \                icase=1)],
+            \ }
+
+" Returns one of the values from Python with jedi_vim.vim_return().
+function! s:vim_return(name) abort
+    execute 'python3 jedi_vim.vim_return(values['.string(a:name).'])'
+endfunction
+
+describe 'vim_return'
+    it 'keeps nested lists and dicts'
+        Expect s:vim_return('nested') == {'list': [1, [2, 3.5], {'deep': ['x']}],
+                    \ 'empty': [{}, [], '']}
+    end
+
+    it 'keeps unicode and quotes'
+        Expect s:vim_return('unicode') ==# 'äöü € ✓ (…)'
+        Expect s:vim_return('quotes') ==# "it's \"quoted\" \\ and \n a newline"
+        Expect s:vim_return('items') ==# [{'word': 'näme',
+                    \ 'info': "f(a, b=\"x\")\n\nDoc's.", 'icase': 1}]
+    end
+
+    it 'escapes zero bytes'
+        Expect s:vim_return('zero') ==# 'a\0b'
+    end
+
+    it 'does not leave the variable behind'
+        call s:vim_return('nested')
+        Expect exists('g:_jedi_return') == 0
+    end
+end
+
+" vim: et:ts=4:sw=4
@@ -0,0 +1,50 @@
+source plugin/jedi.vim
+
+describe 'project per buffer'
+    before
+        let g:root = tempname()
+        for package in ['one', 'two']
+            call mkdir(g:root.'/'.package)
+            call writefile(['from setuptools import setup', 'setup()'],
+                        \ g:root.'/'.package.'/setup.py')
+            call writefile(['x = 1'], g:root.'/'.package.'/mod.py')
+        endfor
+        python3 jedi_vim.load_jedi()
+    end
+
+    after
+        let g:jedi#project_path = 'auto'
+        try | %bwipeout! | catch | endtry
+        call delete(g:root, 'rf')
+    end
+
+    it 'detects the root of each buffer and reuses its project'
+        execute 'edit '.g:root.'/one/mod.py'
+        Expect py3eval('jedi_vim.get_project_root()') == resolve(g:root.'/one')
+        let one = py3eval('id(jedi_vim.get_project())')
+
+        execute 'edit '.g:root.'/two/mod.py'
+        Expect py3eval('jedi_vim.get_project_root()') == resolve(g:root.'/two')
+        let two = py3eval('id(jedi_vim.get_project())')
+        Expect two != one
+
+        let hits = py3eval('jedi_vim.project_cache.hits')
+        execute 'buffer '.bufnr(g:root.'/one/mod.py')
+        Expect py3eval('id(jedi_vim.get_project())') == one
+        execute 'buffer '.bufnr(g:root.'/two/mod.py')
+        Expect py3eval('id(jedi_vim.get_project())') == two
+        Expect py3eval('jedi_vim.project_cache.hits') == hits + 2
+    end
+
+    it 'reuses the project of :JediLoadProject for the detected root'
+        execute 'edit '.g:root.'/one/mod.py'
+        execute 'JediLoadProject '.g:root.'/one/'
+        let loaded = py3eval('id(jedi_vim.get_project())')
+
+        let g:jedi#project_path = 'auto'
+        python3 jedi_vim.invalidate_settings()
+        Expect py3eval('id(jedi_vim.get_project())') == loaded
+    end
+end
+
+" vim: et:ts=4:sw=4
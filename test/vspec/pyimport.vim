@@ -32,3 +32,78 @@ describe 'pyimport'
         Expect g:comp == "sre_compile\nsre_constants\nsre_parse"
     end
 end
+
+describe 'pyimport index'
+    before
+        let g:jedi#use_tabs_not_buffers = 1
+        let g:jedi#project_path = 'autoload'
+        let g:jedi#pyimport_index = 1
+        " Builds the index.
+        call jedi#py_import_completions('subproc', 0, 0)
+        python3 jedi_vim.jedi_vim_index.wait_for_refreshes()
+    end
+
+    after
+        try | %bwipeout! | catch | endtry
+        unlet g:jedi#project_path
+        unlet g:jedi#pyimport_index
+    end
+
+    it 'open_tab'
+        Pyimport subprocess
+        Expect CurrentBufferIsModule('subprocess') == 1
+        Pyimport subprocess.Popen
+        Expect CurrentBufferIsModule('subprocess') == 1
+        Expect getline('.') =~# '^class Popen'
+    end
+
+    it 'completion'
+        Expect jedi#py_import_completions('subproc', 0, 0) == 'subprocess'
+        let g:comp = jedi#py_import_completions('subprocess.Pop', 0, 0)
+        Expect g:comp == 'subprocess.Popen'
+        " Not in the index, from Jedi.
+        Expect jedi#py_import_completions('subprocess.Popen.comm', 0, 0)
+                    \ == 'subprocess.Popen.communicate'
+    end
+end
+
+describe 'pyimport index of a project'
+    before
+        let g:project = tempname()
+        call mkdir(g:project.'/ns/sub', 'p')
+        call writefile(['import os', '', 'def target_func():', '    pass'],
+                    \ g:project.'/ns/sub/mod.py')
+        " A symbolic link back to the project, which is not walked again.
+        call system('ln -s .. '.shellescape(g:project.'/ns/loop'))
+        let g:jedi#use_tabs_not_buffers = 1
+        let g:jedi#project_path = g:project
+        let g:jedi#pyimport_index = 1
+        call jedi#py_import_completions('ns', 0, 0)
+        python3 jedi_vim.jedi_vim_index.wait_for_refreshes()
+    end
+
+    after
+        try | %bwipeout! | catch | endtry
+        unlet g:jedi#project_path
+        unlet g:jedi#pyimport_index
+        call delete(g:project, 'rf')
+    end
+
+    it 'includes namespace packages'
+        Expect jedi#py_import_completions('ns', 0, 0) == 'ns'
+        Expect jedi#py_import_completions('ns.', 0, 0) == 'ns.sub'
+        Expect jedi#py_import_completions('ns.sub.mod.t', 0, 0)
+                    \ == 'ns.sub.mod.target_func'
+    end
+
+    it 'asks jedi once the indexed line changed'
+        Pyimport ns.sub.mod.target_func
+        Expect line('.') == 3
+        %bwipeout!
+        call writefile(['import os', '', '', 'def target_func():', '    pass'],
+                    \ g:project.'/ns/sub/mod.py')
+        Pyimport ns.sub.mod.target_func
+        Expect line('.') == 4
+        Expect getline('.') =~# '^def target_func'
+    end
+end
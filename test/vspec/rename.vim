@@ -0,0 +1,77 @@
+source plugin/jedi.vim
+
+describe 'rename'
+    before
+        let g:project = tempname()
+        call mkdir(g:project)
+        call writefile(['def target_func():', '    pass', 'target_func()'],
+                    \ g:project.'/a.py')
+        call writefile(['from a import target_func', 'target_func()'],
+                    \ g:project.'/b.py')
+        let g:jedi#project_path = g:project
+        execute 'edit '.g:project.'/a.py'
+        normal! w
+    end
+
+    after
+        let g:jedi#project_path = 'auto'
+        let g:jedi#rename_unloaded_files = 'open'
+        try | %bwipeout! | catch | endtry
+        call delete(g:project, 'rf')
+    end
+
+    it 'changes unloaded files in buffers with "open"'
+        let g:jedi#rename_unloaded_files = 'open'
+        python3 jedi_vim.do_rename('renamed', 'target_func')
+        Expect getline(1, '$') == ['def renamed():', '    pass', 'renamed()']
+        let b = bufnr(g:project.'/b.py')
+        Expect bufloaded(b) == 1
+        Expect getbufline(b, 1, '$') == ['from a import renamed', 'renamed()']
+        Expect getbufvar(b, '&modified') == 1
+        Expect readfile(g:project.'/b.py')
+                    \ == ['from a import target_func', 'target_func()']
+        Expect len(getqflist()) == 4
+    end
+
+    it 'changes unloaded files on disk with "disk" and reverts them'
+        let g:jedi#rename_unloaded_files = 'disk'
+        python3 jedi_vim.do_rename('renamed', 'target_func')
+        Expect getline(1, '$') == ['def renamed():', '    pass', 'renamed()']
+        Expect bufloaded(g:project.'/b.py') == 0
+        Expect readfile(g:project.'/b.py')
+                    \ == ['from a import renamed', 'renamed()']
+
+        JediUndoRename
+        Expect readfile(g:project.'/b.py')
+                    \ == ['from a import target_func', 'target_func()']
+    end
+
+    it 'lists the places jedi changed with "refactoring"'
+        let g:jedi#rename_unloaded_files = 'refactoring'
+        let qf_nr = getqflist({'nr': '$'}).nr
+        python3 jedi_vim.do_rename('renamed', 'target_func')
+        Expect readfile(g:project.'/b.py')
+                    \ == ['from a import renamed', 'renamed()']
+        Expect getqflist({'nr': '$'}).nr == qf_nr + 1
+        let b = filter(getqflist(), 'bufname(v:val.bufnr) =~# "b\\.py$"')
+        Expect map(b, '[v:val.lnum, v:val.col, v:val.text]')
+                    \ == [[1, 15, 'from a import renamed'], [2, 1, 'renamed()']]
+    end
+
+    it 'reports the files it cannot change'
+        let g:jedi#rename_unloaded_files = 'open'
+        let b = bufadd(g:project.'/b.py')
+        call bufload(b)
+        call setbufvar(b, '&modifiable', 0)
+        redir => msg
+        python3 jedi_vim.do_rename('renamed', 'target_func')
+        redir END
+        Expect getline(1, '$') == ['def renamed():', '    pass', 'renamed()']
+        Expect getbufline(b, 1, '$')
+                    \ == ['from a import target_func', 'target_func()']
+        Expect msg =~# 'Failed in: \S*b\.py'
+        Expect len(getqflist()) == 2
+    end
+end
+
+" vim: et:ts=4:sw=4
@@ -1,5 +1,50 @@
 source plugin/jedi.vim
 
+" Returns the bracket and param index of the signatures at "|" in lines,
+" from jedi and from find_call/_signature_index.
+function! s:signature_indexes(lines) abort
+    %delete _
+    call setline(1, ['def f(a, b, c): pass',
+                \ 'def h(a, *args, key=None, **kw): pass'] + a:lines)
+    call search('|')
+    let [row, column] = [line('.'), col('.') - 1]
+    call setline(row, substitute(getline(row), '|', '', ''))
+    let signatures = 'jedi_vim.jedi.Script("\n".join(vim.current.buffer[:]))'
+                \ .'.get_signatures('.row.', '.column.')'
+    let expected = py3eval('[[list(s.bracket_start), s.index] for s in '
+                \ .signatures.']')
+    let actual = py3eval('[[list(c.bracket_start), jedi_vim._signature_index('
+                \ .'jedi_vim._cached_signature(s).params, c)] for c in '
+                \ .'[jedi_vim.find_call(vim.current.buffer[:], '.row.', '.column.')]'
+                \ .' for s in '.signatures.']')
+    return [expected, actual]
+endfunction
+
+" Returns [text, current param] of the signatures shown in popups (Vim) or
+" as virtual text (Neovim).
+function! s:signature_popups() abort
+    let signatures = []
+    if has('nvim')
+        let namespace = nvim_create_namespace('jedi_call_signatures')
+        for [id, row, col, details] in nvim_buf_get_extmarks(0, namespace,
+                    \ 0, -1, {'details': 1})
+            let chunks = details.virt_text
+            let current = filter(copy(chunks), 'v:val[1] ==# "jediFat"')
+            call add(signatures, [join(map(copy(chunks), 'v:val[0]'), ''),
+                        \ empty(current) ? '' : current[0][0]])
+        endfor
+    else
+        for id in popup_list()
+            let bufnr = winbufnr(id)
+            let text = getbufline(bufnr, 1)[0]
+            let props = prop_list(1, {'bufnr': bufnr})
+            call add(signatures, [text, empty(props) ? ''
+                        \ : strpart(text, props[0].col - 1, props[0].length)])
+        endfor
+    endif
+    return signatures
+endfunction
+
 describe 'signatures'
     before
         enew
@@ -21,6 +66,20 @@ describe 'signatures'
         Expect getline(3) == ''
     end
 
+    it 'follows a changed definition'
+        normal odef xyz(number): return
+        normal o
+        normal oxyz()
+        doautocmd CursorHoldI
+        Expect getline(3) == '?!?jedi=0, ?!?   (*_*number*_*) ?!?jedi?!?'
+        doautocmd InsertLeave
+
+        call setline(2, 'def xyz(count): return')
+        doautocmd CursorHoldI
+        Expect getline(3) == '?!?jedi=0, ?!?   (*_*count*_*) ?!?jedi?!?'
+        doautocmd InsertLeave
+    end
+
     it 'multiple buffers'
         set hidden
         new
@@ -74,6 +133,32 @@ describe 'signatures'
         let g:jedi#show_call_signatures = 1
     end
 
+    it 'popups follow the cursor and a changed definition'
+        let g:jedi#show_call_signatures = 3
+        call jedi#configure_call_signatures()
+
+        normal odef xyz(number, other): return
+        normal o
+        normal oxyz(1, 2)
+        doautocmd CursorHoldI
+        Expect s:signature_popups() == [['xyz(number, other)', 'other']]
+        normal! 3h
+        doautocmd CursorHoldI
+        Expect s:signature_popups() == [['xyz(number, other)', 'number']]
+
+        call setline(2, 'def xyz(count, other): return')
+        doautocmd CursorHoldI
+        Expect s:signature_popups() == [['xyz(count, other)', 'count']]
+
+        doautocmd InsertLeave
+        Expect s:signature_popups() == []
+        Expect getline(1, '$')
+                    \ == ['', 'def xyz(count, other): return', '', 'xyz(1, 2)']
+
+        let g:jedi#show_call_signatures = 1
+        call jedi#configure_call_signatures()
+    end
+
     it 'command line simple'
         let g:jedi#show_call_signatures = 2
         call jedi#configure_call_signatures()
@@ -140,4 +225,28 @@ describe 'signatures'
         redir END
         Expect msg == "\n"
     end
+
+    it 'computes the param index like jedi'
+        python3 jedi_vim.load_jedi()
+        for lines in [
+                    \ ['f(1, f(2|'],
+                    \ ['f(1, f(2), |'],
+                    \ ['f("a, (b", |'],
+                    \ ["f(')', b=|"],
+                    \ ['f(1, c=|'],
+                    \ ['f(b=1, |'],
+                    \ ['f(c=1, a|'],
+                    \ ['f(x == 1, |'],
+                    \ ['h(1, 2, 3|'],
+                    \ ['h(1, ke|'],
+                    \ ['h(*[1], |'],
+                    \ ['h(**{}, |'],
+                    \ ['f(1,', '  2,', '  |'],
+                    \ ['f(1, # (', '  |'],
+                    \ ['f("""(', ',""", |'],
+                    \ ['f(1, 2, 3, |']]
+            let [expected, actual] = s:signature_indexes(lines)
+            Expect [lines, actual] == [lines, expected]
+        endfor
+    end
 end